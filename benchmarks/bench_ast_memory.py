@@ -0,0 +1,65 @@
+"""
+AST memory harness.
+
+Usage:
+    PYTHONPATH=src:benchmarks python benchmarks/bench_ast_memory.py [n_commands]
+
+Parses a synthetic script (100k commands by default) and reports the
+memory the AST keeps alive once the token stream is dropped: total,
+bytes per node, and how many distinct str objects hold the same names.
+"""
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+from spec_generator.importers.spss.ast import ColumnRef
+from spec_generator.importers.spss.parser import SpssParser
+from spec_generator.importers.spss.tokens import TokenStream
+from synthetic import generate_script
+
+
+def name_strings(nodes):
+    """(name occurrences, distinct names, distinct str objects) over node and tree names."""
+    values = []
+    stack = []
+    for node in nodes:
+        for attr in ("target", "keys", "columns"):
+            value = getattr(node, attr, None)
+            if isinstance(value, str):
+                values.append(value)
+            elif isinstance(value, list):
+                values.extend(getattr(v, "name", v) for v in value)
+        stack.extend(getattr(node, attr) for attr in ("expression_tree", "condition_tree") if hasattr(node, attr))
+    while stack:
+        expr = stack.pop()
+        if isinstance(expr, ColumnRef):
+            values.append(expr.name)
+        elif expr is not None:
+            stack.extend(getattr(expr, attr) for attr in ("left", "right", "operand") if hasattr(expr, attr))
+            stack.extend(getattr(expr, "args", ()))
+    return len(values), len(set(values)), len({id(v) for v in values})
+
+
+def bench(n_commands: int) -> None:
+    code = generate_script(n_commands)
+    parser = SpssParser()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    nodes = parser.parse(code)
+    elapsed = time.perf_counter() - start
+    parser.tokens = TokenStream("") # Keep only what the AST references
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    kinds = Counter(type(node).__name__ for node in nodes)
+    occurrences, distinct, objects = name_strings(nodes)
+    print(f"{n_commands} commands -> {len(nodes)} nodes ({', '.join(f'{k} {v}' for k, v in kinds.most_common())})")
+    print(f"  parse (traced)  {elapsed * 1000:8.1f} ms")
+    print(f"  AST retained    {retained / 1e6:8.2f} MB | {retained / len(nodes):6.0f} bytes/node")
+    print(f"  names           {occurrences} uses of {distinct} names in {objects} str objects")
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
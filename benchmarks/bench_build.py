@@ -0,0 +1,65 @@
+"""
+GraphBuilder scaling benchmark.
+
+Usage:
+    PYTHONPATH=src:benchmarks python benchmarks/bench_build.py
+
+Builds pipelines of 10k..200k operations straight from AST nodes (no
+parsing) over a fixed-width schema, mixing COMPUTE, SELECT IF, SORT, SAVE
+and MATCH FILES against saved files. Dataset lookups are indexed, so the
+time per operation should stay flat as the pipeline grows. The "gc off"
+column leaves out CPython's cyclic collector, whose full passes over the
+growing object graph add a slow drift of their own.
+"""
+import gc
+import time
+
+from etl_ir.types import DataType
+from spec_generator.importers.spss.ast import ComputeNode, FilterNode, JoinNode, LoadNode, SaveNode, SortNode
+from spec_generator.importers.spss.graph_builder import GraphBuilder
+
+
+def make_nodes(n_ops: int):
+    nodes = [LoadNode(filename="survey.csv", columns=[(f"q{i}", DataType.INTEGER) for i in range(20)])]
+    for i in range(n_ops - 1):
+        kind = i % 8
+        if kind in (0, 1, 2):
+            nodes.append(ComputeNode(target=f"q{i % 20}", expression=f"q{(i + 1) % 20} + 1"))
+        elif kind in (3, 4):
+            nodes.append(FilterNode(condition=f"q{i % 20} > 0"))
+        elif kind == 5:
+            nodes.append(SortNode(keys=[f"q{i % 20}"]))
+        elif kind == 6:
+            nodes.append(SaveNode(filename=f"part{i % 1000}.sav"))
+        else:
+            nodes.append(JoinNode(sources=["*", f"part{(i - 1) % 1000}.sav"], by=["q0"]))
+    return nodes
+
+
+def timed_build(nodes, collect: bool):
+    if not collect:
+        gc.disable()
+    try:
+        start = time.perf_counter()
+        pipeline = GraphBuilder().build(nodes)
+        return pipeline, time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+def bench(n_ops: int) -> None:
+    nodes = make_nodes(n_ops)
+    pipeline, with_gc = timed_build(nodes, collect=True)
+    n, n_datasets = len(pipeline.operations), len(pipeline.datasets)
+    del pipeline
+    _, without_gc = timed_build(nodes, collect=False)
+    print(
+        f"{n:>7} ops | {n_datasets:>7} datasets | "
+        f"{with_gc * 1000:8.1f} ms ({with_gc / n * 1e6:5.1f} us/op) | "
+        f"gc off {without_gc * 1000:8.1f} ms ({without_gc / n * 1e6:5.1f} us/op)"
+    )
+
+
+if __name__ == "__main__":
+    for n in (10_000, 50_000, 100_000, 200_000):
+        bench(n)
@@ -0,0 +1,67 @@
+"""
+Def-use map benchmark.
+
+Usage:
+    PYTHONPATH=src:benchmarks python benchmarks/bench_def_use.py
+
+A wide file (2,000 columns) followed by a growing number of COMPUTEs,
+IFs and SELECT IFs on parsed expressions, then the same with every other
+command a GENERIC one (RENAME VARIABLES, FORMATS, ...), which may change
+every column. build() doesn't track versions; the def-use map is worked
+out from the pipeline on first access. Version scopes are shared like
+column schemas and a GENERIC command is one boundary, not a new version
+of every column, so time per command stays flat as the script and the
+file get wider.
+"""
+import time
+
+from etl_ir.types import DataType
+from spec_generator.importers.spss.ast import ComputeNode, FilterNode, GenericNode, IfNode, LoadNode, SaveNode
+from spec_generator.importers.spss.graph_builder import GraphBuilder
+from spec_generator.importers.spss.parsers.expressions import parse_expression
+
+WIDTH = 2_000
+
+
+def make_nodes(n_commands: int, generic: bool = False):
+    nodes = [LoadNode(filename="survey.csv", columns=[(f"q{i}", DataType.INTEGER) for i in range(WIDTH)])]
+    for i in range(n_commands):
+        source, target = f"q{i % WIDTH}", f"q{(i * 7) % WIDTH}"
+        if generic and i % 2:
+            nodes.append(GenericNode(command="RENAME VARIABLES", params={"content": f"({source} = {source})"}))
+        elif i % 10 == 3:
+            condition = f"{source} > 0"
+            nodes.append(FilterNode(condition=condition, condition_tree=parse_expression(condition)))
+        elif i % 10 == 7:
+            nodes.append(IfNode(condition=f"({source} > 1)", target=target, expression="0",
+                                condition_tree=parse_expression(f"{source} > 1"), expression_tree=parse_expression("0")))
+        else:
+            expression = f"{source} + {target} * 2"
+            nodes.append(ComputeNode(target=target, expression=expression, expression_tree=parse_expression(expression)))
+    nodes.append(SaveNode(filename="out.sav"))
+    return nodes
+
+
+def bench(n_commands: int, generic: bool = False) -> None:
+    nodes = make_nodes(n_commands, generic)
+    builder = GraphBuilder()
+    start = time.perf_counter()
+    builder.build(nodes)
+    built = time.perf_counter()
+    def_use = builder.def_use
+    tracked = time.perf_counter()
+
+    start_scan = time.perf_counter()
+    dead = sum(def_use.is_dead(version) for version in def_use.producer)
+    query = time.perf_counter() - start_scan
+    print(
+        f"{n_commands:>7} commands{' (half GENERIC)' if generic else '':15} | versions {len(def_use.producer):>7} | "
+        f"dead {dead:>6} | build {built - start:6.3f} s | def-use {tracked - built:6.3f} s "
+        f"({(tracked - built) / n_commands * 1e6:5.1f} us/command) | dead-version scan {query * 1000:6.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    for generic in (False, True):
+        for n in (5_000, 20_000, 80_000):
+            bench(n, generic)
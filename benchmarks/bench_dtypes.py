@@ -0,0 +1,88 @@
+"""
+Dtype planning benchmark.
+
+Usage:
+    PYTHONPATH=src:benchmarks:. python benchmarks/bench_dtypes.py
+
+A numeric-heavy extract (F6.0 counts, F8.2 amounts, a short region code)
+through a script of COMPUTEs, an IF and a SELECT IF on the region. Runs
+it with interpreter.py with and without DtypePlanningPass and reports the
+peak memory (tracemalloc) and the runtime of each, and checks both runs
+save the same file.
+"""
+import contextlib
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from spec_generator.exporters.yaml import IrYamlExporter
+from spec_generator.importers.spss.graph_builder import GraphBuilder
+from spec_generator.importers.spss.parser import SpssParser
+from spec_generator.optimizer import DtypePlanningPass, PassManager
+from interpreter import run_interpreter
+
+N_COUNTS = 12
+
+
+def make_script() -> str:
+    counts = " ".join(f"c{i} F6.0" for i in range(N_COUNTS))
+    lines = [f"GET DATA /TYPE=TXT /FILE='extract.csv' /VARIABLES = id F8.0 {counts} amount F8.2 region A2."]
+    for i in range(0, N_COUNTS, 2):
+        lines.append(f"COMPUTE s{i} = c{i} + c{i + 1} * 2.")
+    lines.append("COMPUTE share = amount / (c0 + 1).")
+    lines.append("IF (c1 > 500) flag = 1.")
+    lines.append("SELECT IF region <> 'ZZ'.")
+    lines.append("SAVE OUTFILE='out.csv'.")
+    return "\n".join(lines) + "\n"
+
+
+def make_csv(path: str, rows: int) -> None:
+    rng = np.random.default_rng(0)
+    data = {"id": np.arange(rows)}
+    for i in range(N_COUNTS):
+        data[f"c{i}"] = rng.integers(0, 1000, rows)
+    data["amount"] = rng.integers(0, 10 ** 7, rows) / 100
+    data["region"] = rng.choice(["NE", "NW", "SE", "SW", "ZZ"], rows)
+    pd.DataFrame(data).to_csv(path, index=False)
+
+
+def run(pipeline, workdir: str, name: str):
+    spec = os.path.join(workdir, f"{name}.yaml")
+    out_dir = os.path.join(workdir, name)
+    os.makedirs(out_dir, exist_ok=True)
+    IrYamlExporter().export(pipeline, spec)
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_interpreter(spec, {"extract.csv": os.path.join(workdir, "extract.csv")}, out_dir)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    with open(os.path.join(out_dir, "verified_out.csv")) as f:
+        return peak, elapsed, f.read()
+
+
+def bench(rows: int) -> None:
+    pipeline = GraphBuilder().build(SpssParser().parse(make_script()))
+    planner = DtypePlanningPass()
+    planned = PassManager([planner]).run(pipeline)
+    with tempfile.TemporaryDirectory() as workdir:
+        make_csv(os.path.join(workdir, "extract.csv"), rows)
+        base_peak, base_time, base_out = run(pipeline, workdir, "inferred")
+        plan_peak, plan_time, plan_out = run(planned, workdir, "planned")
+    assert plan_out == base_out, "planned dtypes changed the output"
+    print(
+        f"{rows:>9} rows | inferred: peak {base_peak / 2 ** 20:7.1f} MiB, {base_time:5.2f} s | "
+        f"planned: peak {plan_peak / 2 ** 20:7.1f} MiB, {plan_time:5.2f} s | "
+        f"memory x{plan_peak / base_peak:.2f} | {planner.stats}"
+    )
+
+
+if __name__ == "__main__":
+    for rows in (100_000, 500_000):
+        bench(rows)
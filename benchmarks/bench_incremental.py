@@ -0,0 +1,47 @@
+"""
+Incremental re-parse benchmark.
+
+Usage:
+    PYTHONPATH=src:benchmarks python benchmarks/bench_incremental.py
+
+Edits one COMPUTE in a large script and compares a full parse() with
+SpssParser.reparse(), which only re-parses commands whose text changed.
+"""
+import time
+
+from spec_generator.importers.spss.parser import SpssParser
+from synthetic import generate_script
+
+
+def bench(n_commands: int) -> None:
+    code = generate_script(n_commands)
+    parser = SpssParser()
+
+    start = time.perf_counter()
+    expected_old = parser.parse(code)
+    full = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tree = parser.parse_tree(code)
+    indexed = time.perf_counter() - start
+    assert tree.nodes == expected_old
+
+    # Rewrite the expression of a COMPUTE in the middle of the script
+    target = code.index("COMPUTE", len(code) // 2)
+    eq = code.index("=", target)
+    edit = (eq + 1, code.index(".\n", eq), " income * 3")
+
+    start = time.perf_counter()
+    new_tree = parser.reparse(tree, [edit])
+    incremental = time.perf_counter() - start
+    assert new_tree.nodes == parser.parse(new_tree.source)
+
+    print(
+        f"{n_commands:>7} commands | parse {full * 1000:8.1f} ms | parse_tree {indexed * 1000:8.1f} ms | "
+        f"reparse {incremental * 1000:7.1f} ms | {len(new_tree.changed)} node(s) rebuilt"
+    )
+
+
+if __name__ == "__main__":
+    for n in (2_000, 20_000, 100_000):
+        bench(n)
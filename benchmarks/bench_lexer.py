@@ -0,0 +1,51 @@
+"""
+Lexer throughput benchmark.
+
+Usage:
+    PYTHONPATH=src:benchmarks python benchmarks/bench_lexer.py
+
+Lexing should scale linearly: lines/sec stays flat as the script grows.
+The streaming section checks that iter_tokens() keeps peak memory flat.
+"""
+import io
+import time
+import tracemalloc
+
+from spec_generator.importers.spss.lexer import SpssLexer
+from synthetic import generate_script
+
+
+def bench(n_lines: int, repeat: int = 3) -> None:
+    code = generate_script(n_lines)
+    lexer = SpssLexer()
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tokens = lexer.tokenize(code)
+        best = min(best, time.perf_counter() - start)
+
+    mb = len(code) / 1e6
+    print(
+        f"{n_lines:>7} lines | {len(tokens):>8} tokens | {best * 1000:8.1f} ms | "
+        f"{n_lines / best:>10.0f} lines/s | {mb / best:6.2f} MB/s"
+    )
+
+
+def bench_stream(n_lines: int) -> None:
+    source = io.BytesIO(generate_script(n_lines).encode("utf-8"))
+    lexer = SpssLexer()
+
+    tracemalloc.start()
+    count = sum(1 for _ in lexer.iter_tokens(source))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{n_lines:>7} lines | {count:>8} tokens | peak {peak / 1024:8.1f} KiB (streamed)")
+
+
+if __name__ == "__main__":
+    for n in (1_000, 10_000, 40_000, 100_000):
+        bench(n)
+    for n in (1_000, 10_000, 40_000):
+        bench_stream(n)
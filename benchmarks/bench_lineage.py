@@ -0,0 +1,83 @@
+"""
+Column lineage benchmark.
+
+Usage:
+    PYTHONPATH=src:benchmarks python benchmarks/bench_lineage.py
+
+A 500-column file followed by up to 100k COMPUTE / IF / SELECT IF
+commands, each reading two columns, and a SAVE. Times building the
+LineageIndex from the IR, an upstream and a downstream query on a saved
+column (CSR walks, reversed arrays built on the first downstream query),
+and a round trip through to_dict() / from_dict(). The "chain" rows are
+the worst case: every COMPUTE reads the one before, so a query on the
+last (or first) reaches the whole pipeline.
+"""
+import gc
+import time
+
+from etl_ir.types import DataType
+from spec_generator.importers.spss.ast import ComputeNode, FilterNode, IfNode, LoadNode, SaveNode
+from spec_generator.importers.spss.graph_builder import GraphBuilder
+from spec_generator.importers.spss.parsers.expressions import parse_expression
+from spec_generator.lineage import LineageIndex
+
+WIDTH = 500
+
+
+def make_nodes(n_commands: int):
+    nodes = [LoadNode(filename="survey.csv", columns=[(f"q{i}", DataType.INTEGER) for i in range(WIDTH)])]
+    for i in range(n_commands):
+        source, target = f"q{(i * 13) % WIDTH}", f"q{(i * 7) % WIDTH}"
+        if i % 10 == 3:
+            condition = f"{source} > 0"
+            nodes.append(FilterNode(condition=condition, condition_tree=parse_expression(condition)))
+        elif i % 10 == 7:
+            nodes.append(IfNode(condition=f"({source} > 1)", target=target, expression="0",
+                                condition_tree=parse_expression(f"{source} > 1"), expression_tree=parse_expression("0")))
+        else:
+            expression = f"{source} + {target} * 2"
+            nodes.append(ComputeNode(target=target, expression=expression, expression_tree=parse_expression(expression)))
+    nodes.append(SaveNode(filename="out.sav"))
+    return nodes
+
+
+def make_chain(n_commands: int):
+    nodes = [LoadNode(filename="survey.csv", columns=[(f"q{i}", DataType.INTEGER) for i in range(WIDTH)])]
+    previous = "q0"
+    for i in range(n_commands):
+        expression = f"{previous} + q{i % WIDTH}"
+        nodes.append(ComputeNode(target=f"c{i}", expression=expression, expression_tree=parse_expression(expression)))
+        previous = f"c{i}"
+    nodes.append(SaveNode(filename="out.sav"))
+    return nodes
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def bench(n_commands: int, chain: bool = False) -> None:
+    pipeline = GraphBuilder().build(make_chain(n_commands) if chain else make_nodes(n_commands))
+    gc.collect()
+    gc.freeze() # Keep full collections over the IR's objects out of the query timings
+    index, build = timed(lambda: LineageIndex.from_pipeline(pipeline))
+    up, up_ms = timed(lambda: index.upstream(f"c{n_commands - 1}" if chain else "q0", "out.sav"))
+    _, first_down_ms = timed(lambda: index.downstream("q0#1"))
+    down, down_ms = timed(lambda: index.downstream("q0#1"))
+    _, trip_ms = timed(lambda: LineageIndex.from_dict(index.to_dict()))
+    print(
+        f"{'chain' if chain else 'mixed'} {len(pipeline.operations):>7} ops | nodes {len(index):>7} | edges {len(index.indices):>7} | "
+        f"build {build:7.0f} ms | upstream {up_ms:5.1f} ms ({len(up.columns)} cols) | "
+        f"downstream {down_ms:5.1f} ms ({len(down.columns)} cols, first {first_down_ms:5.1f} ms) | "
+        f"dict round trip {trip_ms:5.0f} ms"
+    )
+    gc.unfreeze()
+
+
+if __name__ == "__main__":
+    for n in (1_000, 10_000, 100_000):
+        bench(n)
+    for n in (5_000, 20_000): # Every COMPUTE adds a column, so the IR itself grows as n**2
+        bench(n, chain=True)
@@ -0,0 +1,41 @@
+"""
+Sharded parse benchmark.
+
+Usage:
+    PYTHONPATH=src:benchmarks python benchmarks/bench_parallel.py
+
+Compares SpssParser.parse() with parse_parallel() at several worker counts
+on a large synthetic script, and checks both give the same AST.
+"""
+import os
+import time
+
+from spec_generator.importers.spss.parser import SpssParser
+from synthetic import generate_script
+
+
+def bench(n_commands: int) -> None:
+    code = generate_script(n_commands)
+    parser = SpssParser()
+
+    start = time.perf_counter()
+    expected = parser.parse(code)
+    serial = time.perf_counter() - start
+    print(f"{n_commands:>7} commands | serial      | {serial * 1000:8.1f} ms")
+
+    workers = 2
+    while workers <= (os.cpu_count() or 1):
+        start = time.perf_counter()
+        nodes = parser.parse_parallel(code, workers=workers)
+        elapsed = time.perf_counter() - start
+        assert nodes == expected
+        print(
+            f"{n_commands:>7} commands | {workers:>2} workers  | {elapsed * 1000:8.1f} ms | "
+            f"x{serial / elapsed:4.2f}"
+        )
+        workers *= 2
+
+
+if __name__ == "__main__":
+    for n in (100_000, 400_000):
+        bench(n)
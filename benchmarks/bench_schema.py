@@ -0,0 +1,52 @@
+"""
+Wide-schema benchmark (DATA LIST / GET DATA /VARIABLES).
+
+Usage:
+    PYTHONPATH=src:benchmarks python benchmarks/bench_schema.py
+
+Survey files declare thousands of variables in one command. Variable
+blocks are read straight from the token stream, so parse time should be
+a small constant multiple of lex time and grow linearly with the width.
+"""
+import time
+
+from spec_generator.importers.spss.parser import SpssParser
+
+FORMATS = ("F8.2", "A20", "DATE11", "F3.0")
+
+
+def wide_data_list(n_vars: int) -> str:
+    block = " ".join(f"q{i} ({FORMATS[i % len(FORMATS)]})" for i in range(n_vars))
+    return f"DATA LIST FREE / {block}.\n"
+
+
+def wide_get_data(n_vars: int) -> str:
+    block = " ".join(f"q{i} {FORMATS[i % len(FORMATS)]}" for i in range(n_vars))
+    return f"GET DATA /TYPE=TXT /FILE='survey.csv' /VARIABLES = {block}.\n"
+
+
+def best_of(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench(n_vars: int) -> None:
+    parser = SpssParser()
+    for name, make in (("DATA LIST", wide_data_list), ("GET DATA", wide_get_data)):
+        code = make(n_vars)
+        lex = best_of(lambda: parser.lexer.tokenize(code))
+        parse = best_of(lambda: parser.parse(code))
+        assert len(parser.parse(code)[0].columns) == n_vars
+        print(
+            f"{name:>9} | {n_vars:>6} vars | lex {lex * 1000:7.2f} ms | "
+            f"parse {parse * 1000:7.2f} ms | {(parse - lex) / n_vars * 1e9:6.0f} ns/var over lex"
+        )
+
+
+if __name__ == "__main__":
+    for n in (1_000, 5_000, 20_000, 50_000):
+        bench(n)
@@ -0,0 +1,87 @@
+"""
+Stage planning benchmark.
+
+Usage:
+    PYTHONPATH=src:benchmarks:. python benchmarks/bench_stages.py
+
+Chains of COMPUTE / SELECT IF / EXECUTE blocks on a wide frame. Runs the
+pipeline through interpreter.py's op functions, op by op (a frame copy
+and a stored dataset per op) and then with the stages that
+StagePlanningPass plans, and reports the runtime and the peak number
+of frames held.
+"""
+import contextlib
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+from etl_ir.types import DataType
+from spec_generator.importers.spss.ast import ComputeNode, FilterNode, LoadNode, MaterializeNode, SaveNode
+from spec_generator.importers.spss.graph_builder import GraphBuilder
+from spec_generator.optimizer import PassManager, StagePlanningPass
+from interpreter import STAGE_STEPS, run_stage
+
+WIDTH = 40
+
+
+def make_nodes(n_blocks: int):
+    nodes = [LoadNode(filename="input.csv", columns=[(f"v{i}", DataType.INTEGER) for i in range(WIDTH)])]
+    for block in range(n_blocks):
+        nodes += [
+            ComputeNode(target=f"a{block}", expression=f"v{block % WIDTH} * 2"),
+            FilterNode(condition=f"v{block % WIDTH} > {block % 3}"),
+            ComputeNode(target=f"b{block}", expression=f"a{block} + 1"),
+            MaterializeNode(),
+        ]
+    nodes.append(SaveNode(filename="out.sav"))
+    return nodes
+
+
+def execute(pipeline, frame: pd.DataFrame):
+    """(seconds, peak frames held) running the ops the way interpreter.py does."""
+    ops = [op.model_dump(mode="json") for op in pipeline.operations]
+    stages = {}
+    for op in ops:
+        if op["parameters"].get("stage"):
+            stages.setdefault(op["parameters"]["stage"], []).append(op)
+    state, peak = {}, 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for op in ops:
+            stage = op["parameters"].get("stage")
+            if stage:
+                if stage in stages:
+                    run_stage(stages.pop(stage), state)
+            elif op["type"] == "load_csv":
+                state[op["outputs"][0]] = frame
+            elif op["type"] == "materialize":
+                state[op["outputs"][0]] = state[op["inputs"][0]]
+            elif op["type"] in STAGE_STEPS:
+                df = state[op["inputs"][0]]
+                df = STAGE_STEPS[op["type"]](df.copy() if op["type"] == "compute_columns" else df, op)
+                state[op["outputs"][0]] = df
+            peak = max(peak, len({id(df) for df in state.values()}))
+    return time.perf_counter() - start, peak
+
+
+def bench(n_blocks: int, frame: pd.DataFrame) -> None:
+    pipeline = GraphBuilder().build(make_nodes(n_blocks))
+    manager = PassManager([StagePlanningPass()])
+    start = time.perf_counter()
+    planned = manager.run(pipeline)
+    pass_time = time.perf_counter() - start
+    (before, before_frames), (after, after_frames) = execute(pipeline, frame), execute(planned, frame)
+    stats = manager.report["stage_planning"]
+    print(
+        f"{n_blocks:>3} blocks | stages {stats['stages']} ({stats['ops_staged']} ops) | pass {pass_time * 1000:6.2f} ms | "
+        f"run {before:6.3f} s -> {after:6.3f} s ({before / after:4.1f}x) | frames held {before_frames} -> {after_frames}"
+    )
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({f"v{i}": rng.integers(0, 100, 50_000) for i in range(WIDTH)})
+    for n in (5, 10, 20):
+        bench(n, frame)
@@ -0,0 +1,61 @@
+"""
+Streaming parse benchmark.
+
+Usage:
+    PYTHONPATH=src:benchmarks python benchmarks/bench_stream.py
+
+Compares peak traced memory of parse() on the whole text against
+parse_iter() over an open file, consuming and dropping each node. The
+streaming peak should stay flat as the script grows; parse() grows with it.
+"""
+import os
+import tempfile
+import time
+import tracemalloc
+
+from spec_generator.importers.spss.parser import SpssParser
+from synthetic import generate_script
+
+
+def measure(fn):
+    """(seconds, peak traced bytes); timed without tracing, which is slow."""
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def bench(n_commands: int) -> None:
+    code = generate_script(n_commands)
+    with tempfile.NamedTemporaryFile("w", suffix=".sps", delete=False) as f:
+        f.write(code)
+    parser = SpssParser()
+
+    def whole():
+        with open(f.name, encoding="utf-8") as src:
+            parser.parse(src.read())
+
+    def streamed():
+        with open(f.name, encoding="utf-8") as src:
+            for _ in parser.parse_iter(src):
+                pass
+
+    try:
+        t_whole, m_whole = measure(whole)
+        t_stream, m_stream = measure(streamed)
+    finally:
+        os.unlink(f.name)
+    print(
+        f"{n_commands:>7} cmds | {len(code) / 1e6:6.2f} MB | "
+        f"parse {t_whole * 1000:7.1f} ms peak {m_whole / 1e6:7.2f} MB | "
+        f"parse_iter {t_stream * 1000:7.1f} ms peak {m_stream / 1e6:6.2f} MB"
+    )
+
+
+if __name__ == "__main__":
+    for n in (10_000, 50_000, 100_000):
+        bench(n)
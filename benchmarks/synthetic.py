@@ -0,0 +1,27 @@
+"""
+Synthetic SPSS syntax for the benchmarks.
+Mirrors the shape of our machine-generated scripts: a load, long runs of
+COMPUTE / IF / SELECT IF, the odd comment, sort and save.
+"""
+
+
+def generate_script(n_commands: int) -> str:
+    lines = [
+        "* Generated benchmark script.",
+        "GET DATA /TYPE=TXT /FILE='input.csv' /VARIABLES = id F8.0 income F8.2 region A10.",
+    ]
+    for i in range(n_commands):
+        kind = i % 5
+        if kind == 0:
+            lines.append(f"COMPUTE v{i} = (income - {i}.5) / 12 * DATE.DMY(1,1,2024).")
+        elif kind == 1:
+            lines.append(f"IF (income > {i}) band{i} = 'HIGH'.")
+        elif kind == 2:
+            lines.append(f"* Note {i}: 'quoted' text is ignored in comments.")
+        elif kind == 3:
+            lines.append(f"SELECT IF v{i - 3} >= 0.")
+        else:
+            lines.append(f"COMPUTE w{i} = v{i - 4} * 2 + 1.")
+    lines.append("SORT CASES BY id.")
+    lines.append("SAVE OUTFILE='output.sav'.")
+    return "\n".join(lines) + "\n"
@@ -1,16 +1,29 @@
 import argparse
 from pathlib import Path
 import sys
+import yaml
+from spec_generator.importers.spss.cache import AstCache
 from spec_generator.importers.spss.parser import SpssParser
 from spec_generator.importers.spss.graph_builder import GraphBuilder
+from spec_generator.importers.spss.content_ids import content_addressed
 from spec_generator.exporters.yaml import IrYamlExporter
 from spec_generator.exporters.mermaid import MermaidExporter # 🟢 Import new exporter
+from spec_generator.lineage import LineageIndex
+from spec_generator.optimizer import PassManager
 
 def main():
+    if sys.argv[1:2] == ["lineage"]:
+        return lineage_main(sys.argv[2:])
+
     parser = argparse.ArgumentParser(description="SpecGen: Legacy SPSS Compiler")
     parser.add_argument("file", help="Path to input .sps file")
     # 🟢 New Flag
     parser.add_argument("--visualize", action="store_true", help="Generate a Mermaid Flowchart instead of YAML")
+    parser.add_argument("--cache-dir", help="Reuse parse results for unchanged files from this directory")
+    parser.add_argument("--optimize", action="store_true", help="Run the IR optimizer passes before exporting")
+    parser.add_argument("--content-ids", action="store_true", help="Name operations by a hash of their content and inputs instead of a counter")
+    parser.add_argument("--share-schemas", action="store_true", help="Write each distinct column schema once; datasets refer to it by id")
+    parser.add_argument("--lineage", action="store_true", help="Also write the column lineage index (see 'cli.py lineage')")
     
     args = parser.parse_args()
     input_path = Path(args.file)
@@ -19,14 +32,42 @@ def main():
         print(f"❌ Error: File not found: {input_path}")
         sys.exit(1)
 
+    pipeline = build_pipeline(input_path, args)
+
+    # 🟢 Branch logic based on flag
+    if args.visualize:
+        print("🎨 Generating Visualization...")
+        exporter = MermaidExporter()
+        diagram = exporter.export(pipeline)
+        
+        output_file = input_path.with_suffix(".md")
+        output_file.write_text(f"```mermaid\n{diagram}\n```", encoding="utf-8")
+        print(f"✅ Diagram saved to: {output_file}")
+        print("    (Preview this file in VS Code or GitHub to see the graph)")
+    else:
+        print("💾 Exporting YAML Artifact...")
+        exporter = IrYamlExporter(share_schemas=args.share_schemas)
+        output_file = input_path.with_suffix(".yaml")
+        lineage = LineageIndex.from_pipeline(pipeline) if args.lineage else None
+        exporter.export(pipeline, str(output_file), lineage=lineage)
+        print(f"✅ Success! Pipeline spec saved to: {output_file}")
+
+
+def build_pipeline(input_path: Path, args):
+    """Parses and builds an .sps file, applying --cache-dir, --optimize and --content-ids."""
     print(f"📖 Reading {input_path.name}...")
     code = input_path.read_text(encoding="utf-8")
 
     print("🔍 Parsing Syntax...")
     spss_parser = SpssParser()
     try:
-        nodes = spss_parser.parse(code)
-        print(f"    Found {len(nodes)} commands.")
+        if args.cache_dir:
+            cache = AstCache(args.cache_dir, type(spss_parser))
+            nodes = cache.load_or_parse(code, spss_parser.parse)
+            print(f"    Found {len(nodes)} commands ({'cached' if cache.hits else 'parsed'}).")
+        else:
+            nodes = spss_parser.parse(code)
+            print(f"    Found {len(nodes)} commands.")
     except Exception as e:
         print(f"❌ Parse Error: {e}")
         sys.exit(1)
@@ -39,22 +80,56 @@ def main():
         print(f"❌ Build Error: {e}")
         sys.exit(1)
 
-    # 🟢 Branch logic based on flag
-    if args.visualize:
-        print("🎨 Generating Visualization...")
-        exporter = MermaidExporter()
-        diagram = exporter.export(pipeline)
-        
-        output_file = input_path.with_suffix(".md")
-        output_file.write_text(f"```mermaid\n{diagram}\n```", encoding="utf-8")
-        print(f"✅ Diagram saved to: {output_file}")
-        print("    (Preview this file in VS Code or GitHub to see the graph)")
+    if args.optimize:
+        print("⚙️  Optimizing...")
+        optimizer = PassManager()
+        pipeline = optimizer.run(pipeline)
+        for name, stats in optimizer.report.items():
+            print(f"    {name}: " + ", ".join(f"{key}={value}" for key, value in stats.items()))
+
+    if args.content_ids:
+        # After the optimizer, so ids describe the ops that are exported
+        pipeline = content_addressed(pipeline)
+    return pipeline
+
+
+def lineage_main(argv):
+    """cli.py lineage: which columns feed (or are fed by) a column."""
+    parser = argparse.ArgumentParser(prog="cli.py lineage", description="Column lineage queries")
+    parser.add_argument("file", help="An .sps file, or a YAML spec exported with --lineage")
+    parser.add_argument("column", help="Column name; 'x#2' for its second assignment")
+    parser.add_argument("--dataset", help="The saved file (or dataset id) to take the column from")
+    parser.add_argument("--downstream", action="store_true", help="List what the column feeds instead of what feeds it")
+    parser.add_argument("--cache-dir", help="Reuse parse results for unchanged files from this directory")
+    parser.add_argument("--optimize", action="store_true", help="Run the IR optimizer passes first")
+    parser.add_argument("--content-ids", action="store_true", help="Name operations by a hash of their content and inputs")
+    args = parser.parse_args(argv)
+    input_path = Path(args.file)
+
+    if not input_path.exists():
+        print(f"❌ Error: File not found: {input_path}")
+        sys.exit(1)
+
+    if input_path.suffix.lower() in (".yaml", ".yml"):
+        data = yaml.safe_load(input_path.read_text(encoding="utf-8")) or {}
+        if "lineage" not in data:
+            print(f"❌ Error: {input_path.name} has no lineage block (export it with --lineage)")
+            sys.exit(1)
+        index = LineageIndex.from_dict(data["lineage"])
     else:
-        print("💾 Exporting YAML Artifact...")
-        exporter = IrYamlExporter()
-        output_file = input_path.with_suffix(".yaml")
-        exporter.export(pipeline, str(output_file))
-        print(f"✅ Success! Pipeline spec saved to: {output_file}")
+        index = LineageIndex.from_pipeline(build_pipeline(input_path, args))
+
+    try:
+        result = index.downstream(args.column, args.dataset) if args.downstream else index.upstream(args.column, args.dataset)
+    except KeyError as e:
+        print(f"❌ Error: {e.args[0]}")
+        sys.exit(1)
+
+    leaves, reached = ("End results", "Feeds") if args.downstream else ("Source columns", "Computed from")
+    print(f"🧬 {args.column}" + (f" in {args.dataset}" if args.dataset else ""))
+    print(f"    {leaves}: " + (", ".join(map(str, result.leaves)) or "none"))
+    print(f"    {reached}: " + (", ".join(map(str, result.columns)) or "nothing"))
+    print("    Operations: " + (", ".join(result.operations) or "none"))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,7 +1,190 @@
 import yaml
 import pandas as pd
+import re
 import sys
 import os
+from functools import lru_cache
+
+from spec_generator.importers.spss.parsers.expressions import pandas_text, parse_expression
+from spec_generator.importers.spss.inline_data import read_inline_data
+
+# Columns the optimizer adds for its own use (shared sub-expressions, IF masks)
+HIDDEN_PREFIXES = ("__cse_", "__mask_")
+
+@lru_cache(maxsize=1024)
+def to_query(condition):
+    # SPSS expression -> pandas query/eval syntax, rendered from the parsed
+    # tree so every operator spelling (~=, NE, GE, AND, NOT, ...) translates
+    tree = parse_expression(" ".join(condition.splitlines()))
+    if tree is not None:
+        return pandas_text(tree)
+    # Not an expression the parser knows: only the equality operators differ
+    clean_cond = " ".join(condition.splitlines()).replace("<>", "!=")
+    return re.sub(r"(?<![<>!=])=(?!=)", "==", clean_cond)
+
+def load_dtypes(pipeline, outputs):
+    # Declared types of a load's columns, for read_csv(dtype=). Only strings:
+    # numeric formats all come through as 'integer' (even F8.2), so pandas infers those.
+    dtypes = {}
+    for ds in pipeline.get('datasets', []):
+        if ds['id'] in outputs:
+            for col in ds.get('columns', []):
+                if col.get('type') == 'string':
+                    dtypes[col['name']] = str
+    return dtypes
+
+# Planned dtype (DtypePlanningPass) -> what read_csv gets. numpy ints fail on a
+# missing value; the nullable ones don't, but parse several times slower: they
+# are the second try, and settle_dtypes() then makes them numpy ints, or floats
+# where something is missing (as pandas would).
+READ_DTYPES = {'int32': 'int32', 'int64': 'int64', 'float64': 'float64', 'category': 'category', 'string': str, 'date': str}
+NULLABLE_DTYPES = {'int32': 'Int32', 'int64': 'Int64'}
+INT32_RANGE = (-2 ** 31, 2 ** 31 - 1)
+
+def planned_dtypes(path, planned, nullable=False):
+    # Plans use the script's spelling; match the file's header case-insensitively
+    header = {str(col).upper(): col for col in pd.read_csv(path, nrows=0).columns}
+    dtypes = {**READ_DTYPES, **NULLABLE_DTYPES} if nullable else READ_DTYPES
+    return {
+        header[name.upper()]: dtypes[dtype]
+        for name, dtype in planned.items() if name.upper() in header and dtype in dtypes
+    }
+
+def settle_dtypes(df):
+    for col in df.columns:
+        if str(df[col].dtype) in ('Int32', 'Int64'):
+            df[col] = df[col].astype('float64') if df[col].hasnans else df[col].astype(str(df[col].dtype).lower())
+    return df
+
+def widened(df, expr):
+    # numpy int32 arithmetic wraps silently: evaluate on int64 copies of the int32 columns read
+    narrow = [name for name in set(re.findall(r"[A-Za-z_]\w*", expr)) if name in df.columns and df[name].dtype == 'int32']
+    return df.assign(**{name: df[name].astype('int64') for name in narrow}) if narrow else df
+
+def as_planned(values, dtype):
+    # A computed column in its planned dtype, where nothing is lost (missing values stay float)
+    if not isinstance(values, pd.Series) or dtype not in ('int32', 'int64', 'float64'):
+        return values
+    if dtype == 'float64':
+        return values.astype('float64') if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values) else values
+    if not pd.api.types.is_integer_dtype(values) or pd.api.types.is_bool_dtype(values):
+        return values
+    if dtype == 'int32' and len(values) and (values.min() < INT32_RANGE[0] or values.max() > INT32_RANGE[1]):
+        return values # The data broke its declared format
+    return values.astype(dtype)
+
+def compute_columns(df, op):
+    # Adds the op's columns to 'df' in place (the caller owns the frame)
+    params = op.get('parameters', {})
+    computes = []
+    if op['type'] == 'batch_compute' or 'computes' in params: # Fused by the optimizer
+        computes = params.get('computes', [])
+    elif 'target' in params:
+        computes = [{key: params[key] for key in ('target', 'expression', 'condition') if key in params}]
+    else:
+        print(f"  ⚠️ Skipping unsupported compute: {op['id']}")
+        return df
+        
+    print(f"  [{op['id']}] Computing {len(computes)} variables...")
+    dtypes = params.get('dtypes', {})
+    
+    for comp in computes:
+        target = comp['target']
+        # Expressions keep their source layout; eval wants one line
+        expr = " ".join(comp['expression'].splitlines())
+        # Trivial translation from SQL-like/SPSS logic to Pandas
+        # Note: 'eval' handles simple math (revenue - cost) automatically
+        try:
+            frame = widened(df, expr + " " + comp.get('condition', ''))
+            values = frame.eval(to_query(expr))
+            if comp.get('condition'):
+                # IF: only where the condition holds; elsewhere the old value (or missing)
+                mask = pd.Series(frame.eval(to_query(comp['condition'])), index=df.index).fillna(False).astype(bool)
+                old = df[target] if target in df.columns else float('nan')
+                values = pd.Series(values, index=df.index).where(mask, old)
+            df[target] = as_planned(values, dtypes.get(target))
+        except Exception as e:
+            print(f"    ⚠️ Error evaluating '{expr}': {e}")
+    return df
+
+def select_rows(df, condition):
+    query = to_query(condition)
+    frame = widened(df, query)
+    return df.query(query) if frame is df else df.loc[frame.eval(query)]
+
+def filter_rows(df, op):
+    condition = op.get('parameters', {}).get('condition')
+    print(f"  [{op['id']}] Filtering: {condition}")
+    try:
+        return select_rows(df, condition)
+    except Exception as e:
+        print(f"    ⚠️ Filter failed: {e}")
+        return df
+
+# Ops a stage can hold -> step(df, op) -> df
+STAGE_STEPS = {
+    'compute_columns': compute_columns,
+    'filter_rows': filter_rows,
+}
+
+def run_stage(stage_ops, state):
+    # A stage planned by the optimizer: one frame, no datasets in between
+    df = state[stage_ops[0]['inputs'][0]].copy()
+    print(f"  [{stage_ops[0]['parameters']['stage']}] Running {len(stage_ops)} ops in one pass...")
+    for op in stage_ops:
+        df = STAGE_STEPS[op['type']](df, op)
+    for out_id in stage_ops[-1]['outputs']:
+        state[out_id] = df
+
+def row_filters(params):
+    # SELECT IFs the optimizer pushed into a load, one condition each (older IR: one string)
+    filters = params.get('row_filter') or []
+    return [filters] if isinstance(filters, str) else list(filters)
+
+def apply_filters(df, filters):
+    # Like the FILTER ops they came from: one that fails is skipped, the others still apply.
+    # Returns the frame and the conditions that failed
+    failed = []
+    for condition in filters:
+        try:
+            df = select_rows(df, condition)
+        except Exception as e:
+            print(f"    ⚠️ Filter failed: {e}")
+            failed.append(condition)
+    return df, failed
+
+def read_load(real_path, read_args, filters, op_id):
+    if not filters:
+        return settle_dtypes(pd.read_csv(real_path, **read_args))
+    # Drop rows chunk by chunk
+    print(f"  [{op_id}] Filtering while reading: {' & '.join(filters)}")
+    parts = []
+    for chunk in pd.read_csv(real_path, chunksize=100_000, **read_args):
+        chunk, failed = apply_filters(settle_dtypes(chunk), filters)
+        if failed: # Earlier chunks lost rows only these dropped: read again without them
+            return read_load(real_path, read_args, [c for c in filters if c not in failed], op_id)
+        parts.append(chunk)
+    return pd.concat(parts) if parts else settle_dtypes(pd.read_csv(real_path, **read_args))
+
+def inline_frame(pipeline, op):
+    # DATA LIST + BEGIN DATA: the records come with the op, not from a file.
+    # Projection may have cut the schema down: read every variable, keep the loaded ones
+    params = op.get('parameters', {})
+    types = {}
+    for ds in pipeline.get('datasets', []):
+        if ds['id'] in op['outputs']:
+            for col in ds.get('columns', []):
+                types.setdefault(col['name'], col.get('type', 'unknown'))
+    variables = [(name, types.get(name, 'string')) for name in params.get('variables', [])]
+    df = pd.DataFrame(read_inline_data(params.get('data', ''), variables))
+    if params.get('columns'):
+        wanted = {name.upper() for name in params['columns']}
+        df = df[[col for col in df.columns if col.upper() in wanted]]
+    filters = row_filters(params)
+    if filters:
+        print(f"  [{op['id']}] Filtering while reading: {' & '.join(filters)}")
+        df, _ = apply_filters(df, filters)
+    return df
 
 def run_interpreter(yaml_path, input_csv_map, output_dir):
     print(f"🔮 Interpreter: Executing {yaml_path}...")
@@ -13,13 +196,32 @@ def run_interpreter(yaml_path, input_csv_map, output_dir):
     # Key = dataset_id (e.g., 'ds_001'), Value = DataFrame
     state = {}
 
+    # Stage id -> its ops in order; a stage runs when its first op comes up
+    stages = {}
+    for op in pipeline['operations']:
+        stage = op.get('parameters', {}).get('stage')
+        if stage:
+            stages.setdefault(stage, []).append(op)
+
     for op in pipeline['operations']:
         op_type = op['type']
         op_id = op['id']
         params = op.get('parameters', {})
+
+        if params.get('stage'):
+            stage_ops = stages.pop(params['stage'], None)
+            if stage_ops: # Later ops of the stage already ran
+                run_stage(stage_ops, state)
+            continue
         
         # 1. LOAD
-        if op_type == 'load_csv':
+        if op_type == 'load_csv' and params.get('source_type') == 'inline':
+            print(f"  [{op_id}] Reading inline data...")
+            df = inline_frame(pipeline, op)
+            for out_id in op['outputs']:
+                state[out_id] = df.copy()
+
+        elif op_type == 'load_csv':
             # Determine filename: Check params first, then the explicit input map
             filename = params.get('filename')
             # If the filename from YAML matches a key in our input map, use the real path
@@ -27,7 +229,27 @@ def run_interpreter(yaml_path, input_csv_map, output_dir):
             real_path = input_csv_map.get(filename, filename)
             
             print(f"  [{op_id}] Loading {real_path}...")
-            df = pd.read_csv(real_path)
+            read_args = {}
+            if params.get('columns'):
+                # Projection pushed into the load by the optimizer: skip unused columns
+                wanted = {name.upper() for name in params['columns']}
+                read_args['usecols'] = lambda col: col.upper() in wanted
+                read_args['dtype'] = load_dtypes(pipeline, op['outputs'])
+                print(f"  [{op_id}] Reading {len(wanted)} columns: {', '.join(params['columns'])}")
+            filters = row_filters(params)
+            declared = read_args.get('dtype')
+            plans = []
+            if params.get('dtypes'):
+                # Dtypes planned by the optimizer (int32, category, ...)
+                plans = [planned_dtypes(real_path, params['dtypes'], nullable) for nullable in (False, True)]
+            for planned in plans:
+                try:
+                    df = read_load(real_path, {**read_args, 'dtype': {**(declared or {}), **planned}}, filters, op_id)
+                    break
+                except (ValueError, TypeError, OverflowError) as e:
+                    print(f"    ⚠️ Planned dtypes failed: {e}")
+            else: # No plan, or the data doesn't fit its declared formats: let pandas infer
+                df = read_load(real_path, read_args, filters, op_id)
             
             # Register outputs
             for out_id in op['outputs']:
@@ -36,44 +258,14 @@ def run_interpreter(yaml_path, input_csv_map, output_dir):
         # 2. COMPUTE (Batch or Single)
         elif op_type in ['compute_columns', 'batch_compute']:
             in_id = op['inputs'][0]
-            df = state[in_id].copy()
-            
-            computes = []
-            if op_type == 'batch_compute':
-                computes = params.get('computes', [])
-            else:
-                computes = [{'target': params['target'], 'expression': params['expression']}]
-                
-            print(f"  [{op_id}] Computing {len(computes)} variables...")
-            
-            for comp in computes:
-                target = comp['target']
-                expr = comp['expression']
-                # Trivial translation from SQL-like/SPSS logic to Pandas
-                # Note: 'eval' handles simple math (revenue - cost) automatically
-                try:
-                    df[target] = df.eval(expr)
-                except Exception as e:
-                    print(f"    ⚠️ Error evaluating '{expr}': {e}")
-            
+            df = compute_columns(state[in_id].copy(), op)
             for out_id in op['outputs']:
                 state[out_id] = df
 
         # 3. FILTER
         elif op_type in ['filter_rows', 'select_if']: # Handle aliases
             in_id = op['inputs'][0]
-            df = state[in_id]
-            condition = params.get('condition')
-            
-            print(f"  [{op_id}] Filtering: {condition}")
-            try:
-                # Pandas query syntax is very similar to SQL/SPSS
-                # We might need light regex replacement here (e.g. '=' to '==')
-                clean_cond = condition.replace("=", "==").replace("====", "==") 
-                df = df.query(clean_cond)
-            except Exception as e:
-                print(f"    ⚠️ Filter failed: {e}")
-
+            df = filter_rows(state[in_id], op)
             for out_id in op['outputs']:
                 state[out_id] = df
 
@@ -87,6 +279,9 @@ def run_interpreter(yaml_path, input_csv_map, output_dir):
         elif op_type == 'save_binary' or op_type == 'save_csv':
             in_id = op['inputs'][0]
             df = state[in_id]
+            hidden = [col for col in df.columns if str(col).startswith(HIDDEN_PREFIXES)]
+            if hidden:
+                df = df.drop(columns=hidden)
             out_filename = params.get('filename', 'output.csv')
             out_path = os.path.join(output_dir, f"verified_{out_filename}")
             
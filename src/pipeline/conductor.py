@@ -1,11 +1,15 @@
 from pathlib import Path
+from typing import Optional
+from spec_generator.importers.spss.cache import AstCache
 from spec_generator.importers.spss.parser import SpssParser
 from spec_generator.importers.spss.graph_builder import GraphBuilder
 from spec_generator.exporters.yaml import IrYamlExporter
 
 class SpecConductor:
-    def __init__(self):
+    def __init__(self, cache_dir: Optional[str] = None):
         self.parser = SpssParser()
+        # Optional parse cache: unchanged scripts skip lexing and parsing
+        self.cache = AstCache(cache_dir, type(self.parser)) if cache_dir else None
         self.builder = GraphBuilder()
         self.exporter = IrYamlExporter()
 
@@ -17,18 +21,26 @@ class SpecConductor:
         out_dir = Path(output_dir)
         out_dir.mkdir(parents=True, exist_ok=True)
         
-        print(f"📖 Reading {in_file.name}...")
-        with open(in_file, "r", encoding="utf-8") as f:
-            code = f.read()
+        if self.cache:
+            print(f"📖 Reading {in_file.name}...")
+            with open(in_file, "r", encoding="utf-8") as f:
+                code = f.read()
 
-        # 1. Parse Syntax
-        print("🔍 Parsing Syntax...")
-        ast_nodes = self.parser.parse(code)
-        print(f"   Found {len(ast_nodes)} commands.")
+            # 1. Parse Syntax
+            print("🔍 Parsing Syntax...")
+            ast_nodes = self.cache.load_or_parse(code, self.parser.parse)
+            print(f"   Found {len(ast_nodes)} commands (cache: {self.cache.hits} hits, {self.cache.misses} misses).")
 
-        # 2. Build Graph (Semantics)
-        print("🧠 Building Logic Graph...")
-        pipeline = self.builder.build(ast_nodes)
+            # 2. Build Graph (Semantics)
+            print("🧠 Building Logic Graph...")
+            pipeline = self.builder.build(ast_nodes)
+        else:
+            # 1+2. Parse and build in one pass: the file is streamed command
+            # by command and the AST is never held as a whole
+            print(f"📖 Streaming {in_file.name} (parse + logic graph)...")
+            with open(in_file, "r", encoding="utf-8") as f:
+                pipeline = self.builder.build_stream(self.parser.parse_iter(f))
+            print(f"   Built {len(pipeline.operations)} operations.")
         
         # 3. Validate
         print("🛡️ Validating Integrity...")
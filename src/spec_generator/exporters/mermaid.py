@@ -51,6 +51,9 @@ class MermaidExporter:
     def _get_label(self, op) -> str:
         # Smart labels based on context
         if op.type == OpType.COMPUTE_COLUMNS:
+            if 'computes' in op.parameters: # Batch from the optimizer
+                targets = ", ".join(c['target'] for c in op.parameters['computes'])
+                return f"COMPUTE<br/>{targets} = ..."
             return f"COMPUTE<br/>{op.parameters.get('target')} = ..."
         if op.type == OpType.FILTER_ROWS:
             return f"FILTER<br/>{op.parameters.get('condition')}"
@@ -2,28 +2,33 @@ import yaml
 from etl_ir.model import Pipeline, Dataset, Operation
 
 class IrYamlExporter:
-    def export(self, pipeline: Pipeline, output_path: str):
+    def __init__(self, share_schemas: bool = False):
+        # share_schemas: write each distinct column schema once, in a top-level
+        # 'schemas' list, and give datasets a 'schema' id instead of 'columns'.
+        # A derived schema is written as its parent plus the one column that
+        # changed ('position' == parent length means appended).
+        self.share_schemas = share_schemas
+
+    def export(self, pipeline: Pipeline, output_path: str, lineage=None):
+        # lineage: a LineageIndex, written as a top-level 'lineage' block
         data = self._to_dict(pipeline)
-        
+        if lineage is not None:
+            data["lineage"] = lineage.to_dict()
+
         with open(output_path, "w", encoding="utf-8") as f:
             # sort_keys=False preserves our logical ordering
             yaml.dump(data, f, sort_keys=False, default_flow_style=False)
 
     def _to_dict(self, pipeline: Pipeline) -> dict:
-        return {
+        schemas = [] if self.share_schemas else None
+        schema_ids = {}
+        doc = {
             "metadata": {
                 "generator": "SpecGen v0.1",
                 "source_type": "SPSS"
             },
             "datasets": [
-                {
-                    "id": ds.id,
-                    "source": ds.source,
-                    "columns": [
-                        {"name": col.name, "type": col.type.value} 
-                        for col in ds.columns
-                    ]
-                }
+                self._dataset_dict(ds, schemas, schema_ids)
                 for ds in pipeline.datasets
             ],
             "operations": [
@@ -36,4 +41,44 @@ class IrYamlExporter:
                 }
                 for op in pipeline.operations
             ]
-        }
\ No newline at end of file
+        }
+        if schemas is not None:
+            doc = {"metadata": doc["metadata"], "schemas": schemas, **doc}
+        return doc
+
+    def _dataset_dict(self, ds: Dataset, schemas, schema_ids: dict) -> dict:
+        if schemas is None:
+            return {
+                "id": ds.id,
+                "source": ds.source,
+                "columns": [self._column_dict(col) for col in ds.columns]
+            }
+        return {"id": ds.id, "source": ds.source, "schema": self._schema_id(ds.columns, schemas, schema_ids)}
+
+    def _schema_id(self, columns, schemas: list, schema_ids: dict) -> str:
+        """Id of a schema entry, writing it (and any unwritten ancestors) on first sight."""
+        # Keyed by object identity: GraphBuilder shares one ColumnSchema per version
+        pending = []
+        node = columns
+        while node is not None and id(node) not in schema_ids:
+            pending.append(node)
+            node = getattr(node, "parent", None) # ColumnSchema: parent + one change
+
+        for node in reversed(pending): # Oldest first, so parents get ids first
+            parent = getattr(node, "parent", None)
+            if parent is not None:
+                entry = {
+                    "parent": schema_ids[id(parent)],
+                    "position": node.index,
+                    "column": self._column_dict(node.column),
+                }
+            else:
+                entry = {"columns": [self._column_dict(col) for col in node]}
+            schema_id = f"schema_{len(schemas) + 1:03d}"
+            schemas.append({"id": schema_id, **entry})
+            schema_ids[id(node)] = schema_id
+        return schema_ids[id(columns)]
+
+    @staticmethod
+    def _column_dict(col) -> dict:
+        return {"name": col.name, "type": col.type.value}
@@ -1,84 +1,133 @@
 from dataclasses import dataclass, field
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 from etl_ir.types import DataType
 
 
+# All AST classes are slotted: no per-instance __dict__, which matters when
+# many large ASTs are held at once. Expression trees are also frozen (they are
+# never edited after parsing); command nodes stay mutable because the parser
+# links inline data and shifts source offsets after construction.
 
-@dataclass
+# ------------------------------------------------------------------------------
+# Expression tree (built by parsers/expressions.py)
+# ------------------------------------------------------------------------------
+
+@dataclass(frozen=True, slots=True)
+class Expr:
+    """Base of the typed expression tree hung off COMPUTE / IF / SELECT IF."""
+
+@dataclass(frozen=True, slots=True)
+class Literal(Expr):
+    value: Union[int, float, str] = 0
+
+@dataclass(frozen=True, slots=True)
+class ColumnRef(Expr):
+    name: str = ""
+
+@dataclass(frozen=True, slots=True)
+class UnaryOp(Expr):
+    op: str = "-"           # '-', '+', 'NOT'
+    operand: Expr = None
+
+@dataclass(frozen=True, slots=True)
+class BinaryOp(Expr):
+    op: str = "+"           # Canonical: + - * / ** = <> < > <= >= AND OR
+    left: Expr = None
+    right: Expr = None
+
+@dataclass(frozen=True, slots=True)
+class FunctionCall(Expr):
+    name: str = ""          # Upper-cased, e.g. 'TRUNC', 'DATE.DMY'
+    args: Tuple[Expr, ...] = ()  # A tuple, so call trees stay hashable
+
+
+@dataclass(slots=True)
 class AstNode:
     raw_command: str = "UNKNOWN" 
 
-@dataclass
+@dataclass(slots=True)
 class IgnorableNode(AstNode):
     """Represents a command that has NO impact on the data flow (Metadata/Reporting)"""
     # 🟢 Fix: Add default value = "" to satisfy inheritance rules
     command: str = "UNKNOWN"
     content: str = ""
 
-@dataclass
+@dataclass(slots=True)
 class LoadNode(AstNode):
     filename: str = ""
     file_type: str = "TXT"
     columns: List[Tuple[str, DataType]] = field(default_factory=list)
+    formats: Dict[str, str] = field(default_factory=dict) # Column -> declared format ('F8.2', 'A10')
 
-@dataclass
+@dataclass(slots=True)
 class ComputeNode(AstNode):
     target: str = ""
     expression: str = ""
+    expression_tree: Optional[Expr] = None # None if the expression didn't parse
 
-@dataclass
+@dataclass(slots=True)
 class IfNode(AstNode):
     # 🟢 FIX: Add defaults (= "") to satisfy inheritance rules
     condition: str = ""
     target: str = ""
     expression: str = ""
+    condition_tree: Optional[Expr] = None
+    expression_tree: Optional[Expr] = None
     
-@dataclass
-class FilterNode(AstNode): # 🟢 New
-    condition: str = ""
-
-@dataclass
+@dataclass(slots=True)
 class FilterNode(AstNode): # 🟢 New
     condition: str = ""
+    condition_tree: Optional[Expr] = None
 
-@dataclass
+@dataclass(slots=True)
 class MaterializeNode(AstNode): # 🟢 New
     pass
 
-@dataclass
+@dataclass(slots=True)
 class SaveNode(AstNode):
     filename: str = ""
 
-@dataclass
+@dataclass(slots=True)
 class GenericNode(AstNode):
     command: str = ""
     params: Dict[str, str] = field(default_factory=dict)
 
-@dataclass
+@dataclass(slots=True)
 class JoinNode(AstNode):
     """Represents MATCH FILES."""
     sources: List[str] = field(default_factory=list)
     by: List[str] = field(default_factory=list)    
+    tables: List[str] = field(default_factory=list) # Sources given with /TABLE (keyed lookups)
 
 
-@dataclass
+@dataclass(slots=True)
 class AggregateNode(AstNode):
     outfile: str = ""
     break_vars: List[str] = field(default_factory=list)
     aggregations: List[str] = field(default_factory=list) # e.g. ["mean_x = MEAN(x)"]    
 
 
-@dataclass
+@dataclass(slots=True)
+class InlineDataNode(AstNode):
+    """Raw BEGIN DATA ... END DATA payload; 'start'/'end' are source offsets."""
+    start: int = 0
+    end: int = 0
+    content: str = ""
+
+
+@dataclass(slots=True)
 class DataListNode(AstNode):
     columns: List[Tuple[str, DataType]] = field(default_factory=list)    
+    data: Optional[InlineDataNode] = None # Filled in when a BEGIN DATA block follows
+    formats: Dict[str, str] = field(default_factory=dict) # Column -> declared format ('F3.0', 'A10')
 
 
-@dataclass
+@dataclass(slots=True)
 class RecodeNode(AstNode):
     source_vars: List[str] = field(default_factory=list)
     target_vars: List[str] = field(default_factory=list)
     map_logic: str = ""    
 
-@dataclass
+@dataclass(slots=True)
 class SortNode(AstNode):
     keys: List[str] = field(default_factory=list)
\ No newline at end of file
@@ -0,0 +1,136 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import zlib
+from pathlib import Path
+from typing import Callable, List, Optional, Type, Union
+
+from spec_generator.importers.spss.ast import AstNode
+from spec_generator.importers.spss.grammar import SPSS_TOKENS
+from spec_generator.importers.spss.parser import PARSER_VERSION, SpssParser
+
+_SUFFIX = ".ast"
+
+
+def _grammar_fingerprint() -> str:
+    """Changes whenever a token rule is added, reordered or edited."""
+    rules = "\n".join(f"{t.name}:{p.flags}:{p.pattern}" for t, p in SPSS_TOKENS)
+    return hashlib.sha256(rules.encode("utf-8")).hexdigest()
+
+
+def _command_fingerprint(parser_cls: Type[SpssParser]) -> str:
+    """Changes whenever a command is registered, or a handler's code changes."""
+    entries = []
+    for keyword, handler in sorted(parser_cls._commands.items(), key=lambda item: str(item[0])):
+        code = getattr(handler, "__code__", None)
+        body = hashlib.sha256(code.co_code).hexdigest() if code is not None else ""
+        entries.append(f"{keyword}:{handler.__module__}.{getattr(handler, '__qualname__', repr(handler))}:{body}")
+    return hashlib.sha256("\n".join(entries).encode("utf-8")).hexdigest()
+
+
+class AstCache:
+    """
+    Content-addressed on-disk cache of parse results.
+
+    Entries are keyed by a hash of the source text, the grammar,
+    PARSER_VERSION and the command table of 'parser_cls' (runtime
+    registrations included), so an unchanged script is never lexed or
+    parsed twice and any parser change invalidates old entries. Each
+    entry is the pickled List[AstNode], zlib-compressed, in its own file.
+    When the directory grows past 'max_bytes' the least recently used
+    entries (by mtime, refreshed on every hit) are evicted.
+
+    Unpickling runs code, so the directory must be private: it is created
+    owner-only (0o700), and an existing one that isn't owned by the
+    current user, or that others can access, is refused with
+    PermissionError before anything is loaded from it.
+    """
+
+    def __init__(self, directory: Union[str, Path], parser_cls: Type[SpssParser] = SpssParser,
+                 max_bytes: int = 256 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        self._check_private()
+        self.parser_cls = parser_cls
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._salt = f"{PARSER_VERSION}\n{_grammar_fingerprint()}\n".encode("utf-8")
+
+    def key(self, code: str) -> str:
+        # Commands can be registered at any time: fingerprint the table per key
+        salt = self._salt + _command_fingerprint(self.parser_cls).encode("utf-8")
+        return hashlib.sha256(salt + code.encode("utf-8")).hexdigest()
+
+    def get(self, code: str) -> Optional[List[AstNode]]:
+        self._check_private()
+        path = self._path(self.key(code))
+        try:
+            nodes = pickle.loads(zlib.decompress(path.read_bytes()))
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception:
+            # Truncated or foreign file: drop it and parse again
+            path.unlink(missing_ok=True)
+            self.misses += 1
+            return None
+
+        try:
+            os.utime(path) # Mark as recently used
+        except OSError:
+            pass # Evicted by another process since the read: the nodes are still good
+        self.hits += 1
+        return nodes
+
+    def put(self, code: str, nodes: List[AstNode]):
+        payload = zlib.compress(pickle.dumps(nodes, protocol=pickle.HIGHEST_PROTOCOL))
+        # Write-then-rename so concurrent builds never read half an entry
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp, self._path(self.key(code)))
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        self._evict()
+
+    def load_or_parse(self, code: str, parse: Callable[[str], List[AstNode]]) -> List[AstNode]:
+        """Returns the cached AST for 'code', or parses it and stores the result."""
+        nodes = self.get(code)
+        if nodes is None:
+            nodes = parse(code)
+            self.put(code, nodes)
+        return nodes
+
+    def _check_private(self):
+        if not hasattr(os, "getuid"): # No POSIX owners and modes (Windows)
+            return
+        stat = self.directory.stat()
+        if stat.st_uid != os.getuid() or stat.st_mode & 0o077:
+            raise PermissionError(
+                f"Parse cache {self.directory} must be owned by the current user and private (chmod 700)"
+            )
+
+    def _path(self, key: str) -> Path:
+        return self.directory / (key + _SUFFIX)
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for path in self.directory.glob("*" + _SUFFIX):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue # Evicted by another process
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
@@ -0,0 +1,188 @@
+from collections.abc import Sequence
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic_core import SchemaSerializer, core_schema
+from etl_ir.model import Column
+from etl_ir.types import DataType
+
+# A derived schema is compacted into a new base once its chain of changes
+# reaches this depth, so index/lookup walks stay short.
+MAX_CHAIN = 32
+
+
+class ColumnSchema(Sequence):
+    """
+    Immutable column list that derived datasets share instead of copying.
+
+    A schema is either a base (a tuple of columns) or its parent plus one
+    change: a column replaced in place or appended. Deriving a schema is
+    O(1) however wide it is, so memory grows with the number of changes,
+    not with ops x columns. Build them through a SchemaTable, which
+    hash-conses equal derivations into one object.
+
+    Every MAX_CHAIN changes the chain is compacted into a stored base.
+    A compacted schema still records its parent and change, so exporters
+    can write it as a delta.
+
+    Reads like a list (len, indexing, iteration, ==, copy()) and serializes
+    as one, so it can stand in for Dataset.columns.
+    """
+    __slots__ = ("parent", "column", "index", "depth", "_length", "_base")
+
+    # Lets pydantic dump a Dataset holding a schema (as a plain list)
+    __pydantic_serializer__ = SchemaSerializer(core_schema.any_schema(
+        serialization=core_schema.plain_serializer_function_ser_schema(list)
+    ))
+
+    def __init__(self, base: Optional[Tuple[Column, ...]] = None, parent: "ColumnSchema" = None,
+                 column: Column = None, index: int = 0):
+        self.parent = parent
+        self.column = column
+        self.index = index
+        if base is not None or parent is None:
+            self.depth = 0
+            self._base = base if base is not None else ()
+            self._length = len(self._base)
+        else:
+            self.depth = parent.depth + 1
+            self._length = len(parent) + (index == len(parent))
+            self._base = None
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._materialize()[index]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("column index out of range")
+        node = self
+        while node._base is None:
+            if node.index == index:
+                return node.column
+            node = node.parent
+        return node._base[index]
+
+    def __iter__(self) -> Iterator[Column]:
+        return iter(self._materialize())
+
+    def __eq__(self, other) -> bool:
+        if self is other:
+            return True
+        if isinstance(other, (ColumnSchema, list, tuple)):
+            return len(self) == len(other) and self._materialize() == list(other)
+        return NotImplemented
+
+    __hash__ = None # Mutable-list semantics for ==; SchemaTable keys by identity
+
+    def __repr__(self) -> str:
+        return repr(self._materialize())
+
+    def copy(self) -> List[Column]:
+        """A plain, mutable list of the columns (like list.copy())."""
+        return self._materialize()
+
+    def index_of(self, name: str) -> int:
+        """Position of the first column called 'name', or -1 (linear; see SchemaTable.index_of)."""
+        # A change never renames a position, so the newest mention of a name wins
+        node = self
+        while node._base is None:
+            if node.column.name == name:
+                return node.index
+            node = node.parent
+        return next((idx for idx, col in enumerate(node._base) if col.name == name), -1)
+
+    def get(self, name: str) -> Optional[Column]:
+        idx = self.index_of(name)
+        return self[idx] if idx >= 0 else None
+
+    def _materialize(self) -> List[Column]:
+        changes = []
+        node = self
+        while node._base is None:
+            changes.append(node)
+            node = node.parent
+        columns = list(node._base)
+        for change in reversed(changes):
+            if change.index == len(columns):
+                columns.append(change.column)
+            else:
+                columns[change.index] = change.column
+        return columns
+
+
+class SchemaTable:
+    """
+    Hash-consing factory for ColumnSchema and Column objects, one per build.
+    Equal bases, and the same change applied to the same parent, always
+    return the same object, so unchanged schemas are shared by reference.
+    Also keeps one name -> positions index for every schema it made, so
+    lookups never need a per-schema dict.
+    """
+
+    def __init__(self):
+        self._bases: Dict[Tuple[Tuple[str, DataType], ...], ColumnSchema] = {}
+        # (id(parent), name, type) -> (parent, result); the parent is kept so its id stays unique
+        self._derived: Dict[Tuple[int, str, DataType], Tuple[ColumnSchema, ColumnSchema]] = {}
+        self._columns: Dict[Tuple[str, DataType], Column] = {}
+        # Name -> every position it has held in any schema from this table, ascending
+        self._positions: Dict[str, List[int]] = {}
+        self.empty = self.base(())
+
+    def column(self, name: str, col_type: DataType) -> Column:
+        col = self._columns.get((name, col_type))
+        if col is None:
+            col = self._columns[(name, col_type)] = Column(name=name, type=col_type)
+        return col
+
+    def base(self, columns: Iterable[Column]) -> ColumnSchema:
+        columns = tuple(columns)
+        key = tuple((col.name, col.type) for col in columns)
+        schema = self._bases.get(key)
+        if schema is None:
+            schema = self._bases[key] = ColumnSchema(base=columns)
+            for idx, col in enumerate(columns):
+                self._add_position(col.name, idx)
+        return schema
+
+    def index_of(self, schema: ColumnSchema, name: str) -> int:
+        """ColumnSchema.index_of() through the shared index: O(chain depth)."""
+        for idx in self._positions.get(name, ()):
+            if idx < len(schema) and schema[idx].name == name:
+                return idx
+        return -1
+
+    def _add_position(self, name: str, idx: int):
+        positions = self._positions.setdefault(name, [])
+        if idx not in positions:
+            positions.append(idx)
+            positions.sort()
+
+    def with_column(self, parent: ColumnSchema, column: Column) -> ColumnSchema:
+        """'parent' with 'column' replacing the same-named column, or appended."""
+        key = (id(parent), column.name, column.type)
+        hit = self._derived.get(key)
+        if hit is not None:
+            return hit[1]
+
+        idx = self.index_of(parent, column.name)
+        if idx >= 0 and parent[idx].type == column.type:
+            schema = parent # Same name and type: nothing changes
+        else:
+            if idx < 0:
+                idx = len(parent)
+                self._add_position(column.name, idx)
+            if parent.depth >= MAX_CHAIN:
+                # Compact: a fresh base (its positions are all indexed already)
+                columns = parent.copy()
+                if idx == len(columns):
+                    columns.append(column)
+                else:
+                    columns[idx] = column
+                schema = ColumnSchema(base=tuple(columns), parent=parent, column=column, index=idx)
+            else:
+                schema = ColumnSchema(parent=parent, column=column, index=idx)
+        self._derived[key] = (parent, schema)
+        return schema
@@ -0,0 +1,74 @@
+import hashlib
+import json
+import re
+from typing import Dict, List
+
+from etl_ir.model import Pipeline
+
+# Hex digits kept in an id; the full digest is what gets chained
+ID_DIGITS = 12
+
+_GENERATED_OP = re.compile(r"^op_[0-9a-f]+_(.+)$")
+_GENERATED_DS = re.compile(r"^ds_[0-9a-f]+_(.+)$")
+
+
+def op_digest(op_type: str, parameters: dict, input_digests: List[str], schema=()) -> str:
+    """sha256 of an op's type, parameters and input digests (plus, for a load, its declared columns)."""
+    payload = json.dumps(
+        [op_type, parameters, input_digests, [[col.name, col.type.value] for col in schema]],
+        sort_keys=True, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def content_addressed(pipeline: Pipeline) -> Pipeline:
+    """
+    The pipeline with content-addressed ids, Merkle style.
+
+    Each op's digest covers its type, its parameters and the digests of
+    its inputs: a dataset's digest is that of the op that last wrote it
+    (its id, for external files nobody wrote). Ops become
+    'op_<digest>_<kind>' and generated datasets 'ds_<digest>_<kind>', so
+    an op keeps its id as long as it and everything upstream of it is
+    unchanged, whatever was inserted elsewhere in the script. Named
+    files ('source_x', 'file_x') keep their ids.
+
+    Identical work on identical inputs (the same SAVE twice, say) gets
+    distinct ids by hashing in its occurrence count.
+    """
+    schemas = {}
+    for ds in pipeline.datasets:
+        schemas.setdefault(ds.id, ds.columns)
+
+    current: Dict[str, str] = {}     # dataset id -> digest of its latest version
+    seen: Dict[str, int] = {}
+    renamed: Dict[str, str] = {}     # dataset id -> content id
+    operations = []
+    for op in pipeline.operations:
+        inputs = [current.get(ds_id, ds_id) for ds_id in op.inputs]
+        declared = () if op.inputs else [col for ds_id in op.outputs for col in schemas.get(ds_id) or ()]
+        digest = op_digest(op.type.value, op.parameters, inputs, declared)
+        count = seen.get(digest, 0)
+        seen[digest] = count + 1
+        if count:
+            digest = hashlib.sha256(f"{digest}#{count}".encode("utf-8")).hexdigest()
+
+        for idx, ds_id in enumerate(op.outputs):
+            current[ds_id] = digest if idx == 0 else hashlib.sha256(f"{digest}:{idx}".encode("utf-8")).hexdigest()
+            match = _GENERATED_DS.match(ds_id)
+            if match and ds_id not in renamed:
+                renamed[ds_id] = f"ds_{current[ds_id][:ID_DIGITS]}_{match.group(1)}"
+
+        match = _GENERATED_OP.match(op.id)
+        kind = match.group(1) if match else op.type.value
+        operations.append(op.model_copy(update={"id": f"op_{digest[:ID_DIGITS]}_{kind}"}))
+
+    operations = [
+        op.model_copy(update={
+            "inputs": [renamed.get(ds_id, ds_id) for ds_id in op.inputs],
+            "outputs": [renamed.get(ds_id, ds_id) for ds_id in op.outputs],
+        })
+        for op in operations
+    ]
+    datasets = [ds.model_copy(update={"id": renamed[ds.id]}) if ds.id in renamed else ds for ds in pipeline.datasets]
+    return pipeline.model_copy(update={"datasets": datasets, "operations": operations})
@@ -0,0 +1,412 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from etl_ir.model import Operation, Pipeline
+from etl_ir.types import OpType
+
+from spec_generator.importers.spss.column_schema import MAX_CHAIN
+from spec_generator.importers.spss.parsers.expressions import referenced_columns
+from spec_generator.ir_ops import compute_entries, is_expression_compute, is_sink, parsed_expression, row_filters
+
+
+@dataclass(frozen=True, slots=True)
+class ColumnVersion:
+    """One assignment of a column: 'x#2' is the second value 'x' was given."""
+    name: str     # First spelling seen for the (case-insensitive) name
+    version: int
+
+    def __str__(self) -> str:
+        return f"{self.name}#{self.version}"
+
+
+# A version as a scope holds it, with the position of the op it came in
+# with (to tell which boundary it predates)
+_Entry = Tuple[ColumnVersion, int]
+
+
+class VersionScope:
+    """
+    Which version of each column a dataset holds (upper-cased name ->
+    ColumnVersion). Like ColumnSchema, a derived scope is its parent plus
+    the versions that changed, compacted every MAX_CHAIN levels, so
+    deriving one is O(changes) however wide the dataset is.
+
+    A scope chain starts at a root whose 'origin' is the op that made the
+    dataset (a load, an aggregate, ...). A read of a name the scope has
+    never seen (a file with no declared columns) is taken as a column
+    that op brought in: it is defined there on first use.
+
+    An op that may rewrite any column (a GENERIC_TRANSFORM) is one
+    boundary scope (redefine_all()), not a new version of every column: a
+    column read below it gets its new version, from that op, on first
+    read. A column that passes several boundaries unread gets one new
+    version, from the last of them.
+    """
+    __slots__ = ("parent", "changes", "depth", "root", "boundary", "origin", "seq", "_defs")
+
+    def __init__(self, parent: "VersionScope" = None, changes: Dict[str, _Entry] = None,
+                 origin: Optional[str] = None, defs: "DefUseMap" = None, seq: int = -1,
+                 root: "VersionScope" = None, boundary: "VersionScope" = None):
+        self.parent = parent
+        self.changes = changes if changes is not None else {}
+        self.depth = parent.depth + 1 if parent is not None else 0
+        self.root = parent.root if parent is not None else (root or self)
+        self.boundary = parent.boundary if parent is not None else boundary
+        self.origin = origin
+        self.seq = seq
+        self._defs = defs
+
+    def _find(self, key: str) -> Optional[_Entry]:
+        """Newest entry for 'key' on the chain, stale or not."""
+        scope = self
+        while True:
+            entry = scope.changes.get(key)
+            if entry is not None or scope.parent is None:
+                break
+            scope = scope.parent
+        if entry is None and scope is not self.root: # Compacted: implicit columns live on the root
+            entry = self.root.changes.get(key)
+        return entry
+
+    def _current(self, key: str) -> Tuple[Optional[ColumnVersion], Optional[_Entry]]:
+        """(version held, None) or, if a boundary passed it on unread, (None, older entry)."""
+        entry = self._find(key)
+        boundary = self.boundary
+        if boundary is None or (entry is not None and entry[1] >= boundary.seq):
+            return (entry[0] if entry is not None else None), None
+        fresh = boundary.changes.get(key) # Defined there after this chain was compacted
+        return (fresh[0], None) if fresh is not None else (None, entry)
+
+    def get(self, key: str) -> Optional[ColumnVersion]:
+        """The version of upper-cased 'key' this dataset holds, if it has been defined."""
+        return self._current(key)[0]
+
+    def has(self, key: str) -> bool:
+        """Whether the dataset has a column 'key' so far (defined yet or not)."""
+        return self._find(key) is not None or (self.boundary is not None and key in self.boundary.changes)
+
+    def resolve(self, name: str) -> ColumnVersion:
+        """The version of 'name' this dataset holds, defining it on the root's origin if new."""
+        key = name.upper()
+        version, older = self._current(key)
+        if version is not None:
+            return version
+        if older is None:
+            root = self.root
+            version = root._defs.define(root.origin, name)
+            root.changes[key] = (version, root.seq)
+            if self.boundary is None:
+                return version
+            older = root.changes[key]
+        boundary = self.boundary
+        version = boundary._defs.define(boundary.origin, older[0].name, [older[0]])
+        boundary.changes[key] = (version, boundary.seq)
+        return version
+
+    def derive(self, versions: Dict[str, ColumnVersion], seq: int) -> "VersionScope":
+        """This scope with 'versions' (upper-cased name -> version), assigned by op number 'seq'."""
+        if not versions:
+            return self
+        changes = {key: (version, seq) for key, version in versions.items()}
+        if self.depth + 1 >= MAX_CHAIN:
+            return VersionScope(changes={**self._merged(), **changes}, root=self.root, boundary=self.boundary)
+        return VersionScope(parent=self, changes=changes)
+
+    def redefine_all(self, origin: str, seq: int) -> "VersionScope":
+        """A boundary below this scope: op 'origin' (number 'seq') may have changed every column."""
+        parent = self
+        previous = self.boundary
+        if previous is not None: # Versions defined there that a compacted chain doesn't show
+            carried = {}
+            for key, entry in previous.changes.items():
+                found = self._find(key)
+                if found is None or found[1] < entry[1]:
+                    carried[key] = entry
+            if carried:
+                parent = VersionScope(parent=self, changes=carried)
+        if parent.depth + 1 >= MAX_CHAIN:
+            parent = VersionScope(changes=parent._merged(), root=self.root, boundary=previous)
+        scope = VersionScope(parent=parent, origin=origin, defs=self.root._defs, seq=seq)
+        scope.boundary = scope
+        return scope
+
+    def _merged(self) -> Dict[str, _Entry]:
+        chain = []
+        scope = self
+        while scope is not None:
+            chain.append(scope.changes)
+            last, scope = scope, scope.parent
+        if last is not self.root:
+            chain.append(self.root.changes)
+        merged: Dict[str, _Entry] = {}
+        for changes in reversed(chain):
+            merged.update(changes)
+        return merged
+
+    def _names(self) -> Dict[str, str]:
+        names = {key: entry[0].name for key, entry in self._merged().items()}
+        if self.boundary is not None:
+            for key, (version, _) in self.boundary.changes.items():
+                names.setdefault(key, version.name)
+        return names
+
+    def defined(self) -> Dict[str, ColumnVersion]:
+        """The versions this dataset holds that are defined so far (as_dict() without defining any)."""
+        boundary = self.boundary
+        if boundary is None:
+            return {key: entry[0] for key, entry in self._merged().items()}
+        chain = [] # Only what came in since the boundary is current
+        scope = self
+        while scope is not None and scope is not boundary:
+            chain.append(scope.changes)
+            scope = scope.parent
+        chain.append(boundary.changes)
+        held: Dict[str, ColumnVersion] = {}
+        for changes in reversed(chain):
+            held.update((key, version) for key, (version, seq) in changes.items() if seq >= boundary.seq)
+        return held
+
+    def as_dict(self) -> Dict[str, ColumnVersion]:
+        """Every version this dataset holds, defining those a boundary passed on unread."""
+        return {key: self.resolve(name) for key, name in self._names().items()}
+
+    def __iter__(self) -> Iterator[ColumnVersion]:
+        return iter(self.as_dict().values())
+
+
+Sources = Union[List[ColumnVersion], VersionScope]
+
+
+class DefUseMap:
+    """
+    Def-use chains over column versions (see from_pipeline()).
+
+    'producer' maps a version to the id of the op that assigned it;
+    'defs' lists the versions each op assigned, and 'sources' the versions
+    each version was computed from. consumers() and uses() answer the
+    reading side. An op that reads every column (a SAVE, a
+    GENERIC_TRANSFORM, an expression that didn't parse) is one record for
+    the whole dataset, resolved against it when queried.
+    """
+
+    def __init__(self):
+        self.producer: Dict[ColumnVersion, Optional[str]] = {}
+        self.defs: Dict[str, List[ColumnVersion]] = {}
+        self.sources: Dict[ColumnVersion, Sources] = {}
+        # Saved dataset id -> its columns' versions, in schema order (from_pipeline(sinks=True))
+        self.sinks: Dict[str, List[ColumnVersion]] = {}
+        self._readers: Dict[ColumnVersion, List[str]] = {}
+        self._reads: Dict[str, List[ColumnVersion]] = {}
+        self._frames: Dict[str, VersionScope] = {} # Op id -> the dataset it reads all of
+        self._frame_index: Dict[ColumnVersion, List[str]] = {}
+        self._frame_index_key = (0, 0)
+        self._order: Dict[str, int] = {}           # Op id -> position in the pipeline
+        self._latest: Dict[str, ColumnVersion] = {} # Upper-cased name -> newest version
+
+    @classmethod
+    def from_pipeline(cls, pipeline: Pipeline, sinks: bool = False) -> "DefUseMap":
+        """
+        Versions every column the ops of 'pipeline' assign, in one pass.
+        With 'sinks', also fills in 'sinks' (which defines every column a
+        saved dataset holds).
+        """
+        return _Tracker(pipeline, sinks).run()
+
+    def define(self, op_id: Optional[str], name: str, sources: Union[Iterable[ColumnVersion], VersionScope] = ()) -> ColumnVersion:
+        key = name.upper()
+        latest = self._latest.get(key)
+        version = ColumnVersion(latest.name if latest else name, latest.version + 1 if latest else 1)
+        self._latest[key] = version
+        self.producer[version] = op_id
+        self.sources[version] = sources if isinstance(sources, VersionScope) else list(dict.fromkeys(sources))
+        if op_id is not None:
+            self.defs.setdefault(op_id, []).append(version)
+        return version
+
+    def use(self, op_id: str, version: ColumnVersion):
+        readers = self._readers.setdefault(version, [])
+        if not readers or readers[-1] != op_id: # An op reading a column twice is one use
+            readers.append(op_id)
+            self._reads.setdefault(op_id, []).append(version)
+
+    def use_all(self, op_id: str, scope: VersionScope):
+        """'op_id' reads every column of the dataset 'scope' describes."""
+        self._frames[op_id] = scope
+
+    def consumers(self, version: ColumnVersion) -> List[str]:
+        """Ids of the ops that read 'version', in pipeline order."""
+        readers = set(self._readers.get(version, ()))
+        readers.update(self._frame_readers().get(version, ()))
+        return sorted(readers, key=lambda op_id: self._order.get(op_id, -1))
+
+    def uses(self, op_id: str) -> List[ColumnVersion]:
+        """Versions 'op_id' reads (for a whole-dataset read, defining any a boundary passed on)."""
+        versions = list(self._reads.get(op_id, ()))
+        frame = self._frames.get(op_id)
+        if frame is not None:
+            versions = list(dict.fromkeys(versions + list(frame)))
+        return versions
+
+    def sources_of(self, version: ColumnVersion) -> List[ColumnVersion]:
+        """Versions 'version' was computed from."""
+        sources = self.sources.get(version, [])
+        if isinstance(sources, VersionScope): # Unparsed expression: every column it could see
+            sources = self.sources[version] = list(sources)
+        return sources
+
+    def versions(self, name: str) -> List[ColumnVersion]:
+        """Every version of a column, oldest first."""
+        latest = self._latest.get(name.upper())
+        return [ColumnVersion(latest.name, num) for num in range(1, latest.version + 1)] if latest else []
+
+    def is_dead(self, version: ColumnVersion) -> bool:
+        """Assigned but never read."""
+        return not self._readers.get(version) and version not in self._frame_readers()
+
+    def edges(self) -> Iterator[Tuple[ColumnVersion, Optional[str], List[str]]]:
+        """(version, producing op, consuming ops) for every version."""
+        for version, op_id in list(self.producer.items()):
+            yield version, op_id, self.consumers(version)
+
+    def _frame_readers(self) -> Dict[ColumnVersion, List[str]]:
+        """Version -> whole-dataset readers, rebuilt when versions or readers were added."""
+        key = (len(self.producer), len(self._frames))
+        if key != self._frame_index_key:
+            index: Dict[ColumnVersion, List[str]] = {}
+            for op_id, scope in self._frames.items():
+                for version in scope.defined().values():
+                    index.setdefault(version, []).append(op_id)
+            self._frame_index, self._frame_index_key = index, key
+        return self._frame_index
+
+
+def _expression_names(text: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Columns an IR expression reads, as spelt (None if it can't be parsed)."""
+    if not text:
+        return ()
+    expr = parsed_expression(text)
+    if expr is None:
+        return None
+    return tuple(sorted(name for name in referenced_columns(expr) if not name.startswith("$")))
+
+
+class _Tracker:
+    """One pass over a pipeline's ops, filling in a DefUseMap."""
+
+    def __init__(self, pipeline: Pipeline, sinks: bool):
+        self.pipeline = pipeline
+        self.defs = DefUseMap()
+        self.with_sinks = sinks
+        self.scopes: Dict[str, VersionScope] = {}
+        self.schemas = {}
+        for ds in pipeline.datasets:
+            self.schemas.setdefault(ds.id, ds.columns)
+        self.seq = 0
+
+    def run(self) -> DefUseMap:
+        defs = self.defs
+        for self.seq, op in enumerate(self.pipeline.operations):
+            defs._order.setdefault(op.id, self.seq)
+            out = self._visit(op)
+            for ds_id in op.outputs:
+                self.scopes[ds_id] = out
+            if self.with_sinks and is_sink(op) and op.outputs:
+                declared = self.schemas.get(op.outputs[0]) or ()
+                defs.sinks[op.outputs[0]] = [out.resolve(col.name) for col in declared] or list(out)
+        return defs
+
+    def _scope(self, ds_id: str) -> VersionScope:
+        scope = self.scopes.get(ds_id)
+        if scope is None: # An external file nobody loaded
+            scope = self.scopes[ds_id] = VersionScope(defs=self.defs)
+        return scope
+
+    def _frame(self, op: Operation, columns) -> VersionScope:
+        """A new dataset made by 'op' from (name, sources) pairs."""
+        out = VersionScope(origin=op.id, defs=self.defs, seq=self.seq)
+        for name, sources in columns:
+            out.changes[name.upper()] = (self.defs.define(op.id, name, sources), self.seq)
+        return out
+
+    def _visit(self, op: Operation) -> VersionScope:
+        """The scope of 'op''s outputs, recording what it reads and assigns."""
+        inputs = [self._scope(ds_id) for ds_id in op.inputs]
+        scope = inputs[0] if inputs else VersionScope(origin=op.id, defs=self.defs, seq=self.seq)
+        params = op.parameters
+
+        if op.type == OpType.LOAD_CSV:
+            declared = self.schemas.get(op.outputs[0]) if op.outputs else None
+            names = [col.name for col in declared] if declared else params.get("columns", [])
+            out = self._frame(op, [(name, ()) for name in names])
+            for condition in row_filters(op): # SELECT IFs folded into the load
+                self._reads(op, out, {}, _expression_names(condition))
+            return out
+        if op.type == OpType.AGGREGATE:
+            columns = [(name, self._reads(op, scope, {}, (name,))) for name in params.get("break", [])]
+            for agg in params.get("aggregations", []):
+                if "=" in agg:
+                    target, expression = agg.split("=", 1)
+                    columns.append((target.strip(), self._reads(op, scope, {}, _expression_names(expression))))
+                else:
+                    self._reads(op, scope, {}, None)
+            return self._frame(op, columns)
+        if op.type == OpType.GENERIC_TRANSFORM: # Unknown work: it reads, and may change, every column
+            self.defs.use_all(op.id, scope)
+            return scope.redefine_all(op.id, self.seq)
+        if op.type == OpType.COMPUTE_COLUMNS:
+            return scope.derive(self._computes(op, scope), self.seq)
+        if op.type == OpType.JOIN: # By-keys come from every file; the first file's columns win
+            for each in inputs:
+                self._reads(op, each, {}, params.get("by", []))
+            merged = {}
+            for other in inputs[1:]:
+                for key, version in other.as_dict().items():
+                    if not scope.has(key):
+                        merged.setdefault(key, version)
+            return scope.derive(merged, self.seq)
+        if op.type == OpType.FILTER_ROWS:
+            self._reads(op, scope, {}, _expression_names(params.get("condition")))
+        elif op.type == OpType.SORT_ROWS:
+            self._reads(op, scope, {}, [key.strip() for key in params.get("keys", "").split(",") if key.strip()])
+        elif op.type != OpType.MATERIALIZE: # SAVE, and anything unknown, reads every column
+            self.defs.use_all(op.id, scope)
+        return scope
+
+    def _computes(self, op: Operation, scope: VersionScope) -> Dict[str, ColumnVersion]:
+        """Versions a COMPUTE_COLUMNS op assigns; later entries read earlier ones."""
+        batch: Dict[str, ColumnVersion] = {}
+        params = op.parameters
+        if is_expression_compute(op):
+            for entry in compute_entries(op):
+                target = entry["target"]
+                names = _expression_names(entry.get("expression"))
+                condition = _expression_names(entry.get("condition"))
+                if names is not None and condition is not None:
+                    names = names + condition
+                    if entry.get("condition") and (target.upper() in batch or scope.has(target.upper())):
+                        names = names + (target,) # Rows that fail the test keep the old value
+                else:
+                    names = None
+                batch[target.upper()] = self.defs.define(op.id, target, self._reads(op, scope, batch, names))
+        elif "sources" in params: # RECODE: target i from source i (and its own old value)
+            for source, target in zip(params["sources"], params.get("targets") or params["sources"]):
+                keeps = target.upper() != source.upper() and (target.upper() in batch or scope.has(target.upper()))
+                names = (source, target) if keeps else (source,)
+                batch[target.upper()] = self.defs.define(op.id, target, self._reads(op, scope, batch, names))
+        else:
+            self.defs.use_all(op.id, scope)
+        return batch
+
+    def _reads(self, op: Operation, scope: VersionScope, batch: Dict[str, ColumnVersion], names) -> Sources:
+        """Versions of 'names' (None: every column) as of 'batch' over 'scope', recorded as read by 'op'."""
+        if names is None:
+            self.defs.use_all(op.id, scope)
+            return scope.derive(batch, self.seq)
+        versions = []
+        for name in names:
+            version = batch.get(name.upper())
+            if version is None:
+                version = scope.resolve(name)
+                self.defs.use(op.id, version)
+            versions.append(version)
+        return versions
@@ -5,6 +5,11 @@ from spec_generator.importers.spss.tokens import TokenType
 # 📜 SPSS GRAMMAR DEFINITIONS
 # ------------------------------------------------------------------------------
 
+# Inline data: everything between BEGIN DATA and the END DATA line is captured
+# raw by the lexer (one DATA_BLOCK token) instead of being tokenized.
+BEGIN_DATA = re.compile(r"BEGIN\s+DATA", re.IGNORECASE)
+END_DATA_LINE = re.compile(r"^[ \t]*END\s+DATA", re.IGNORECASE | re.MULTILINE)
+
 SPSS_TOKENS = [
     # 1. Comments
     (TokenType.COMMENT, re.compile(r"\*.*")),
@@ -13,7 +18,7 @@ SPSS_TOKENS = [
     (TokenType.STRING_LITERAL, re.compile(r"'(?:''|[^'])*'|\"(?:\"\"|[^\"])*\"", re.DOTALL)),
 
     # 3. Explicit Commands
-    (TokenType.COMMAND, re.compile(r"BEGIN\s+DATA", re.IGNORECASE)), 
+    (TokenType.COMMAND, BEGIN_DATA),
     (TokenType.COMMAND, re.compile(r"END\s+DATA", re.IGNORECASE)),
     (TokenType.COMMAND, re.compile(r"SELECT\s+IF", re.IGNORECASE)),
     (TokenType.COMMAND, re.compile(r"MATCH\s+FILES", re.IGNORECASE)),
@@ -30,7 +35,7 @@ SPSS_TOKENS = [
     (TokenType.LPAREN, re.compile(r"\(")),
     (TokenType.RPAREN, re.compile(r"\)")),
     (TokenType.COMMA, re.compile(r",")),
-    (TokenType.OPERATOR, re.compile(r"(\+|-|\*|/|>=|<=|<>|<|>|&|\|)")),
+    (TokenType.OPERATOR, re.compile(r"(\+|-|\*\*|\*|/|>=|<=|<>|~=|<|>|&|\||~)")),
 
     # 6. Numbers
     (TokenType.NUMBER_LITERAL, re.compile(r"\b\d+\.\d+\b|\b\.\d+\b|\b\d+\b")),
@@ -1,24 +1,54 @@
-import hashlib
-from platform import node
-from typing import List, Optional, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Type
 
 # 🟢 Cleaned Import: Removed 'from platform import node'
 from spec_generator.importers.spss.ast import (
-    AggregateNode, AstNode, DataListNode, FilterNode, IfNode, JoinNode,
-    LoadNode, ComputeNode, MaterializeNode, RecodeNode, SaveNode, GenericNode, IgnorableNode, SortNode, FilterNode
+    AggregateNode, AstNode, DataListNode, FilterNode, IfNode, InlineDataNode, JoinNode,
+    LoadNode, ComputeNode, MaterializeNode, RecodeNode, SaveNode, GenericNode, IgnorableNode, SortNode
 )
+from spec_generator.importers.spss.column_schema import ColumnSchema, SchemaTable
+from spec_generator.importers.spss.content_ids import content_addressed
+from spec_generator.importers.spss.def_use import DefUseMap
 from etl_ir.model import Pipeline, Dataset, Operation, Column
 from etl_ir.types import DataType, OpType
 
 
+NodeHandler = Callable[["GraphBuilder", AstNode], None]
+
+
 class GraphBuilder:
-    def __init__(self, metadata: dict = None):
+    # AST node type -> handler(builder, node). Filled in once below the
+    # class; extend it with register_handler(). Each class keeps only its
+    # own registrations. '_dispatch' caches the lookup for every concrete
+    # node type seen, per class; any registration bumps '_generation',
+    # which empties every class's cache on its next build.
+    _handlers: Dict[type, NodeHandler] = {}
+    _dispatch: Dict[type, NodeHandler] = {}
+    _dispatch_generation = -1
+    _generation = 0
+
+    def __init__(self, metadata: dict = None, content_ids: bool = False):
         self.metadata = metadata or {}
+        # content_ids: name ops (and generated datasets) by a Merkle hash of
+        # what they compute instead of a counter; see content_addressed()
+        self.content_ids = content_ids
         self.datasets: List[Dataset] = []
         self.operations: List[Operation] = []
         self.active_dataset_id: Optional[str] = None
         self.op_counter = 0
         self.ds_counter = 0
+        # Indexes over self.datasets (which keeps IR order): id -> first
+        # dataset with that id, and file name -> 'file_'/'source_' dataset id
+        self._datasets_by_id: Dict[str, Dataset] = {}
+        self._file_ids: Dict[str, str] = {}
+        # Dataset columns are shared, hash-consed ColumnSchemas, not copies
+        self._schemas = SchemaTable()
+        # Every column assignment gets a version (x#1, x#2, ...); def_use links
+        # each version to the op that assigned it and the ops that read it.
+        # Worked out from the last built pipeline when first asked for
+        self._built: Optional[Pipeline] = None
+        self._def_use: Optional[DefUseMap] = None
+        # Last inline load and its variables, until a BEGIN DATA block fills it
+        self._pending_inline: Optional[Tuple[Operation, List[str]]] = None
 
     def _get_next_op_id(self, prefix: str) -> str:
         self.op_counter += 1
@@ -29,59 +59,112 @@ class GraphBuilder:
         return f"ds_{self.ds_counter:03d}_{prefix}"
 
     def build(self, nodes: List[AstNode]) -> Pipeline:
+        return self.build_stream(nodes)
+
+    def build_stream(self, nodes: Iterable[AstNode]) -> Pipeline:
+        """
+        build() over any iterable, consumed once and in order, e.g.
+        SpssParser.parse_iter(): nodes are dropped as soon as they are handled.
+        """
         self.datasets = []
         self.operations = []
         self.active_dataset_id = None
         self.op_counter = 0
         self.ds_counter = 0
-
+        self._datasets_by_id = {}
+        self._file_ids = {}
+        self._schemas = SchemaTable()
+        self._built = None
+        self._def_use = None
+        self._pending_inline = None
+
+        dispatch = self._dispatch_table()
         for node in nodes:
-            # 🟢 IMPROVEMENT: Check noise first for speed and clarity
-            if isinstance(node, IgnorableNode):
-                continue
-            
-            if isinstance(node, LoadNode):
-                self._handle_load(node)
-            elif isinstance(node, ComputeNode):
-                self._handle_compute(node)
-            elif isinstance(node, FilterNode): 
-                self._handle_filter(node)
-            elif isinstance(node, MaterializeNode): 
-                self._handle_materialize(node)
-            elif isinstance(node, SaveNode):
-                self._handle_save(node)
-            elif isinstance(node, GenericNode):
-                self._handle_generic(node)
-            elif isinstance(node, JoinNode):
-                self._handle_join(node)
-            elif isinstance(node, DataListNode):
-                self._handle_data_list(node)
-            elif isinstance(node, AggregateNode):
-                self._handle_aggregate(node)
-            elif isinstance(node, RecodeNode):
-                self._handle_recode(node)
-            elif isinstance(node, SortNode):
-                self._handle_sort(node)
-            elif isinstance(node, FilterNode):
-                self._handle_filter(node)
-            elif isinstance(node, IfNode): 
-                self._handle_if(node)
-
-        return Pipeline(
+            handler = dispatch.get(type(node)) or self._resolve_handler(type(node))
+            handler(self, node)
+
+        pipeline = Pipeline(
             metadata=self.metadata,
             datasets=self.datasets, 
             operations=self.operations
         )
+        self._built = content_addressed(pipeline) if self.content_ids else pipeline
+        return self._built
+
+    @property
+    def def_use(self) -> DefUseMap:
+        """Def-use chains of the last build (see DefUseMap.from_pipeline())."""
+        if self._def_use is None:
+            self._def_use = DefUseMap.from_pipeline(self._built) if self._built is not None else DefUseMap()
+        return self._def_use
+
+    @classmethod
+    def register_handler(cls, node_type: Type[AstNode], handler: NodeHandler):
+        """
+        Routes AST nodes of 'node_type' (and its subclasses) to
+        handler(builder, node). Registering on a subclass leaves the
+        parent's table untouched; registering on a parent reaches its
+        subclasses, unless they registered the same node type themselves.
+        """
+        cls._handlers = {**cls.__dict__.get("_handlers", {}), node_type: handler}
+        GraphBuilder._generation += 1 # Every class re-resolves against the new tables
+
+    @classmethod
+    def _dispatch_table(cls) -> Dict[type, NodeHandler]:
+        """This class's lookup cache, emptied if anything was registered since it was filled."""
+        if cls.__dict__.get("_dispatch_generation") != GraphBuilder._generation:
+            cls._dispatch = {}
+            cls._dispatch_generation = GraphBuilder._generation
+        return cls._dispatch
+
+    @classmethod
+    def _resolve_handler(cls, node_type: type) -> NodeHandler:
+        """Nearest registered base class wins, then the nearest builder class; unknown nodes are skipped. Cached."""
+        tables = [klass.__dict__["_handlers"] for klass in cls.__mro__ if "_handlers" in klass.__dict__]
+        handler = next(
+            (table[base] for base in node_type.__mro__ for table in tables if base in table),
+            GraphBuilder._skip,
+        )
+        cls._dispatch_table()[node_type] = handler
+        return handler
+
+    def _skip(self, node: AstNode):
+        """Nodes with no data-flow effect (IGNORABLE, inline data, ...)."""
+
+    def _add_dataset(self, ds: Dataset):
+        """Appends to self.datasets and indexes it. Lookups see the first dataset per id."""
+        self.datasets.append(ds)
+        if ds.id in self._datasets_by_id:
+            return
+        self._datasets_by_id[ds.id] = ds
+        # A saved file ('file_x') shadows an external source of the same name
+        if ds.id.startswith("file_"):
+            self._file_ids[ds.id[len("file_"):]] = ds.id
+        elif ds.id.startswith("source_"):
+            self._file_ids.setdefault(ds.id[len("source_"):], ds.id)
+
+    def _get_dataset(self, dataset_id: Optional[str]) -> Optional[Dataset]:
+        return self._datasets_by_id.get(dataset_id) if dataset_id else None
+
+    def _new_dataset(self, dataset_id: str, source: str, schema: ColumnSchema) -> Dataset:
+        """Registers a dataset that shares 'schema' by reference."""
+        # model_construct: validating would copy the schema into a fresh list
+        ds = Dataset.model_construct(id=dataset_id, source=source, columns=schema)
+        self._add_dataset(ds)
+        return ds
+
+    def _active_schema(self) -> ColumnSchema:
+        """Schema of the currently active dataset (empty if none)."""
+        ds = self._get_dataset(self.active_dataset_id)
+        if ds is None:
+            return self._schemas.empty
+        if isinstance(ds.columns, ColumnSchema):
+            return ds.columns
+        return self._schemas.base(ds.columns) # Dataset added by hand (plain list)
 
     def _get_active_columns(self) -> List[Column]:
         """Helper to fetch columns from the currently active dataset."""
-        if not self.active_dataset_id:
-            return []
-        
-        for ds in self.datasets:
-            if ds.id == self.active_dataset_id:
-                return ds.columns.copy()
-        return []
+        return self._active_schema().copy()
 
     def _handle_load(self, node: LoadNode):
         dataset_id = f"source_{node.filename}"
@@ -93,8 +176,7 @@ class GraphBuilder:
             for col in node.columns
         ]
 
-        ds = Dataset(id=dataset_id, source="file", columns=ir_columns)
-        self.datasets.append(ds)
+        self._new_dataset(dataset_id, "file", self._schemas.base(ir_columns))
         
         op = Operation(
             id=self._get_next_op_id("load"),
@@ -103,6 +185,8 @@ class GraphBuilder:
             outputs=[dataset_id],
             parameters={'filename': node.filename, 'format': node.file_type}
         )
+        if node.formats: # Declared formats (F8.2, A10): what DtypePlanningPass types loads by
+            op.parameters['formats'] = dict(node.formats)
         self.operations.append(op)
         self.active_dataset_id = dataset_id
 
@@ -115,8 +199,7 @@ class GraphBuilder:
             for col in node.columns
         ]
 
-        new_ds = Dataset(id=new_ds_id, source="inline", columns=ir_columns)
-        self.datasets.append(new_ds)
+        self._new_dataset(new_ds_id, "inline", self._schemas.base(ir_columns))
         
         op = Operation(
             id=self._get_next_op_id("load_inline"),
@@ -125,32 +208,39 @@ class GraphBuilder:
             outputs=[new_ds_id],
             parameters={'source_type': 'inline'}
         )
+        if node.formats:
+            op.parameters['formats'] = dict(node.formats)
         self.operations.append(op)
         self.active_dataset_id = new_ds_id
+        self._pending_inline = (op, [col.name for col in ir_columns])
+        if node.data is not None: # parse() links the block first; parse_iter() sends it after
+            self._handle_inline_data(node.data)
+
+    def _handle_inline_data(self, node: InlineDataNode):
+        # The records travel with the load, with the variables they fill in
+        # order (projection may cut the dataset's schema down later)
+        if self._pending_inline is None:
+            return
+        op, variables = self._pending_inline
+        op.parameters['data'] = node.content
+        op.parameters['variables'] = variables
+        self._pending_inline = None
 
     # ... (Rest of your methods: _handle_compute, _handle_save, etc. are correct) ...
     
     def _handle_compute(self, node: ComputeNode):
         new_ds_id = self._get_next_ds_id("derived")
-        new_columns = self._get_active_columns()
-        
-        existing_idx = next((i for i, c in enumerate(new_columns) if c.name == node.target), -1)
-        new_col_def = Column(name=node.target, type=DataType.INTEGER)
         
-        if existing_idx >= 0:
-            new_columns[existing_idx] = new_col_def
-        else:
-            new_columns.append(new_col_def)
-
-        new_ds = Dataset(id=new_ds_id, source="derived", columns=new_columns)
-        self.datasets.append(new_ds)
+        # Replaces the same-named column or appends; O(1), the parent schema is shared
+        new_col_def = self._schemas.column(node.target, DataType.INTEGER)
+        self._new_dataset(new_ds_id, "derived", self._schemas.with_column(self._active_schema(), new_col_def))
 
         op = Operation(
             id=self._get_next_op_id("compute"),
             type=OpType.COMPUTE_COLUMNS,
             inputs=[self.active_dataset_id] if self.active_dataset_id else [],
             outputs=[new_ds_id],
-            parameters={'target': node.target, 'expression': node.expression}
+            parameters={'target': node.target, 'expression': str(node.expression)}
         )
         self.operations.append(op)
         self.active_dataset_id = new_ds_id
@@ -159,8 +249,7 @@ class GraphBuilder:
         clean_filename = node.filename.strip("'").strip('"')
         file_ds_id = f"file_{clean_filename}"
         
-        ds = Dataset(id=file_ds_id, source="file", columns=self._get_active_columns())
-        self.datasets.append(ds)
+        self._new_dataset(file_ds_id, "file", self._active_schema())
 
         op = Operation(
             id=self._get_next_op_id("save"),
@@ -174,8 +263,7 @@ class GraphBuilder:
     def _handle_generic(self, node: GenericNode):
         if self.active_dataset_id:
             new_ds_id = self._get_next_ds_id("generic")
-            new_ds = Dataset(id=new_ds_id, source="derived", columns=self._get_active_columns())
-            self.datasets.append(new_ds)
+            self._new_dataset(new_ds_id, "derived", self._active_schema())
             
             op = Operation(
                 id=self._get_next_op_id("generic"),
@@ -187,29 +275,11 @@ class GraphBuilder:
             self.operations.append(op)
             self.active_dataset_id = new_ds_id
 
-    def _handle_filter(self, node: FilterNode):
-        if not self.active_dataset_id: return
-
-        new_ds_id = self._get_next_ds_id("filtered")
-        new_ds = Dataset(id=new_ds_id, source="derived", columns=self._get_active_columns())
-        self.datasets.append(new_ds)
-
-        op = Operation(
-            id=self._get_next_op_id("filter"),
-            type=OpType.FILTER_ROWS,
-            inputs=[self.active_dataset_id],
-            outputs=[new_ds_id],
-            parameters={'condition': node.condition}
-        )
-        self.operations.append(op)
-        self.active_dataset_id = new_ds_id
-
     def _handle_materialize(self, node: MaterializeNode):
         if not self.active_dataset_id: return
 
         new_ds_id = self._get_next_ds_id("materialized")
-        new_ds = Dataset(id=new_ds_id, source="derived", columns=self._get_active_columns())
-        self.datasets.append(new_ds)
+        self._new_dataset(new_ds_id, "derived", self._active_schema())
 
         op = Operation(
             id=self._get_next_op_id("exec"),
@@ -229,22 +299,21 @@ class GraphBuilder:
                     input_ids.append(self.active_dataset_id)
             else:
                 clean_src = src.strip("'").strip('"')
-                potential_internal_id = f"file_{clean_src}"
-                internal_match = next((d for d in self.datasets if d.id == potential_internal_id), None)
-                
-                if internal_match:
-                    input_ids.append(internal_match.id)
-                else:
+                # A file SAVEd earlier in the script, else an external source
+                file_ds_id = self._file_ids.get(clean_src)
+                if file_ds_id is None:
                     file_ds_id = f"source_{clean_src}"
-                    if not any(d.id == file_ds_id for d in self.datasets):
-                          self.datasets.append(Dataset(id=file_ds_id, source="file"))
-                    input_ids.append(file_ds_id)
+                    self._new_dataset(file_ds_id, "file", self._schemas.empty)
+                input_ids.append(file_ds_id)
 
         new_ds_id = self._get_next_ds_id("joined")
-        new_ds = Dataset(id=new_ds_id, source="derived", columns=self._get_active_columns())
-        self.datasets.append(new_ds)
+        self._new_dataset(new_ds_id, "derived", self._active_schema())
 
         right_table = next((s for s in node.sources if s != '*'), "unknown")
+        # /FILE=* with only /TABLE lookups keeps exactly the active file's cases;
+        # two or more /FILEs are a full outer match
+        others = [s for s in node.sources if s != '*']
+        left = node.sources[:1] == ['*'] and '*' not in node.tables and all(s in node.tables for s in others)
         op = Operation(
             id=self._get_next_op_id("join"),
             type=OpType.JOIN,
@@ -252,7 +321,7 @@ class GraphBuilder:
             outputs=[new_ds_id],
             parameters={
                 'by': node.by,
-                'type': 'LEFT',  # 🟢 ADD THIS (Matches YAML expectation)
+                'type': 'LEFT' if left else 'FULL',
                 'right_table': right_table # 🟢 ADD THIS
             }
         )
@@ -268,7 +337,7 @@ class GraphBuilder:
              is_side_effect = True
 
         new_cols = []
-        input_ds = next((d for d in self.datasets if d.id == self.active_dataset_id), None)
+        input_ds = self._get_dataset(self.active_dataset_id)
         # Using .get() here is safe now that input_ds.columns are Objects, not Tuples!
         input_schema = {c.name: c.type for c in input_ds.columns} if input_ds else {}
 
@@ -281,8 +350,7 @@ class GraphBuilder:
                 target = agg_expr.split("=")[0].strip()
                 new_cols.append(Column(name=target, type=DataType.INTEGER))
 
-        new_ds = Dataset(id=new_ds_id, source="derived", columns=new_cols)
-        self.datasets.append(new_ds)
+        self._new_dataset(new_ds_id, "derived", self._schemas.base(new_cols))
 
         op = Operation(
             id=self._get_next_op_id("aggregate"),
@@ -301,24 +369,22 @@ class GraphBuilder:
             self.active_dataset_id = new_ds_id
 
     def _handle_recode(self, node: RecodeNode):
-        input_ds = next((d for d in self.datasets if d.id == self.active_dataset_id), None)
-        new_cols = list(input_ds.columns) if input_ds else []
-        existing_names = {c.name.upper() for c in new_cols}
+        schema = self._active_schema()
+        existing_names = {c.name.upper() for c in schema}
         
         for target in node.target_vars:
             if target.upper() not in existing_names:
-                new_cols.append(Column(name=target, type=DataType.UNKNOWN))
+                schema = self._schemas.with_column(schema, self._schemas.column(target, DataType.UNKNOWN))
 
         new_ds_id = self._get_next_ds_id("recode")
-        new_ds = Dataset(id=new_ds_id, source="derived", columns=new_cols)
-        self.datasets.append(new_ds)
+        self._new_dataset(new_ds_id, "derived", schema)
         
         self.operations.append(Operation(
             id=self._get_next_op_id("recode"),
             type=OpType.COMPUTE_COLUMNS,
             inputs=[self.active_dataset_id],
             outputs=[new_ds_id],
-            parameters={'logic': node.map_logic}
+            parameters={'logic': node.map_logic, 'sources': node.source_vars, 'targets': node.target_vars}
         ))
         self.active_dataset_id = new_ds_id
 
@@ -327,8 +393,7 @@ class GraphBuilder:
 
         new_ds_id = self._get_next_ds_id("sorted")
         # Sorting doesn't change columns, so we inherit schema
-        new_ds = Dataset(id=new_ds_id, source="derived", columns=self._get_active_columns())
-        self.datasets.append(new_ds)
+        self._new_dataset(new_ds_id, "derived", self._active_schema())
 
         op = Operation(
             id=self._get_next_op_id("sort"),
@@ -347,19 +412,14 @@ class GraphBuilder:
 
         # Filtering creates a new dataset view (schema doesn't change)
         new_ds_id = self._get_next_ds_id("filtered")
-        new_ds = Dataset(
-            id=new_ds_id, 
-            source="derived", 
-            columns=self._get_active_columns()
-        )
-        self.datasets.append(new_ds)
+        self._new_dataset(new_ds_id, "derived", self._active_schema())
 
         op = Operation(
             id=self._get_next_op_id("filter"),
             type=OpType.FILTER_ROWS,
             inputs=[self.active_dataset_id],
             outputs=[new_ds_id],
-            parameters={'condition': node.condition}
+            parameters={'condition': str(node.condition)}
         )
         self.operations.append(op)
         self.active_dataset_id = new_ds_id
@@ -371,8 +431,7 @@ class GraphBuilder:
         # In a real graph, this might be a 'conditional_update' op, 
         # but for now we map it to COMPUTE with an extra param.
         new_ds_id = self._get_next_ds_id("derived")
-        new_ds = Dataset(id=new_ds_id, source="derived", columns=self._get_active_columns())
-        self.datasets.append(new_ds)
+        self._new_dataset(new_ds_id, "derived", self._active_schema())
 
         op = Operation(
             id=self._get_next_op_id("compute_if"),
@@ -381,9 +440,29 @@ class GraphBuilder:
             outputs=[new_ds_id],
             parameters={
                 'target': node.target,
-                'expression': node.expression,
-                'condition': node.condition # 🟢 Extra param for the generator to handle later
+                'expression': str(node.expression),
+                'condition': str(node.condition) # 🟢 Extra param for the generator to handle later
             }
         )
         self.operations.append(op)
-        self.active_dataset_id = new_ds_id
\ No newline at end of file
+        self.active_dataset_id = new_ds_id
+
+
+# 🟢 Handler table: one dict lookup per node instead of an isinstance chain
+for _node_type, _handler in [
+    (IgnorableNode, GraphBuilder._skip),
+    (LoadNode, GraphBuilder._handle_load),
+    (ComputeNode, GraphBuilder._handle_compute),
+    (FilterNode, GraphBuilder._handle_filter),
+    (MaterializeNode, GraphBuilder._handle_materialize),
+    (SaveNode, GraphBuilder._handle_save),
+    (GenericNode, GraphBuilder._handle_generic),
+    (JoinNode, GraphBuilder._handle_join),
+    (DataListNode, GraphBuilder._handle_data_list),
+    (InlineDataNode, GraphBuilder._handle_inline_data),
+    (AggregateNode, GraphBuilder._handle_aggregate),
+    (RecodeNode, GraphBuilder._handle_recode),
+    (SortNode, GraphBuilder._handle_sort),
+    (IfNode, GraphBuilder._handle_if),
+]:
+    GraphBuilder.register_handler(_node_type, _handler)
@@ -0,0 +1,49 @@
+import hashlib
+from dataclasses import dataclass, field
+from typing import List, Sequence, Tuple
+
+from spec_generator.importers.spss.ast import AstNode
+
+# (start, end, replacement): replace old_source[start:end], offsets into the old text
+TextEdit = Tuple[int, int, str]
+
+
+@dataclass
+class CommandEntry:
+    """One command-boundary segment of the source and the nodes parsed from it."""
+    start: int
+    end: int
+    digest: bytes
+    first_node: int
+    node_count: int
+
+
+@dataclass
+class ParseTree:
+    """
+    Parse result that remembers where each node came from, so
+    SpssParser.reparse() can re-parse only the commands an edit touched.
+    'changed' lists the node indices that were (re)built by the last parse.
+    """
+    source: str
+    nodes: List[AstNode] = field(default_factory=list)
+    commands: List[CommandEntry] = field(default_factory=list)
+    changed: List[int] = field(default_factory=list)
+
+
+def command_digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def apply_edits(source: str, edits: Sequence[TextEdit]) -> str:
+    """Applies non-overlapping edits, all expressed against the original text."""
+    parts = []
+    pos = 0
+    for start, end, replacement in sorted(edits, key=lambda edit: (edit[0], edit[1])):
+        if start < pos or end < start or end > len(source):
+            raise ValueError(f"Invalid or overlapping edit at {start}:{end}")
+        parts.append(source[pos:start])
+        parts.append(replacement)
+        pos = end
+    parts.append(source[pos:])
+    return "".join(parts)
@@ -0,0 +1,73 @@
+import math
+import re
+from array import array
+from typing import Dict, Iterable, List, Tuple, Union
+
+from spec_generator.importers.spss.ast import DataListNode
+from etl_ir.model import Column
+from etl_ir.types import DataType
+
+# Free-field values: quoted strings (a doubled quote is a literal one), or
+# runs of anything but blanks and commas
+_FREE_FIELD = re.compile(r"'((?:[^']|'')*)'|\"((?:[^\"]|\"\")*)\"|([^\s,]+)")
+
+# Types kept as text; everything else is read into a float column
+_TEXT_TYPES = (DataType.STRING, DataType.DATE)
+
+ColumnData = Union[array, List[str]]
+
+
+class InlineDataError(ValueError):
+    """A data record doesn't have one value per variable."""
+
+
+def load_inline_data(node: DataListNode) -> Dict[str, ColumnData]:
+    """
+    Reads the raw BEGIN DATA payload paired with a DATA LIST into columns
+    (see read_inline_data()).
+    """
+    return read_inline_data(node.data.content if node.data is not None else "", node.columns)
+
+
+def read_inline_data(content: str, columns: Iterable[Union[Column, Tuple[str, DataType]]]) -> Dict[str, ColumnData]:
+    """
+    Reads inline data into columns, one record per non-blank line. Values
+    are blank or comma separated and fill the variables in order. Numeric
+    columns become array('d') with NaN for unreadable values; string and
+    date columns become lists of str. Raises InlineDataError for a record
+    with too few or too many values.
+    """
+    data = {
+        col.name: ([] if col.type in _TEXT_TYPES else array("d"))
+        for col in (Column(name=c[0], type=c[1]) if isinstance(c, tuple) else c for c in columns)
+    }
+    if not data:
+        return data
+
+    targets = list(data.values())
+    width = len(targets)
+    for line_no, line in enumerate(content.splitlines(), 1):
+        values = [_field_value(match) for match in _FREE_FIELD.finditer(line)]
+        if not values:
+            continue
+        if len(values) != width:
+            raise InlineDataError(f"Data line {line_no}: expected {width} values, got {len(values)}: {line.strip()!r}")
+        for target, value in zip(targets, values):
+            target.append(_to_float(value) if isinstance(target, array) else value)
+    return data
+
+
+def _field_value(match: re.Match) -> str:
+    single, double, bare = match.groups()
+    if single is not None:
+        return single.replace("''", "'")
+    if double is not None:
+        return double.replace('""', '"')
+    return bare
+
+
+def _to_float(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return math.nan
@@ -1,77 +1,342 @@
+import codecs
 import re
-from typing import List
-from spec_generator.importers.spss.tokens import Token, TokenType
-from spec_generator.importers.spss.grammar import SPSS_TOKENS
+from sys import intern
+from typing import IO, Iterator, List, Optional, Sequence, Tuple, Pattern, Union
+from spec_generator.importers.spss.tokens import Token, TokenStream, TokenType
+from spec_generator.importers.spss.grammar import BEGIN_DATA, END_DATA_LINE, SPSS_TOKENS
+
+# Inline flag letters for the flags a grammar pattern may carry.
+_INLINE_FLAGS = ((re.IGNORECASE, "i"), (re.DOTALL, "s"), (re.MULTILINE, "m"), (re.VERBOSE, "x"))
+
+
+def _compile_master(token_specs: Sequence[Tuple[TokenType, Pattern]], with_comments: bool) -> Pattern:
+    """
+    Folds the ordered grammar into a single alternation.
+    Group 'WS' is whitespace; group 'T<n>' is SPSS_TOKENS[n]. Python tries
+    alternatives left to right, so the grammar's first-match priority is kept.
+    """
+    parts = [r"(?P<WS>\s+)"]
+    for idx, (token_type, pattern) in enumerate(token_specs):
+        if token_type == TokenType.COMMENT and not with_comments:
+            continue
+        flags = "".join(letter for flag, letter in _INLINE_FLAGS if pattern.flags & flag)
+        body = f"(?{flags}:{pattern.pattern})" if flags else f"(?:{pattern.pattern})"
+        parts.append(f"(?P<T{idx}>{body})")
+    return re.compile("|".join(parts))
+
+
+# Comments are only legal at the start of a line, so there are two scanners:
+# one used at line start (comments allowed) and one used mid-line.
+_MASTER_LINE_START = _compile_master(SPSS_TOKENS, with_comments=True)
+_MASTER_MID_LINE = _compile_master(SPSS_TOKENS, with_comments=False)
+_GROUP_TYPES = {f"T{idx}": token_type for idx, (token_type, _) in enumerate(SPSS_TOKENS)}
+_GROUP_KIND_CODES = {group: token_type.value for group, token_type in _GROUP_TYPES.items()}
+_COMMENT_CODE = TokenType.COMMENT.value
+_BEGIN_DATA_GROUP = next(f"T{idx}" for idx, (_, pattern) in enumerate(SPSS_TOKENS) if pattern is BEGIN_DATA)
+
+# What may follow BEGIN DATA on its own line before the data starts.
+_BLANK_REST_OF_LINE = re.compile(r"[ \t]*\.?[ \t]*")
+
+# Command-boundary prescan: the only places a '.' at end of line is NOT a
+# terminator are strings, line comments and inline data, so those are skipped.
+# BEGIN DATA is only trusted at line start; anywhere else the scan gives up
+# rather than guess whether the lexer saw it as a command. The leading
+# lookahead lets the regex engine skip ordinary text cheaply.
+_BOUNDARY_SCAN = re.compile(
+    r"(?=['\".Bb]|^)"
+    r"(?:(?P<STRING>'(?:''|[^'])*'|\"(?:\"\"|[^\"])*\")"
+    r"|(?P<COMMENT>^[^\S\n]*\*[^\n]*)"
+    r"|(?P<DATA>^[^\S\n]*BEGIN\s+DATA)"
+    r"|(?P<STRAY_DATA>BEGIN\s+DATA)"
+    r"|(?P<END>\.[^\S\n]*\n)"
+    r"|(?P<QUOTE>['\"]))",
+    re.IGNORECASE | re.MULTILINE | re.DOTALL,
+)
+
+# How far past a match the streaming lexer must be able to see before it
+# trusts the match (covers 'BEGIN  DATA', escaped quotes, '1.5', 'DATE.DMY').
+_STREAM_LOOKAHEAD = 64
+_QUOTES = ("'", '"')
+
+Source = Union[str, IO[str], IO[bytes]]
+
 
 class SpssLexer:
     """
     Tokenizer for SPSS Syntax.
     Robustly handles 'Start of Line' context for comments.
     """
-    
-    def tokenize(self, code: str) -> List[Token]:
-        tokens = []
+
+    def tokenize(self, code: str, line_offset: int = 0) -> TokenStream:
+        """
+        Lexes 'code' into a columnar TokenStream. 'line_offset' is added to
+        line numbers in error messages, for callers lexing a slice of a file.
+        """
         code = code.replace("\r\n", "\n")
-        
+        tokens = TokenStream(code)
+        append_kind = tokens.kinds.append
+        append_start = tokens.starts.append
+        append_end = tokens.ends.append
+
         pos = 0
-        line_num = 1
-        col_num = 1
+        end = len(code)
         at_line_start = True # 🟢 New State Flag
-        
-        while pos < len(code):
-            match = None
-            
-            # 1. Skip Whitespace
-            whitespace = re.match(r"\s+", code[pos:])
-            if whitespace:
-                chunk = whitespace.group(0)
-                lines_in_chunk = chunk.count('\n')
-                line_num += lines_in_chunk
-                
-                if lines_in_chunk > 0:
-                    col_num = 1
+        kind_codes = _GROUP_KIND_CODES
+
+        while pos < end:
+            # One regex call per token: whitespace and every grammar rule live
+            # in the same alternation, matched in place (no slicing of 'code').
+            scanner = _MASTER_LINE_START if at_line_start else _MASTER_MID_LINE
+            match = scanner.match(code, pos)
+
+            # 1. Handle Invalid Characters
+            if not match:
+                line_num, col_num = self._position(code, pos)
+                raise SyntaxError(
+                    f"Unexpected character '{code[pos]}' at line {line_num + line_offset}, col {col_num}"
+                )
+
+            group = match.lastgroup
+            next_pos = match.end()
+
+            # 2. Skip Whitespace
+            if group == "WS":
+                # Note: Spaces don't reset 'at_line_start'; newlines set it.
+                if not at_line_start and code.find("\n", pos, next_pos) != -1:
                     at_line_start = True # 🟢 Reset flag on newline
+                pos = next_pos
+                continue
+
+            # 3. Store valid tokens as offsets (Skip comments)
+            kind = kind_codes[group]
+            if kind != _COMMENT_CODE:
+                append_kind(kind)
+                append_start(pos)
+                append_end(next_pos)
+                at_line_start = False # 🟢 We consumed a real token
+
+            pos = next_pos
+
+            # 4. Inline data is one opaque DATA_BLOCK span, never tokenized
+            if group == _BEGIN_DATA_GROUP:
+                data_start, data_end = self._locate_data_block(code, pos, eof=True)
+                tokens.append(TokenType.DATA_BLOCK, data_start, data_end)
+                pos = data_end
+                at_line_start = True # Resume on the END DATA line
+
+        return tokens
+
+    @staticmethod
+    def _locate_data_block(code: str, pos: int, eof: bool, resume: int = 0) -> Optional[Tuple[int, int]]:
+        """
+        Span of the raw data following a BEGIN DATA that ends at 'pos'.
+        Data starts on the next line (or right away if BEGIN DATA is followed
+        by something other than an optional '.') and stops before the line
+        holding END DATA, or at end of input. Returns None when more input is
+        needed to decide; 'resume' lets a streaming caller skip text it has
+        already searched.
+        """
+        nl = code.find("\n", pos)
+        if nl == -1 and not eof:
+            return None
+        line_end = len(code) if nl == -1 else nl
+        if _BLANK_REST_OF_LINE.fullmatch(code, pos, line_end):
+            data_start = min(line_end + 1, len(code))
+        else:
+            data_start = pos
+
+        end_match = END_DATA_LINE.search(code, max(data_start, resume))
+        if end_match is None:
+            return (data_start, len(code)) if eof else None
+        return data_start, end_match.start()
+
+    @staticmethod
+    def command_boundaries(code: str) -> List[int]:
+        """
+        Offsets where a new line starts right after a command terminator,
+        outside strings, comments and data blocks. Lexing from any of them
+        gives the same tokens as lexing the whole text, so they are safe
+        split points. Expects '\n' line endings (as tokenize() produces).
+        """
+        boundaries = []
+        pos = 0
+        search = _BOUNDARY_SCAN.search
+        while True:
+            match = search(code, pos)
+            if match is None:
+                return boundaries
+            kind = match.lastgroup
+            if kind == "END":
+                boundaries.append(match.end())
+            elif kind == "DATA":
+                end_match = END_DATA_LINE.search(code, match.end())
+                if end_match is None:
+                    return boundaries
+                pos = end_match.start()
+                continue
+            elif kind == "QUOTE" or kind == "STRAY_DATA":
+                return boundaries # Unterminated string, or data we can't place
+            pos = match.end()
+
+    @staticmethod
+    def _position(code: str, pos: int) -> Tuple[int, int]:
+        """1-based (line, column) of an offset, for error messages."""
+        return code.count("\n", 0, pos) + 1, pos - code.rfind("\n", 0, pos)
+
+    def iter_tokens(self, source: Source, chunk_size: int = 1 << 16) -> Iterator[Token]:
+        """
+        Streaming counterpart of tokenize(): yields the same tokens lazily.
+        'source' may be a str, a text/binary file object or an mmap; file-like
+        sources are read 'chunk_size' characters/bytes at a time, so memory
+        stays bounded by the chunk size plus the longest single token.
+        """
+        pieces = self.iter_chunks(source, chunk_size)
+        buf = ""
+        pos = 0
+        eof = False
+        safe_end = 0 # Matches ending before this index cannot change with more input
+
+        base = 0 # Absolute offset of buf[0]
+        line_num = 1
+        line_start = 0 # Absolute offset of the current line's first char
+        at_line_start = True
+        group_types = _GROUP_TYPES
+        in_data_block = False # Just read BEGIN DATA; pos is where its data begins
+        data_resume = 0 # Relative to pos: END DATA search already covered this far
+
+        while True:
+            if pos >= safe_end and not eof:
+                # Refill: keep one char of history so '\b' sees the previous char
+                keep = max(pos - 1, 0)
+                buf, pos, base = buf[keep:], pos - keep, base + keep
+                piece = next(pieces, None)
+                if piece is None:
+                    eof = True
                 else:
-                    col_num += len(chunk)
-                    # Note: Spaces don't reset 'at_line_start'. 
-                    # If we are at start, space keeps us at start.
-                
-                pos += len(chunk)
+                    buf += piece
+                safe_end = self._settled_limit(buf, pos, eof)
+                continue
+
+            if in_data_block:
+                span = self._locate_data_block(buf, pos, eof, resume=pos + data_resume)
+                if span is None:
+                    # Read more; the next search restarts at the last (maybe partial) line
+                    last_nl = buf.rfind("\n", pos)
+                    data_resume = last_nl + 1 - pos if last_nl != -1 else 0
+                    safe_end = pos
+                    continue
+                data_start, data_end = span
+                if buf.find("\n", pos, data_start) != -1: # Data starts on the next line
+                    line_num += 1
+                    line_start = base + data_start
+                yield Token(TokenType.DATA_BLOCK, buf[data_start:data_end], line_num, base + data_start - line_start + 1)
+
+                lines_in_block = buf.count("\n", data_start, data_end)
+                if lines_in_block:
+                    line_num += lines_in_block
+                    line_start = base + buf.rfind("\n", data_start, data_end) + 1
+                pos = data_end
+                at_line_start = True
+                in_data_block = False
+                data_resume = 0
                 continue
 
-            # 2. Try match against Grammar
-            for token_type, pattern in SPSS_TOKENS:
-                match = pattern.match(code, pos)
-                if match:
-                    # 🟢 Context Check for Comments
-                    if token_type == TokenType.COMMENT:
-                        if not at_line_start:
-                            # False positive: we matched '*' as a comment, 
-                            # but we are in the middle of a line (e.g. 2 * 3).
-                            # Reject this match, let loop continue to OPERATOR.
-                            match = None
-                            continue
-                    
-                    text = match.group(0)
-                    
-                    # Store valid tokens (Skip comments)
-                    if token_type != TokenType.COMMENT:
-                        tokens.append(Token(token_type, text, line_num, col_num))
-                        at_line_start = False # 🟢 We consumed a real token
-                    
-                    # Advance
-                    pos += len(text)
-                    col_num += len(text)
-                    break
-            
-            # 3. Handle Invalid Characters
+            if pos >= len(buf):
+                return
+
+            scanner = _MASTER_LINE_START if at_line_start else _MASTER_MID_LINE
+            match = scanner.match(buf, pos)
+
             if not match:
-                char = code[pos]
+                # An open quote may simply be waiting for its closing half
+                if not eof and buf[pos] in _QUOTES:
+                    safe_end = pos
+                    continue
                 raise SyntaxError(
-                    f"Unexpected character '{char}' at line {line_num}, col {col_num}"
+                    f"Unexpected character '{buf[pos]}' at line {line_num}, col {base + pos - line_start + 1}"
                 )
-                
-        return tokens
-        
+
+            next_pos = match.end()
+            group = match.lastgroup
+            if not eof and (
+                next_pos >= safe_end
+                # A string followed by its own quote only matched short because
+                # the escaped ('') continuation ran off the buffer: retry later
+                or (group_types.get(group) == TokenType.STRING_LITERAL and buf[next_pos] == buf[pos])
+            ):
+                safe_end = pos # Too close to the buffer edge: read more, then retry
+                continue
+
+            if group == "WS":
+                if not at_line_start and buf.find("\n", pos, next_pos) != -1:
+                    at_line_start = True
+            else:
+                token_type = group_types[group]
+                if token_type != TokenType.COMMENT:
+                    value = match.group()
+                    if token_type == TokenType.IDENTIFIER:
+                        value = intern(value) # Same sharing as TokenStream.value_at()
+                    yield Token(token_type, value, line_num, base + pos - line_start + 1)
+                    at_line_start = False
+
+            # Newlines can sit in whitespace, strings or 'BEGIN\nDATA'
+            lines_in_chunk = buf.count("\n", pos, next_pos)
+            if lines_in_chunk:
+                line_num += lines_in_chunk
+                line_start = base + buf.rfind("\n", pos, next_pos) + 1
+            pos = next_pos
+            in_data_block = group == _BEGIN_DATA_GROUP
+
+    @staticmethod
+    def _settled_limit(buf: str, pos: int, eof: bool) -> int:
+        """
+        Index before which a match is final. A match must leave
+        _STREAM_LOOKAHEAD chars of context and be followed by a non-space char
+        inside that window, so multi-word commands split by long runs of
+        whitespace ('BEGIN <newlines> DATA') are never cut in half.
+        """
+        if eof:
+            return len(buf)
+        i = len(buf) - _STREAM_LOOKAHEAD - 1
+        while i >= pos and buf[i].isspace():
+            i -= 1
+        return max(i, pos)
+
+    @staticmethod
+    def iter_chunks(source: Source, chunk_size: int) -> Iterator[str]:
+        """
+        Yields decoded, newline-normalised text from a str, file object or mmap.
+        A trailing '\r' is held back so a '\r\n' split across chunks still
+        collapses to '\n'.
+        """
+        if isinstance(source, str):
+            yield source.replace("\r\n", "\n")
+            return
+
+        decoder = None
+        pending = ""
+        while True:
+            raw = source.read(chunk_size)
+            if isinstance(raw, (bytes, bytearray)):
+                if decoder is None:
+                    decoder = codecs.getincrementaldecoder("utf-8")()
+                text = decoder.decode(raw)
+            else:
+                text = raw
+            if not raw:
+                break
+
+            text = pending + text
+            pending = ""
+            if text.endswith("\r"):
+                text, pending = text[:-1], "\r"
+            if text:
+                yield text.replace("\r\n", "\n")
+
+        if decoder is not None:
+            pending += decoder.decode(b"", final=True)
+        if pending:
+            yield pending
+
     def normalize_command(self, raw_cmd: str) -> str:
-        return " ".join(raw_cmd.split())
\ No newline at end of file
+        return " ".join(raw_cmd.split())
@@ -1,132 +1,384 @@
-from typing import List
+import itertools
+import os
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from functools import partial
+from typing import Callable, Dict, FrozenSet, Iterator, List, Optional, Sequence, Tuple, Union
+from spec_generator.importers.spss.lexer import Source
 from spec_generator.importers.spss.parsers.logic import LogicParserMixin
 from spec_generator.importers.spss.tokens import TokenType
 from spec_generator.importers.spss.ast import (
-    AstNode, GenericNode, IgnorableNode, LoadNode, ComputeNode, 
+    AstNode, DataListNode, GenericNode, IgnorableNode, InlineDataNode, LoadNode, ComputeNode, 
     FilterNode, MaterializeNode, SaveNode, JoinNode, SortNode
 )
+from spec_generator.importers.spss.incremental import (
+    CommandEntry, ParseTree, TextEdit, apply_edits, command_digest
+)
 from spec_generator.importers.spss.parsers.base import BaseParserMixin
+from spec_generator.importers.spss.parsers.expressions import parse_expression_tokens
 from spec_generator.importers.spss.parsers.schema import SchemaParserMixin
 from spec_generator.importers.spss.parsers.stats import StatsParserMixin
 
+# Reporting/metadata commands that never touch the data flow.
+IGNORABLE_COMMANDS = (
+    "TITLE", "SUBTITLE", "LIST", "DESCRIPTIVES", "FREQUENCIES",
+    "SET", "CACHE", "SHOW", "DISPLAY", "NOTE",
+)
+
+CommandHandler = Callable[["SpssParser"], Optional[AstNode]]
+
+# Bump whenever the AST produced for the same source changes; it is part
+# of the on-disk parse cache key (see cache.AstCache).
+PARSER_VERSION = 8
+
+# More shards than workers evens out the load when shard costs differ.
+_SHARDS_PER_WORKER = 4
+
+
+def _parse_shard(dispatch: Tuple[type, dict, FrozenSet[str]], shard: Tuple[str, int]) -> List[AstNode]:
+    """Process-pool entry point: parse one shard, shift spans onto the full text."""
+    parser_cls, commands, pair_heads = dispatch
+    parser = parser_cls()
+    # The caller's command table, as it is now: a spawned worker re-imports
+    # the module and would only see the commands registered at import time
+    parser._commands, parser._pair_heads = commands, pair_heads
+    text, delta = shard
+    return _shift_spans(parser.parse(text), delta)
+
+
+def _shift_spans(nodes: List[AstNode], delta: int) -> List[AstNode]:
+    for node in nodes:
+        if isinstance(node, InlineDataNode):
+            node.start += delta
+            node.end += delta
+    return nodes
+
+
 class SpssParser(SchemaParserMixin, 
                  StatsParserMixin, 
                  LogicParserMixin, 
                  BaseParserMixin):
     
+    # Normalised keyword, or (keyword, next keyword), -> handler(parser) -> node.
+    # Filled in once below the class; extend it with register_command().
+    _commands: Dict[Union[str, Tuple[str, str]], CommandHandler] = {}
+    _pair_heads: FrozenSet[str] = frozenset()
+
+    @classmethod
+    def register_command(cls, keyword: Union[str, Tuple[str, str]], handler: CommandHandler):
+        """
+        Routes a command to 'handler'. 'keyword' is matched case-insensitively
+        against the first token (multi-word tokens like 'SELECT IF' with single
+        spaces), or is a (first, second) pair such as ('DATA', 'LIST'). The
+        handler starts on the keyword token, must consume through the
+        terminator and returns an AstNode, or None to emit nothing.
+        Registering on a subclass leaves the parent's table untouched.
+        """
+        if "_commands" not in cls.__dict__:
+            cls._commands = dict(cls._commands)
+        if isinstance(keyword, tuple):
+            keyword = (keyword[0].upper(), keyword[1].upper())
+            cls._pair_heads = cls._pair_heads | {keyword[0]}
+        else:
+            keyword = " ".join(keyword.upper().split())
+        cls._commands[keyword] = handler
+
     def parse(self, code: str) -> List[AstNode]:
         self.tokens = self.lexer.tokenize(code)
         self.pos = 0
+        nodes = self._parse_commands()
+        self._link_inline_data(nodes)
+        return nodes
+
+    def parse_iter(self, source: Source, chunk_size: int = 1 << 16) -> Iterator[AstNode]:
+        """
+        Streaming parse(): yields nodes as their commands complete. 'source'
+        may be a str, a text/binary file object or an mmap. Text is read
+        'chunk_size' at a time and cut at command boundaries, and only the
+        pending run of whole commands is lexed, so memory follows the chunk
+        size rather than the script size.
+
+        Inline data spans are offsets into the whole script, as with parse().
+        A DATA LIST is yielded before its BEGIN DATA block is read, and its
+        'data' is filled in when the block arrives. Errors are raised when
+        the failing command is reached, after the nodes before it.
+        """
+        lexer = self.lexer
+        buf = ""
+        base = 0 # Offset of buf[0] in the whole script
+        line_offset = 0 # Lines before buf[0], for error positions
+        scan_at = 0 # Skip the prescan until buf is at least this long
+        data_list = None
+
+        chunks = lexer.iter_chunks(source, chunk_size)
+        for chunk in itertools.chain(chunks, (None,)):
+            if chunk is not None:
+                buf += chunk
+                if len(buf) < scan_at:
+                    continue
+                boundaries = lexer.command_boundaries(buf)
+                if not boundaries:
+                    # No complete command yet (e.g. a long data block): wait
+                    # for buf to double instead of rescanning every chunk
+                    scan_at = 2 * len(buf)
+                    continue
+                scan_at = 0
+            else:
+                boundaries = [len(buf)] # End of input: flush the rest
+
+            start = 0
+            for idx, cut in enumerate(boundaries):
+                if cut - start < chunk_size and idx < len(boundaries) - 1:
+                    continue # Batch small commands into one lex/parse call
+                text = buf[start:cut]
+                self.tokens = lexer.tokenize(text, line_offset)
+                self.pos = 0
+                for node in _shift_spans(self._parse_commands(), base + start):
+                    if isinstance(node, DataListNode):
+                        data_list = node
+                    elif isinstance(node, InlineDataNode) and data_list is not None and data_list.data is None:
+                        data_list.data = node
+                    yield node
+                line_offset += text.count("\n")
+                start = cut
+
+            buf = buf[start:]
+            base += start
+
+    def _parse_commands(self) -> List[AstNode]:
+        """Parses every command in self.tokens from self.pos on."""
         nodes = []
+        commands = self._commands
+        pair_heads = self._pair_heads
+        generic = type(self)._parse_generic_command
 
         while self.pos < len(self.tokens):
-            token = self.current_token()
-            if token.value.upper() == "DATA" and self.peek_token(1).value.upper() == "LIST":
-                nodes.append(self.parse_data_list())
-            elif token.type == TokenType.COMMAND and "AGGREGATE" in token.value.upper():
-                nodes.append(self.parse_aggregate())
-            elif token.value == "GET" and self.peek_token(1).value == "DATA":
-                nodes.append(self._parse_get_data())
-            elif token.value == "COMPUTE":
-                nodes.append(self._parse_compute())
-            elif token.value == "SAVE":
-                nodes.append(self._parse_save())
-            elif token.type == TokenType.COMMAND and "SELECT IF" in token.value.upper():
-                nodes.append(self._parse_select_if())
-            elif token.type == TokenType.COMMAND and "EXECUTE" in token.value.upper():
-                nodes.append(self._parse_execute())
-            elif token.type == TokenType.COMMAND and "MATCH FILES" in token.value.upper():
-                nodes.append(self._parse_match_files())
-            elif token.type == TokenType.COMMAND and "BEGIN DATA" in token.value.upper():
-                self._skip_data_block()
-            elif token.type == TokenType.TERMINATOR:
-                self.advance()
-            elif token.value.upper() == "RECODE":
-                nodes.append(self.parse_recode())
-            elif token.type == TokenType.COMMAND and "SORT" in token.value.upper():
-                nodes.append(self._parse_sort())
-            elif (token.type == TokenType.COMMAND or token.type == TokenType.IDENTIFIER) and \
-                 any(cmd == token.value.upper() for cmd in [
-                "TITLE", "SUBTITLE", "LIST", "DESCRIPTIVES", "FREQUENCIES", 
-                "SET", "CACHE", "SHOW", "DISPLAY", "NOTE"
-            ]):
-                nodes.append(self._parse_ignorable())
-            elif token.type == TokenType.COMMAND and token.value.upper() == "IF":
-                nodes.append(self._parse_if())
+            key = self.current_value().upper()
+            if self.current_type() == TokenType.COMMAND:
+                key = " ".join(key.split()) # 'SELECT\n  IF' -> 'SELECT IF'
 
-            else:
-                nodes.append(self._parse_generic_command())
-        
+            handler = None
+            if key in pair_heads:
+                handler = commands.get((key, self.peek_value(1).upper()))
+            if handler is None:
+                handler = commands.get(key, generic)
+
+            node = handler(self)
+            if node is not None:
+                nodes.append(node)
         return nodes
 
+    def parse_parallel(self, code: str, workers: Optional[int] = None) -> List[AstNode]:
+        """
+        Same result as parse(), computed on a process pool. A prescan finds
+        command boundaries, the script is cut there into roughly equal
+        shards, and each shard is lexed and parsed in its own process.
+        """
+        workers = workers or os.cpu_count() or 1
+        code = code.replace("\r\n", "\n")
+        boundaries = self.lexer.command_boundaries(code)
+        if workers < 2 or not boundaries:
+            return self.parse(code)
+
+        shards = self._plan_shards(code, boundaries, workers * _SHARDS_PER_WORKER)
+        nodes: List[AstNode] = []
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                parse_shard = partial(_parse_shard, (type(self), self._commands, self._pair_heads))
+                for shard_nodes in pool.map(parse_shard, shards):
+                    nodes.extend(shard_nodes)
+        except (SyntaxError, ValueError):
+            # An error in the script: let a full parse report it, so positions are
+            # file-relative and a lexer error late in the file still wins over an
+            # earlier parser error. Pool and pickling failures propagate.
+            return self.parse(code)
+
+        # DATA LIST and its BEGIN DATA block may have landed in different shards
+        self._link_inline_data(nodes)
+        return nodes
+
+    @staticmethod
+    def _plan_shards(code: str, boundaries: List[int], n_shards: int) -> List[Tuple[str, int]]:
+        """
+        Cuts 'code' at the boundaries closest to equal-size targets. Each shard
+        comes with its start offset, to map inline data spans back onto 'code'.
+        """
+        target = len(code) / n_shards
+        cuts = [0]
+        for k in range(1, n_shards):
+            idx = bisect_left(boundaries, int(k * target))
+            if idx < len(boundaries) and boundaries[idx] > cuts[-1]:
+                cuts.append(boundaries[idx])
+        cuts.append(len(code))
+
+        shards = []
+        for start, end in zip(cuts, cuts[1:]):
+            if start != end:
+                shards.append((code[start:end], start))
+        return shards
+
+    def parse_tree(self, code: str) -> ParseTree:
+        """Like parse(), but keeps the per-command index that reparse() needs."""
+        return self._build_tree(code.replace("\r\n", "\n"), None)
+
+    def reparse(self, old_tree: ParseTree, edits: Sequence[TextEdit]) -> ParseTree:
+        """
+        Applies 'edits' to old_tree.source and parses the result, re-lexing
+        and re-parsing only commands whose text changed. Every other node is
+        the same object as in old_tree; new_tree.changed lists the indices
+        of the nodes that were rebuilt.
+        """
+        code = apply_edits(old_tree.source, edits).replace("\r\n", "\n")
+        return self._build_tree(code, old_tree)
+
+    def _build_tree(self, code: str, old_tree: Optional[ParseTree]) -> ParseTree:
+        # Hash index of the old commands; identical texts are reused in order
+        reusable: Dict[bytes, List[CommandEntry]] = {}
+        if old_tree is not None:
+            for entry in reversed(old_tree.commands):
+                reusable.setdefault(entry.digest, []).append(entry)
+
+        tree = ParseTree(source=code)
+        cuts = [0] + self.lexer.command_boundaries(code) + [len(code)]
+        for start, end in zip(cuts, cuts[1:]):
+            if start == end:
+                continue
+            text = code[start:end]
+            digest = command_digest(text)
+            candidates = reusable.get(digest)
+            old_entry = candidates.pop() if candidates else None
+
+            nodes = None
+            if old_entry is not None:
+                nodes = old_tree.nodes[old_entry.first_node:old_entry.first_node + old_entry.node_count]
+                # Inline data records source offsets: reuse it only if it didn't move
+                if old_entry.start != start and any(isinstance(n, InlineDataNode) for n in nodes):
+                    nodes = None
+            if nodes is None:
+                try:
+                    nodes = _shift_spans(self.parse(text), start)
+                except Exception:
+                    self.parse(code) # Raise the error (and position) a full parse would
+                    raise
+                tree.changed.extend(range(len(tree.nodes), len(tree.nodes) + len(nodes)))
+
+            tree.commands.append(CommandEntry(start, end, digest, len(tree.nodes), len(nodes)))
+            tree.nodes.extend(nodes)
+
+        self._relink_inline_data(tree)
+        return tree
+
+    @staticmethod
+    def _relink_inline_data(tree: ParseTree):
+        """_link_inline_data() for a tree whose reused nodes must not be mutated."""
+        expected = {}
+        last = None
+        for idx, node in enumerate(tree.nodes):
+            if isinstance(node, DataListNode):
+                last = idx
+                expected[idx] = None
+            elif isinstance(node, InlineDataNode) and last is not None and expected[last] is None:
+                expected[last] = node
+
+        rebuilt = set(tree.changed)
+        for idx, data in expected.items():
+            node = tree.nodes[idx]
+            if node.data is data:
+                continue
+            if idx in rebuilt:
+                node.data = data
+            else:
+                tree.nodes[idx] = replace(node, data=data)
+                tree.changed.append(idx)
+        tree.changed.sort()
+
+    @staticmethod
+    def _link_inline_data(nodes: List[AstNode]):
+        # Inline data belongs to the closest preceding DATA LIST, if it has none yet
+        data_list = None
+        for node in nodes:
+            if isinstance(node, DataListNode):
+                data_list = node
+            elif isinstance(node, InlineDataNode) and data_list is not None and data_list.data is None:
+                data_list.data = node
+
     # --------------------------------------------------------------------------
     # Legacy Handlers
     # --------------------------------------------------------------------------
 
+    def _skip_terminator(self) -> None:
+        self.advance()
+
+
     def _parse_get_data(self) -> LoadNode:
         self.advance(); self.advance() 
-        params = self._collect_params_until_terminator()
-        filename = params.get('/FILE', 'unknown').strip("'").strip('"')
-        columns = []
+        params = self._collect_param_tokens_until_terminator()
+        filename = self._param_text(params['/FILE']) if '/FILE' in params else 'unknown'
+        file_type = self._param_text(params['/TYPE']) if '/TYPE' in params else 'TXT'
+        columns, formats = [], {}
         if '/VARIABLES' in params:
-            columns = self._parse_variables_block(params['/VARIABLES'])
-        return LoadNode(filename=filename, file_type=params.get('/TYPE', 'TXT'), columns=columns)
+            columns = self._parse_variables_block(params['/VARIABLES'], formats)
+        return LoadNode(filename=filename.strip("'").strip('"'), file_type=file_type, columns=columns, formats=formats)
 
     def _parse_compute(self) -> ComputeNode:
         self.advance() # Skip COMPUTE
         
         # 🟢 Validation 1: Check for Target Identifier
-        if self.current_token().type != TokenType.IDENTIFIER:
-             raise SyntaxError(f"Expected Identifier after COMPUTE, got {self.current_token().value}")
-        target = self.current_token().value
+        if self.current_type() != TokenType.IDENTIFIER:
+             raise SyntaxError(f"Expected Identifier after COMPUTE, got {self.current_value()}")
+        target = self.current_value()
         self.advance()
         
         # 🟢 Validation 2: Check for Equals Sign
-        if self.current_token().type != TokenType.EQUALS:
-             raise SyntaxError(f"Expected '=' in COMPUTE command, got {self.current_token().value}")
+        if self.current_type() != TokenType.EQUALS:
+             raise SyntaxError(f"Expected '=' in COMPUTE command, got {self.current_value()}")
         self.advance() 
 
-        expr = ""
-        while self.current_token().type != TokenType.TERMINATOR:
-            expr += self.current_token().value + " "
-            self.advance()
+        first = self.pos
+        expr = self._capture_until_terminator()
+        tree = parse_expression_tokens(self.tokens, first, self.pos)
         self.advance()
-        return ComputeNode(target=target, expression=expr.strip())
+        return ComputeNode(target=target, expression=expr, expression_tree=tree)
 
     def _parse_select_if(self) -> FilterNode:
-        self.advance(); cond = ""
-        while self.current_token().type != TokenType.TERMINATOR:
-            cond += self.current_token().value + " "; self.advance()
         self.advance()
-        return FilterNode(condition=cond.strip())
+        first = self.pos
+        cond = self._capture_until_terminator()
+        tree = parse_expression_tokens(self.tokens, first, self.pos)
+        self.advance()
+        return FilterNode(condition=cond, condition_tree=tree)
 
     def _parse_execute(self) -> MaterializeNode:
         self.advance()
-        if self.current_token().type == TokenType.TERMINATOR: self.advance()
+        if self.current_type() == TokenType.TERMINATOR: self.advance()
         return MaterializeNode()
 
     def _parse_save(self) -> SaveNode:
         self.advance(); params = self._collect_params_until_terminator()
         return SaveNode(filename=params.get('OUTFILE', params.get('/OUTFILE', 'unknown')).strip("'").strip('"'))
 
-    def _skip_data_block(self):
-        self.advance()
-        while self.pos < len(self.tokens):
-            if self.current_token().type == TokenType.COMMAND and "END DATA" in self.current_token().value.upper():
-                self.advance()
-                if self.current_token().type == TokenType.TERMINATOR: self.advance()
-                return
+    def _parse_data_block(self) -> InlineDataNode:
+        """The lexer hands the whole block over as a single DATA_BLOCK token."""
+        self.advance() # Skip BEGIN DATA
+        node = InlineDataNode()
+        if self.current_type() == TokenType.DATA_BLOCK:
+            node.start, node.end = self.tokens.starts[self.pos], self.tokens.ends[self.pos]
+            node.content = self.current_value()
             self.advance()
-   
+        if self.current_type() == TokenType.COMMAND and "END DATA" in self.current_value().upper():
+            self.advance()
+            if self.current_type() == TokenType.TERMINATOR: self.advance()
+        return node
 
     def _parse_generic_command(self) -> GenericNode:
-        cmd = self.current_token().value
+        cmd = self.current_value()
         self.advance()
         
         # Capture the rest of the command as content
         content_parts = []
-        while self.pos < len(self.tokens) and self.current_token().type != TokenType.TERMINATOR:
-            content_parts.append(self.current_token().value)
+        while self.pos < len(self.tokens) and self.current_type() != TokenType.TERMINATOR:
+            content_parts.append(self.current_value())
             self.advance()
         
         self.advance() # Terminator
@@ -136,32 +388,36 @@ class SpssParser(SchemaParserMixin,
     def _parse_match_files(self) -> JoinNode:
         self.advance() # Skip MATCH FILES token
         sources = []
+        tables = []
         by_keys = []
         
-        while self.current_token().type != TokenType.TERMINATOR:
-            t = self.current_token()
+        while self.current_type() != TokenType.TERMINATOR:
+            t_type = self.current_type()
             
-            if t.type == TokenType.SUBCOMMAND:
+            if t_type == TokenType.SUBCOMMAND:
+                sub_cmd = self.current_value().upper()
                 # 🟢 FIX: Accept both /FILE and /TABLE as valid input sources
-                if t.value.upper() in ["/FILE", "/TABLE"]:
+                if sub_cmd in ["/FILE", "/TABLE"]:
                     self.advance() # Skip the subcommand
                     
                     # Skip optional equals sign
-                    if self.current_token().type == TokenType.EQUALS: 
+                    if self.current_type() == TokenType.EQUALS: 
                         self.advance()
                     
                     # Extract filename and strip quotes immediately
-                    clean_source = self.current_token().value.strip("'").strip('"')
+                    clean_source = self.current_value().strip("'").strip('"')
                     sources.append(clean_source)
+                    if sub_cmd == "/TABLE":
+                        tables.append(clean_source)
                     
                     self.advance() # Move past the filename
                     
-                elif t.value.upper() == "/BY":
+                elif sub_cmd == "/BY":
                     self.advance()
-                    if self.current_token().type == TokenType.EQUALS: 
+                    if self.current_type() == TokenType.EQUALS: 
                         self.advance()
-                    while self.current_token().type == TokenType.IDENTIFIER:
-                        by_keys.append(self.current_token().value)
+                    while self.current_type() == TokenType.IDENTIFIER:
+                        by_keys.append(self.current_value())
                         self.advance()
                 else:
                     self.advance() # Skip unknown subcommands
@@ -169,36 +425,53 @@ class SpssParser(SchemaParserMixin,
                 self.advance() # Skip unknown tokens
                 
         self.advance() # Skip Terminator (.)
-        return JoinNode(sources=sources, by=by_keys)
+        return JoinNode(sources=sources, by=by_keys, tables=tables)
    
     def _parse_ignorable(self) -> IgnorableNode:
-        cmd = self.current_token().value
+        cmd = self.current_value()
         self.advance()
         
         # Consume content until terminator (optional, just for metadata)
-        content = ""
-        while self.pos < len(self.tokens) and self.current_token().type != TokenType.TERMINATOR:
-            content += self.current_token().value + " "
-            self.advance()
+        content = self._capture_until_terminator()
         
         self.advance() # Skip terminator
-        return IgnorableNode(command=cmd, content=content.strip())
+        return IgnorableNode(command=cmd, content=content)
     
     def _parse_sort(self) -> SortNode:
         # Consumes: SORT CASES [BY] var1 var2 ...
         self.advance() # Skip 'SORT' token
         
         # Skip optional keywords 'CASES' and 'BY'
-        if self.current_token().value.upper() == "CASES":
+        if self.current_value().upper() == "CASES":
             self.advance()
-        if self.current_token().value.upper() == "BY":
+        if self.current_value().upper() == "BY":
             self.advance()
             
         keys = []
         # Collect identifiers until we hit a terminator or unknown token
-        while self.current_token().type == TokenType.IDENTIFIER:
-            keys.append(self.current_token().value)
+        while self.current_type() == TokenType.IDENTIFIER:
+            keys.append(self.current_value())
             self.advance()
             
         self.advance() # Skip Terminator (.)
-        return SortNode(keys=keys)
\ No newline at end of file
+        return SortNode(keys=keys)
+
+
+# 🟢 Command table: one dict lookup per command instead of an if/elif chain
+for _keyword, _handler in [
+    (("DATA", "LIST"), SpssParser.parse_data_list),
+    (("GET", "DATA"), SpssParser._parse_get_data),
+    ("AGGREGATE", SpssParser.parse_aggregate),
+    ("COMPUTE", SpssParser._parse_compute),
+    ("SAVE", SpssParser._parse_save),
+    ("SELECT IF", SpssParser._parse_select_if),
+    ("EXECUTE", SpssParser._parse_execute),
+    ("MATCH FILES", SpssParser._parse_match_files),
+    ("BEGIN DATA", SpssParser._parse_data_block),
+    (".", SpssParser._skip_terminator),
+    ("RECODE", SpssParser.parse_recode),
+    ("SORT", SpssParser._parse_sort),
+    ("IF", SpssParser._parse_if),
+    *((cmd, SpssParser._parse_ignorable) for cmd in IGNORABLE_COMMANDS),
+]:
+    SpssParser.register_command(_keyword, _handler)
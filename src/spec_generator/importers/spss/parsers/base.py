@@ -1,62 +1,119 @@
-from typing import List, Dict, Optional
-from spec_generator.importers.spss.tokens import Token, TokenType
+from typing import Dict, List
+from spec_generator.importers.spss.tokens import Token, TokenStream, TokenType
 from spec_generator.importers.spss.lexer import SpssLexer
 
+# Returned for reads past the end of the stream; built once, never per call.
+END_OF_INPUT = Token(TokenType.TERMINATOR, ".", -1, -1)
+
+_TERMINATOR = TokenType.TERMINATOR.value
+_SUBCOMMAND = TokenType.SUBCOMMAND.value
+_IDENTIFIER = TokenType.IDENTIFIER.value
+_EQUALS = TokenType.EQUALS.value
+
 class BaseParserMixin:
     """
     Provides core navigation methods (advance, peek, match) for the Parser.
     Expected to be mixed into a class that has 'self.tokens' and 'self.pos'.
+
+    'self.tokens' is a columnar TokenStream: current_type()/peek_type() read
+    the kind array directly and current_value()/peek_value() slice the source
+    on demand, so walking the stream allocates no Token objects.
     """
     
+    # When True, captured expressions/conditions are lazy SourceSpan views
+    # instead of str slices (no copy until something reads them).
+    lazy_spans = False
+
     def __init__(self):
         # These will be populated by the main SpssParser.parse() method
-        self.tokens: List[Token] = []
+        self.tokens: TokenStream = TokenStream("")
         self.pos = 0
         self.lexer = SpssLexer() # Helper for parsing sub-blocks
 
+    def current_type(self) -> TokenType:
+        return self.tokens.type_at(self.pos)
+
+    def current_value(self) -> str:
+        return self.tokens.value_at(self.pos)
+
+    def peek_type(self, offset: int) -> TokenType:
+        return self.tokens.type_at(self.pos + offset)
+
+    def peek_value(self, offset: int) -> str:
+        return self.tokens.value_at(self.pos + offset)
+
     def current_token(self) -> Token:
+        """Materialises the current token (debugging / error reporting only)."""
         if self.pos >= len(self.tokens): 
-            return Token(TokenType.TERMINATOR, ".", -1, -1)
+            return END_OF_INPUT
         return self.tokens[self.pos]
 
     def peek_token(self, offset: int) -> Token:
         if self.pos + offset >= len(self.tokens): 
-            return Token(TokenType.TERMINATOR, ".", -1, -1)
+            return END_OF_INPUT
         return self.tokens[self.pos + offset]
 
     def advance(self):
         self.pos += 1
 
+    def _source_text(self, first: int, last: int):
+        """Source of tokens first..last (inclusive) as one slice, spacing kept."""
+        if self.lazy_spans:
+            return self.tokens.span_between(first, last)
+        return self.tokens.text_between(first, last)
+
+    def _capture_until_terminator(self):
+        """
+        Skips to the terminator (not consumed) and returns the source text
+        of the skipped tokens.
+        """
+        first = self.pos
+        while self.pos < len(self.tokens) and self.current_type() != TokenType.TERMINATOR:
+            self.advance()
+        return self._source_text(first, self.pos - 1)
+
     def _collect_params_until_terminator(self) -> Dict[str, str]:
         """
         Helper: Collects key-value pairs (e.g. /FILE='x' or /BREAK=y) until a dot.
         """
+        return {
+            key: self._param_text(indices)
+            for key, indices in self._collect_param_tokens_until_terminator().items()
+        }
+
+    def _collect_param_tokens_until_terminator(self) -> Dict[str, List[int]]:
+        """
+        Like _collect_params_until_terminator, but maps each key to the token
+        indices of its value, so callers can read them without re-lexing.
+        """
         params = {}
-        current_key = None
-        buffer = []
+        indices = None
+        # Hot on wide /VARIABLES blocks: walk the kind codes directly
+        kinds = self.tokens.kinds
+        count = len(kinds)
+        pos = self.pos
 
-        while self.pos < len(self.tokens) and self.current_token().type != TokenType.TERMINATOR:
-            t = self.current_token()
-            next_t = self.peek_token(1)
+        while pos < count and kinds[pos] != _TERMINATOR:
+            kind = kinds[pos]
 
             # Detect Keys: Subcommands (/KEY) OR Identifiers followed by equals (KEY =)
-            is_subcommand = (t.type == TokenType.SUBCOMMAND)
-            is_implicit_key = (t.type == TokenType.IDENTIFIER and next_t.type == TokenType.EQUALS)
+            is_subcommand = (kind == _SUBCOMMAND)
+            is_implicit_key = (kind == _IDENTIFIER and pos + 1 < count and kinds[pos + 1] == _EQUALS)
 
             if is_subcommand or is_implicit_key:
-                if current_key: 
-                    params[current_key] = " ".join(buffer).strip()
-                current_key = t.value
-                buffer = []
-            elif t.type == TokenType.EQUALS:
+                indices = []
+                params[self.tokens.value_at(pos)] = indices
+            elif kind == _EQUALS:
                 pass 
-            else:
-                buffer.append(t.value)
+            elif indices is not None:
+                indices.append(pos)
             
-            self.advance()
-        
-        if current_key: 
-            params[current_key] = " ".join(buffer).strip()
+            pos += 1
             
-        self.advance() # Consume terminator
-        return params
\ No newline at end of file
+        self.pos = pos + 1 # Consume terminator
+        return params
+
+    def _param_text(self, indices: List[int]) -> str:
+        """A parameter value as text: its token values joined by spaces."""
+        value_at = self.tokens.value_at
+        return " ".join(value_at(i) for i in indices).strip()
@@ -0,0 +1,261 @@
+import math
+from decimal import Decimal
+from typing import Callable, Dict, FrozenSet, NamedTuple, Optional, Tuple
+from spec_generator.importers.spss.ast import BinaryOp, ColumnRef, Expr, FunctionCall, Literal, UnaryOp
+from spec_generator.importers.spss.lexer import SpssLexer
+from spec_generator.importers.spss.tokens import TokenStream, TokenType
+
+# ------------------------------------------------------------------------------
+# 🧮 SPSS EXPRESSION GRAMMAR (operator precedence / Pratt parsing)
+# ------------------------------------------------------------------------------
+
+# Every spelling of a binary operator -> its canonical form
+BINARY_OPERATORS = {
+    "+": "+", "-": "-", "*": "*", "/": "/", "**": "**",
+    "=": "=", "EQ": "=",
+    "<>": "<>", "~=": "<>", "NE": "<>",
+    "<": "<", "LT": "<", ">": ">", "GT": ">",
+    "<=": "<=", "LE": "<=", ">=": ">=", "GE": ">=",
+    "&": "AND", "AND": "AND", "|": "OR", "OR": "OR",
+}
+
+# Word operators: never column names inside an expression
+KEYWORD_OPERATORS = frozenset(("EQ", "NE", "LT", "GT", "LE", "GE", "AND", "OR", "NOT"))
+
+# Canonical operator -> (left, right) binding power. Left-associative
+# operators bind tighter on the right; '**' is right-associative.
+_BINDING_POWER = {
+    "OR": (10, 11),
+    "AND": (20, 21),
+    "=": (40, 41), "<>": (40, 41), "<": (40, 41), ">": (40, 41), "<=": (40, 41), ">=": (40, 41),
+    "+": (50, 51), "-": (50, 51),
+    "*": (60, 61), "/": (60, 61),
+    "**": (80, 79),
+}
+_NOT_POWER = 30    # NOT a = b  ->  NOT (a = b)
+_SIGN_POWER = 70   # -a ** 2    ->  -(a ** 2)
+
+_OPERATOR_KINDS = (TokenType.OPERATOR, TokenType.EQUALS)
+
+
+class ExpressionError(ValueError):
+    pass
+
+
+class PrattExpressionParser:
+    """
+    Builds an Expr tree from tokens [first, end) of a TokenStream, without
+    re-lexing. Raises ExpressionError if the range is not one expression.
+    """
+
+    def __init__(self, tokens: TokenStream, first: int, end: int):
+        self.tokens = tokens
+        self.pos = first
+        self.end = end
+
+    def parse(self) -> Expr:
+        expr = self._expression(0)
+        if self.pos != self.end:
+            raise ExpressionError(f"Unexpected '{self.tokens.value_at(self.pos)}' in expression")
+        return expr
+
+    def _kind(self) -> Optional[TokenType]:
+        return self.tokens.type_at(self.pos) if self.pos < self.end else None
+
+    def _binary_operator(self) -> Optional[str]:
+        kind = self._kind()
+        if kind in _OPERATOR_KINDS:
+            return BINARY_OPERATORS.get(self.tokens.value_at(self.pos))
+        if kind == TokenType.IDENTIFIER:
+            return BINARY_OPERATORS.get(self.tokens.value_at(self.pos).upper())
+        return None
+
+    def _expect(self, kind: TokenType, what: str):
+        if self._kind() != kind:
+            raise ExpressionError(f"Expected {what} in expression")
+        self.pos += 1
+
+    def _expression(self, min_power: int) -> Expr:
+        left = self._prefix()
+        while True:
+            op = self._binary_operator()
+            if op is None:
+                return left
+            left_power, right_power = _BINDING_POWER[op]
+            if left_power < min_power:
+                return left
+            self.pos += 1
+            left = BinaryOp(op=op, left=left, right=self._expression(right_power))
+
+    def _prefix(self) -> Expr:
+        kind = self._kind()
+        if kind is None:
+            raise ExpressionError("Expression ended early")
+        value = self.tokens.value_at(self.pos)
+        self.pos += 1
+
+        if kind == TokenType.NUMBER_LITERAL:
+            return Literal(value=float(value) if "." in value else int(value))
+        if kind == TokenType.STRING_LITERAL:
+            quote = value[0]
+            return Literal(value=value[1:-1].replace(quote * 2, quote))
+        if kind == TokenType.LPAREN:
+            inner = self._expression(0)
+            self._expect(TokenType.RPAREN, "')'")
+            return inner
+        if kind == TokenType.OPERATOR and value in ("-", "+"):
+            return UnaryOp(op=value, operand=self._expression(_SIGN_POWER))
+        if kind == TokenType.OPERATOR and value == "~":
+            return UnaryOp(op="NOT", operand=self._expression(_NOT_POWER))
+        if kind == TokenType.IDENTIFIER:
+            upper = value.upper()
+            if upper == "NOT":
+                return UnaryOp(op="NOT", operand=self._expression(_NOT_POWER))
+            if upper in KEYWORD_OPERATORS:
+                raise ExpressionError(f"Operator '{value}' has no left operand")
+            if self._kind() == TokenType.LPAREN:
+                self.pos += 1
+                return FunctionCall(name=upper, args=self._arguments())
+            return ColumnRef(name=value)
+        raise ExpressionError(f"Unexpected '{value}' in expression")
+
+    def _arguments(self) -> Tuple[Expr, ...]:
+        args = []
+        if self._kind() == TokenType.RPAREN:
+            self.pos += 1
+            return ()
+        while True:
+            args.append(self._expression(0))
+            if self._kind() == TokenType.COMMA:
+                self.pos += 1
+                continue
+            self._expect(TokenType.RPAREN, "')' after arguments")
+            return tuple(args)
+
+
+def parse_expression_tokens(tokens: TokenStream, first: int, end: int) -> Optional[Expr]:
+    """Tolerant entry point: the tree for tokens [first, end), or None."""
+    try:
+        return PrattExpressionParser(tokens, first, end).parse()
+    except (ExpressionError, RecursionError):
+        return None
+
+
+def parse_expression(text: str) -> Optional[Expr]:
+    """Parses a standalone expression string (e.g. an IR parameter), or None."""
+    try:
+        tokens = SpssLexer().tokenize(text)
+    except SyntaxError:
+        return None
+    return parse_expression_tokens(tokens, 0, len(tokens))
+
+
+def referenced_columns(expr: Optional[Expr]) -> FrozenSet[str]:
+    """Names of all columns an expression reads."""
+    names = set()
+    stack = [expr] if expr is not None else []
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ColumnRef):
+            names.add(node.name)
+        elif isinstance(node, BinaryOp):
+            stack.append(node.left)
+            stack.append(node.right)
+        elif isinstance(node, UnaryOp):
+            stack.append(node.operand)
+        elif isinstance(node, FunctionCall):
+            stack.extend(node.args)
+    return frozenset(names)
+
+
+# Canonical operator -> how expression_text() spells it. Symbols rather
+# than AND/OR/NOT, which the lexer reads back the same way.
+_OPERATOR_TEXT = {"AND": "&", "OR": "|"}
+# ... and how pandas_text() does
+_PANDAS_TEXT = {"=": "==", "<>": "!=", "AND": "&", "OR": "|"}
+_LOGICAL = ("AND", "OR")
+
+
+class _Dialect(NamedTuple):
+    operators: Dict[str, str]
+    string: Callable[[str], str]
+    column: Callable[[str], str]
+
+
+_SPSS = _Dialect(_OPERATOR_TEXT, lambda value: "'" + value.replace("'", "''") + "'", str)
+_PANDAS = _Dialect(
+    _PANDAS_TEXT, repr,
+    lambda name: name if name.isidentifier() else "`" + name + "`", # e.g. 'a.b', '#tmp'
+)
+
+
+def expression_text(expr: Expr) -> str:
+    """
+    SPSS text for an expression tree; parse_expression() reads it back
+    as the same tree (a negative number comes back as '-' applied to a
+    literal). Operands of '&', '|' and '~' are parenthesized
+    whenever they are operations, so the text also means the same thing
+    to evaluators where those bind tighter than comparisons (pandas).
+    """
+    return _text(expr, _SPSS)
+
+
+def pandas_text(expr: Expr) -> str:
+    """expression_text() in DataFrame.eval()/query() syntax: '==', '!=', Python string literals."""
+    return _text(expr, _PANDAS)
+
+
+def _text(expr: Expr, dialect: _Dialect) -> str:
+    if isinstance(expr, Literal):
+        if isinstance(expr.value, str):
+            return dialect.string(expr.value)
+        return _number_text(expr.value)
+    if isinstance(expr, ColumnRef):
+        return dialect.column(expr.name)
+    if isinstance(expr, FunctionCall):
+        return f"{expr.name}({', '.join(_text(arg, dialect) for arg in expr.args)})"
+    if isinstance(expr, UnaryOp):
+        if expr.op == "NOT":
+            return f"~{_operand_text(expr.operand, True, dialect)}"
+        return f"{expr.op}{_operand_text(expr.operand, _power(expr.operand) < _SIGN_POWER, dialect)}"
+    if isinstance(expr, BinaryOp):
+        power = _power(expr)
+        right_assoc = expr.op == "**"
+        left_wrap = _power(expr.left) < power or (right_assoc and _power(expr.left) == power)
+        right_wrap = _power(expr.right) < power or (not right_assoc and _power(expr.right) == power)
+        if expr.op in _LOGICAL: # Comparisons (any operation) under &, | always get parentheses
+            left_wrap = left_wrap or not _is_logical(expr.left)
+            right_wrap = right_wrap or not _is_logical(expr.right)
+        left = _operand_text(expr.left, left_wrap, dialect)
+        right = _operand_text(expr.right, right_wrap, dialect)
+        return f"{left} {dialect.operators.get(expr.op, expr.op)} {right}"
+    raise ValueError(f"Not an expression: {expr!r}")
+
+
+def _number_text(value) -> str:
+    """Positional notation (the lexer reads no exponents): 1e-05 -> '0.00001'."""
+    if not isinstance(value, float) or not math.isfinite(value):
+        return repr(value)
+    text = format(Decimal(repr(value)), "f")
+    return text if "." in text else text + ".0"
+
+
+def _power(expr: Expr) -> int:
+    """How tightly an expression holds together when printed (higher: needs fewer parentheses)."""
+    if isinstance(expr, BinaryOp):
+        return _BINDING_POWER[expr.op][0]
+    if isinstance(expr, UnaryOp):
+        return _NOT_POWER if expr.op == "NOT" else _SIGN_POWER
+    if isinstance(expr, Literal) and not isinstance(expr.value, str) and expr.value < 0:
+        return _SIGN_POWER # Printed with a leading '-'
+    return 100
+
+
+def _is_logical(expr: Expr) -> bool:
+    return isinstance(expr, BinaryOp) and expr.op in _LOGICAL
+
+
+def _operand_text(expr: Expr, wrap: bool, dialect: _Dialect) -> str:
+    """Operand text, parenthesized if 'wrap' and it is an operation."""
+    text = _text(expr, dialect)
+    return f"({text})" if wrap and _power(expr) < 100 else text
@@ -2,6 +2,7 @@ from typing import List
 from spec_generator.importers.spss.parsers.base import BaseParserMixin
 from spec_generator.importers.spss.tokens import TokenType
 from spec_generator.importers.spss.ast import IfNode, RecodeNode, SortNode
+from spec_generator.importers.spss.parsers.expressions import KEYWORD_OPERATORS, parse_expression_tokens
 
 class LogicParserMixin(BaseParserMixin):
     
@@ -10,31 +11,31 @@ class LogicParserMixin(BaseParserMixin):
         
         # 1. Capture Source Variables
         source_vars = []
-        while self.current_token().type == TokenType.IDENTIFIER:
+        while self.current_type() == TokenType.IDENTIFIER:
             # Avoid capturing keywords like INTO if user forgot parens (unlikely but safe)
-            if self.current_token().value.upper() == "INTO":
+            if self.current_value().upper() == "INTO":
                 break
-            source_vars.append(self.current_token().value)
+            source_vars.append(self.current_value())
             self.advance()
             
         # 2. Skip the mapping rules until 'INTO' or terminator
         mapping_logic = []
         target_vars = []
         
-        while self.current_token().type != TokenType.TERMINATOR:
-            t = self.current_token()
+        while self.current_type() != TokenType.TERMINATOR:
+            value = self.current_value()
             
             # Detect the structural keyword "INTO"
-            if t.type == TokenType.IDENTIFIER and t.value.upper() == "INTO":
+            if self.current_type() == TokenType.IDENTIFIER and value.upper() == "INTO":
                 self.advance() # Skip INTO
                 
                 # Now capture targets
-                while self.current_token().type == TokenType.IDENTIFIER:
-                    target_vars.append(self.current_token().value)
+                while self.current_type() == TokenType.IDENTIFIER:
+                    target_vars.append(self.current_value())
                     self.advance()
                 break # We usually stop parsing after targets
                 
-            mapping_logic.append(t.value)
+            mapping_logic.append(value)
             self.advance()
             
         self.advance() # Skip terminator
@@ -54,15 +55,15 @@ class LogicParserMixin(BaseParserMixin):
         self.advance() # Skip 'SORT' token
         
         # Skip optional keywords 'CASES' and 'BY'
-        if self.current_token().value.upper() == "CASES":
+        if self.current_value().upper() == "CASES":
             self.advance()
-        if self.current_token().value.upper() == "BY":
+        if self.current_value().upper() == "BY":
             self.advance()
             
         keys = []
         # Collect identifiers until we hit a terminator or unknown token
-        while self.current_token().type == TokenType.IDENTIFIER:
-            keys.append(self.current_token().value)
+        while self.current_type() == TokenType.IDENTIFIER:
+            keys.append(self.current_value())
             self.advance()
             
         self.advance() # Skip Terminator (.)
@@ -72,34 +73,62 @@ class LogicParserMixin(BaseParserMixin):
         # Syntax: IF (condition) target = expression.
         self.advance() # Skip 'IF'
         
-        # 1. Capture everything until the assignment '='
-        # We assume the last identifier before '=' is the target.
-        pre_assignment_tokens = []
-        while self.current_token().type != TokenType.EQUALS and self.current_token().type != TokenType.TERMINATOR:
-            pre_assignment_tokens.append(self.current_token())
+        # 1. Find the assignment '='. The condition may itself contain '='
+        # (IF (x = 1) y = 2), so prefer an '=' outside parentheses whose
+        # target directly follows the end of an operand.
+        first = self.pos
+        assign = None
+        fallback = None
+        depth = 0
+        while self.current_type() != TokenType.TERMINATOR:
+            t_type = self.current_type()
+            if t_type == TokenType.LPAREN:
+                depth += 1
+            elif t_type == TokenType.RPAREN:
+                depth -= 1
+            elif t_type == TokenType.EQUALS:
+                if fallback is None:
+                    fallback = self.pos
+                if depth == 0 and self.peek_type(-1) == TokenType.IDENTIFIER and self._follows_operand(self.pos - 2, first):
+                    assign = self.pos
+                    break
             self.advance()
+        assign = assign if assign is not None else fallback
             
-        if self.current_token().type != TokenType.EQUALS:
+        if assign is None:
              raise SyntaxError("Expected '=' in IF command assignment.")
+        self.pos = assign
              
         # The Target is the last token before '='
-        target_token = pre_assignment_tokens.pop()
-        if target_token.type != TokenType.IDENTIFIER:
-             raise SyntaxError(f"Expected target variable before '=', got {target_token.value}")
-        target = target_token.value
+        target_idx = self.pos - 1
+        if target_idx < first or self.tokens.type_at(target_idx) != TokenType.IDENTIFIER:
+             raise SyntaxError(f"Expected target variable before '=', got {self.tokens.value_at(target_idx)}")
+        target = self.tokens.value_at(target_idx)
         
-        # The Condition is everything else before the target
-        condition = " ".join([t.value for t in pre_assignment_tokens]).strip()
+        # The Condition is everything else before the target (one source slice)
+        condition = self._source_text(first, target_idx - 1)
+        condition_tree = parse_expression_tokens(self.tokens, first, target_idx)
         
         # 2. Skip the Equals
         self.advance() 
         
         # 3. Capture the Expression
-        expr = ""
-        while self.current_token().type != TokenType.TERMINATOR:
-            expr += self.current_token().value + " "
-            self.advance()
+        expr_first = self.pos
+        expr = self._capture_until_terminator()
+        expression_tree = parse_expression_tokens(self.tokens, expr_first, self.pos)
             
         self.advance() # Skip Terminator
         
-        return IfNode(condition=condition, target=target, expression=expr.strip())
\ No newline at end of file
+        return IfNode(
+            condition=condition, target=target, expression=expr,
+            condition_tree=condition_tree, expression_tree=expression_tree
+        )
+
+    def _follows_operand(self, index: int, first: int) -> bool:
+        """True if token 'index' can end an operand (so an identifier after it starts a new part)."""
+        if index < first:
+            return False
+        t_type = self.tokens.type_at(index)
+        if t_type == TokenType.IDENTIFIER:
+            return self.tokens.value_at(index).upper() not in KEYWORD_OPERATORS
+        return t_type in (TokenType.RPAREN, TokenType.NUMBER_LITERAL, TokenType.STRING_LITERAL)
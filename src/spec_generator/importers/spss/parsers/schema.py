@@ -1,10 +1,14 @@
-from typing import List, Tuple
+from typing import Dict, Iterable, List
 from spec_generator.importers.spss.parsers.base import BaseParserMixin
 from spec_generator.importers.spss.tokens import TokenType
 from spec_generator.importers.spss.ast import DataListNode
 from etl_ir.types import DataType
 from etl_ir.model import Column
 
+_PARENS = (TokenType.LPAREN.value, TokenType.RPAREN.value)
+_IDENTIFIER = TokenType.IDENTIFIER.value
+_TERMINATOR = TokenType.TERMINATOR.value
+
 class SchemaParserMixin(BaseParserMixin):
     """
     Handles commands that define dataset structure: DATA LIST, VARIABLES.
@@ -15,55 +19,57 @@ class SchemaParserMixin(BaseParserMixin):
         self.advance() # Skip LIST
         
         # Skip optional keywords (FREE, LIST, etc) until '/'
-        while self.current_token().type != TokenType.SUBCOMMAND and \
-              self.current_token().type != TokenType.TERMINATOR and \
-              self.current_token().value != "/":
+        while self.current_type() != TokenType.SUBCOMMAND and \
+              self.current_type() != TokenType.TERMINATOR and \
+              self.current_value() != "/":
              self.advance()
         
-        columns = []
-        if self.current_token().value == "/":
+        columns, formats = [], {}
+        if self.current_value() == "/":
             self.advance() # Skip slash
             
-            # 🟢 ROBUST PAREN REMOVAL LOGIC
-            var_block_tokens = []
-            while self.current_token().type != TokenType.TERMINATOR:
-                t = self.current_token()
-                if t.type != TokenType.LPAREN and t.type != TokenType.RPAREN:
-                    var_block_tokens.append(t.value)
+            # 🟢 Read the block in place: format parens are skipped, not stripped from a copy
+            kinds = self.tokens.kinds
+            first = self.pos
+            while self.pos < len(kinds) and kinds[self.pos] != _TERMINATOR:
                 self.advance()
-            
-            block_str = " ".join(var_block_tokens)
-            columns = self._parse_variables_block(block_str)
+            columns = self._parse_variables_block(
+                (i for i in range(first, self.pos) if kinds[i] not in _PARENS), formats
+            )
             
         self.advance() # Skip terminator
-        return DataListNode(columns=columns)
+        return DataListNode(columns=columns, formats=formats)
 
-    def _parse_variables_block(self, block_text: str) -> List[Column]:
+    def _parse_variables_block(self, indices: Iterable[int], formats: Dict[str, str] = None) -> List[Column]:
         """
-        Parses "name type name type" strings.
+        Parses "name type name type" pairs from the given token indices,
+        reading the already-lexed stream (no re-tokenizing). The format of
+        each column, as written, goes into 'formats' if given.
         """
-        # We need a fresh lexer for this block logic
-        block_tokens = self.lexer.tokenize(block_text + ".")
+        kinds = self.tokens.kinds
+        value_at = self.tokens.value_at
         columns = []
-        i = 0
-        while i < len(block_tokens) - 1:
-            t_name = block_tokens[i]
-            t_type = block_tokens[i+1]
-            
-            if t_name.type == TokenType.IDENTIFIER:
-                col_type = DataType.UNKNOWN
-                type_val = t_type.value.upper()
-                
-                if "DATE" in type_val: 
-                    col_type = DataType.DATE
-                elif type_val.startswith("F") or "NUM" in type_val: 
-                    col_type = DataType.INTEGER
-                elif type_val.startswith("A") or "STR" in type_val: 
-                    col_type = DataType.STRING
-                
-                columns.append(Column(name=t_name.value, type=col_type))
-                
-                i += 2
-            else:
-                i += 1
-        return columns
\ No newline at end of file
+        name = None
+        for i in indices:
+            if name is not None:
+                format_spec = value_at(i)
+                columns.append(Column(name=name, type=self._column_type(format_spec)))
+                if formats is not None:
+                    formats[name] = format_spec
+                name = None
+            elif kinds[i] == _IDENTIFIER:
+                name = value_at(i)
+        if name is not None:
+            columns.append(Column(name=name, type=DataType.UNKNOWN))
+        return columns
+
+    @staticmethod
+    def _column_type(format_spec: str) -> DataType:
+        type_val = format_spec.upper()
+        if "DATE" in type_val: 
+            return DataType.DATE
+        if type_val.startswith("F") or "NUM" in type_val: 
+            return DataType.INTEGER
+        if type_val.startswith("A") or "STR" in type_val: 
+            return DataType.STRING
+        return DataType.UNKNOWN
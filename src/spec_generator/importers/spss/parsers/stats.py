@@ -11,30 +11,28 @@ class StatsParserMixin(BaseParserMixin):
         break_vars = []
         aggregations = []
         
-        while self.current_token().type != TokenType.TERMINATOR:
-            t = self.current_token()
-            
-            if t.type == TokenType.SUBCOMMAND:
-                sub_cmd = t.value.upper()
+        while self.current_type() != TokenType.TERMINATOR:
+            if self.current_type() == TokenType.SUBCOMMAND:
+                sub_cmd = self.current_value().upper()
                 self.advance() 
                 
-                if self.current_token().type == TokenType.EQUALS:
+                if self.current_type() == TokenType.EQUALS:
                     self.advance()
                 
                 if sub_cmd == "/OUTFILE":
-                    outfile = self.current_token().value.strip("'").strip('"')
+                    outfile = self.current_value().strip("'").strip('"')
                     self.advance()
                 elif sub_cmd == "/BREAK":
-                    while self.current_token().type == TokenType.IDENTIFIER:
-                        break_vars.append(self.current_token().value)
+                    while self.current_type() == TokenType.IDENTIFIER:
+                        break_vars.append(self.current_value())
                         self.advance()
                 else:
                     # Aggregation Formula
                     target = sub_cmd.replace("/", "")
                     expr_parts = []
-                    while (self.current_token().type != TokenType.SUBCOMMAND and 
-                           self.current_token().type != TokenType.TERMINATOR):
-                        expr_parts.append(self.current_token().value)
+                    while (self.current_type() != TokenType.SUBCOMMAND and 
+                           self.current_type() != TokenType.TERMINATOR):
+                        expr_parts.append(self.current_value())
                         self.advance()
                     aggregations.append(f"{target} = {' '.join(expr_parts)}")
             else:
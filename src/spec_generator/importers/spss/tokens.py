@@ -1,5 +1,9 @@
+from array import array
+from bisect import bisect_right
 from enum import Enum, auto
 from dataclasses import dataclass
+from sys import intern
+from typing import Iterator, Optional
 
 class TokenType(Enum):
     # Structural
@@ -11,6 +15,7 @@ class TokenType(Enum):
     IDENTIFIER = auto()   # variable_name, column_id
     STRING_LITERAL = auto() # "filename.csv", 'value'
     NUMBER_LITERAL = auto() # 123, 45.6
+    DATA_BLOCK = auto()   # Raw text between BEGIN DATA and END DATA
     
     # Operators & Punctuation
     EQUALS = auto()       # =
@@ -27,4 +32,136 @@ class Token:
     type: TokenType
     value: str
     line: int
-    column: int
\ No newline at end of file
+    column: int
+
+
+# Kind code (TokenType.value) -> TokenType, indexable without a dict lookup
+TOKEN_TYPES = tuple(
+    next((t for t in TokenType if t.value == code), None)
+    for code in range(max(t.value for t in TokenType) + 1)
+)
+_IDENTIFIER_CODE = TokenType.IDENTIFIER.value
+
+
+class TokenStream:
+    """
+    Columnar token table produced by SpssLexer.tokenize().
+
+    Tokens are stored as three parallel arrays (kind code, start offset, end
+    offset) into the normalised source; values are sliced out only when asked
+    for. Reads past the end behave like a TERMINATOR ('.'), which is the
+    sentinel the parser relies on.
+
+    Indexing or iterating materialises Token objects for callers that want
+    them (tests, debugging); the parser uses type_at()/value_at() instead.
+    """
+    __slots__ = ("source", "kinds", "starts", "ends", "_line_starts")
+
+    def __init__(self, source: str):
+        self.source = source
+        self.kinds = array("B")
+        self.starts = array("I")
+        self.ends = array("I")
+        self._line_starts: Optional[array] = None
+
+    def append(self, token_type: TokenType, start: int, end: int):
+        self.kinds.append(token_type.value)
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def type_at(self, index: int) -> TokenType:
+        if index >= len(self.kinds):
+            return TokenType.TERMINATOR
+        return TOKEN_TYPES[self.kinds[index]]
+
+    def value_at(self, index: int) -> str:
+        """Token text. Identifiers are interned: every use of a name shares one str."""
+        if index >= len(self.kinds):
+            return "."
+        value = self.source[self.starts[index]:self.ends[index]]
+        if self.kinds[index] == _IDENTIFIER_CODE:
+            return intern(value)
+        return value
+
+    def text_between(self, first: int, last: int) -> str:
+        """
+        Original source from the start of token 'first' to the end of token
+        'last' (inclusive) as one slice, spacing kept; '' for an empty range.
+        """
+        last = min(last, len(self.kinds) - 1)
+        if first > last:
+            return ""
+        return self.source[self.starts[first]:self.ends[last]]
+
+    def span_between(self, first: int, last: int) -> "SourceSpan":
+        """Lazy text_between(): nothing is copied until the span is read."""
+        last = min(last, len(self.kinds) - 1)
+        if first > last:
+            return SourceSpan(self.source, 0, 0)
+        return SourceSpan(self.source, self.starts[first], self.ends[last])
+
+    def position_at(self, index: int) -> tuple:
+        """(line, column) of a token, both 1-based."""
+        if self._line_starts is None:
+            line_starts = array("I", [0])
+            find = self.source.find
+            nl = find("\n")
+            while nl != -1:
+                line_starts.append(nl + 1)
+                nl = find("\n", nl + 1)
+            self._line_starts = line_starts
+        start = self.starts[index]
+        line = bisect_right(self._line_starts, start)
+        return line, start - self._line_starts[line - 1] + 1
+
+    def __getitem__(self, index: int) -> Token:
+        if index < 0:
+            index += len(self.kinds)
+        if not 0 <= index < len(self.kinds):
+            raise IndexError("token index out of range")
+        line, column = self.position_at(index)
+        return Token(TOKEN_TYPES[self.kinds[index]], self.value_at(index), line, column)
+
+    def __iter__(self) -> Iterator[Token]:
+        for index in range(len(self.kinds)):
+            yield self[index]
+
+
+class SourceSpan:
+    """
+    Lazy view of source[start:end]. The slice is taken the first time the
+    span is read and then kept; it compares, hashes and prints like that str.
+    Pickles as the plain str, so cached ASTs don't drag the whole source along.
+    """
+    __slots__ = ("source", "start", "end", "_text")
+
+    def __init__(self, source: str, start: int, end: int):
+        self.source = source
+        self.start = start
+        self.end = end
+        self._text: Optional[str] = None
+
+    def __str__(self) -> str:
+        if self._text is None:
+            self._text = self.source[self.start:self.end]
+        return self._text
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (SourceSpan, str)):
+            return str(self) == str(other)
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+    def __repr__(self) -> str:
+        return repr(str(self))
+
+    def __reduce__(self):
+        return (str, (str(self),))
@@ -0,0 +1,49 @@
+from functools import lru_cache
+from typing import List, Optional
+
+from etl_ir.model import Operation
+from etl_ir.types import OpType
+
+from spec_generator.importers.spss.ast import Expr
+from spec_generator.importers.spss.parsers.expressions import parse_expression
+
+# Reading IR op parameters, for the importers (def-use, lineage) and the
+# optimizer passes alike. Nothing here may import the optimizer package.
+
+
+@lru_cache(maxsize=4096)
+def parsed_expression(text: Optional[str]) -> Optional[Expr]:
+    """Tree of an IR expression string (None if empty or it can't be parsed)."""
+    return parse_expression(" ".join(text.splitlines())) if text else None
+
+
+def row_filters(op: Operation) -> List[str]:
+    """Conditions folded into a LOAD_CSV, one per SELECT IF (older IR: one string)."""
+    filters = op.parameters.get("row_filter") or []
+    return [filters] if isinstance(filters, str) else list(filters)
+
+
+def compute_entries(op: Operation) -> List[dict]:
+    """The {'target', 'expression'[, 'condition']} list a compute op runs, in order."""
+    params = op.parameters
+    if "computes" in params:
+        return [dict(entry) for entry in params["computes"]]
+    entry = {"target": params["target"], "expression": params["expression"]}
+    if "condition" in params:
+        entry["condition"] = params["condition"]
+    return [entry]
+
+
+def is_expression_compute(op: Operation) -> bool:
+    """COMPUTE / IF ops, single or batched (not RECODE's 'logic' form)."""
+    params = op.parameters
+    return op.type == OpType.COMPUTE_COLUMNS and (
+        "computes" in params or ("target" in params and "expression" in params)
+    )
+
+
+def is_sink(op: Operation) -> bool:
+    """Ops whose effect is outside the pipeline: SAVE and AGGREGATE OUTFILE."""
+    if op.type == OpType.SAVE_BINARY:
+        return True
+    return op.type == OpType.AGGREGATE and op.parameters.get("outfile") not in (None, "", "*")
@@ -0,0 +1,184 @@
+from array import array
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from etl_ir.model import Pipeline
+
+from spec_generator.importers.spss.def_use import ColumnVersion, DefUseMap
+
+
+class Lineage(NamedTuple):
+    """Result of a lineage query."""
+    columns: List[ColumnVersion]  # Every column version reached, in definition order
+    leaves: List[ColumnVersion]   # Those with nothing further: source columns (upstream), end results (downstream)
+    operations: List[str]         # Ops that compute the columns, in pipeline order
+
+
+class LineageIndex:
+    """
+    Column-level lineage of a pipeline: which column versions each version
+    was computed from, and by which op.
+
+    Built from the IR's def-use map (LineageIndex.from_pipeline), so it
+    describes the ops that are exported, optimized or not. Every
+    assignment of a column is a node ('x#2', see ColumnVersion); the edges
+    from a node to the nodes it was computed from are kept in CSR form:
+    the sources of node n are indices[indptr[n]:indptr[n + 1]]. The
+    reverse (downstream) arrays are built on first use. Queries walk the
+    arrays, so they cost what they reach, not the size of the pipeline.
+
+    Only values are followed: SELECT IF and SORT change which rows a
+    column has, not where its values come from, and are not edges.
+    """
+
+    def __init__(self, names: List[str], versions: array, producers: array, operations: List[str],
+                 indptr: array, indices: array, sinks: Dict[str, array]):
+        self.names = names                # Node -> column name (first spelling)
+        self.versions = versions          # Node -> version number
+        self.producers = producers        # Node -> index into 'operations', -1 if nobody assigned it
+        self.operations = operations      # Op ids, in pipeline order
+        self.indptr = indptr
+        self.indices = indices
+        self.sinks = sinks                # Saved dataset id -> its columns' nodes, in schema order
+        self._nodes: Dict[str, List[int]] = {}
+        for node, name in enumerate(names):
+            self._nodes.setdefault(name.upper(), []).append(node)
+        self._reverse: Optional[Tuple[array, array]] = None
+
+    @classmethod
+    def from_pipeline(cls, pipeline: Pipeline) -> "LineageIndex":
+        return cls.from_def_use(DefUseMap.from_pipeline(pipeline, sinks=True), [op.id for op in pipeline.operations])
+
+    @classmethod
+    def from_def_use(cls, def_use: DefUseMap, operations: List[str]) -> "LineageIndex":
+        """
+        The index of a def-use map ('sources' become the edges) over the op
+        ids of its pipeline, in order. Saved datasets are only known if
+        the map was built with sinks=True.
+        """
+        sources: Dict[ColumnVersion, List[ColumnVersion]] = {}
+        while len(sources) < len(def_use.producer): # Resolving an unparsed expression may define more
+            for version in list(def_use.producer)[len(sources):]:
+                sources[version] = def_use.sources_of(version)
+
+        op_index: Dict[str, int] = {}
+        for idx, op_id in enumerate(operations):
+            op_index.setdefault(op_id, idx)
+        node_of = {version: node for node, version in enumerate(sources)}
+        indptr, indices = array("i", [0]), array("i")
+        for version_sources in sources.values():
+            indices.extend(node_of[source] for source in version_sources)
+            indptr.append(len(indices))
+        return cls(
+            names=[version.name for version in sources],
+            versions=array("i", (version.version for version in sources)),
+            producers=array("i", (op_index.get(def_use.producer[version], -1) for version in sources)),
+            operations=list(operations),
+            indptr=indptr,
+            indices=indices,
+            sinks={ds_id: array("i", (node_of[version] for version in versions)) for ds_id, versions in def_use.sinks.items()},
+        )
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def node(self, column: str, dataset: Optional[str] = None) -> int:
+        """
+        Node of a column: 'x' is its last version, 'x#2' a given one. With
+        'dataset' (a saved dataset id, or the file name it was saved to),
+        the version that went into that file.
+        """
+        name, _, number = column.partition("#")
+        key = name.strip().upper()
+        if dataset is not None:
+            sink = self.sinks.get(dataset)
+            if sink is None:
+                sink = self.sinks.get(f"file_{dataset}", self.sinks.get(f"source_{dataset}"))
+            if sink is None:
+                raise KeyError(f"No saved dataset {dataset!r}")
+            candidates = [node for node in sink if self.names[node].upper() == key]
+        else:
+            candidates = self._nodes.get(key, [])
+        if number:
+            candidates = [node for node in candidates if self.versions[node] == int(number)]
+        if not candidates:
+            raise KeyError(f"No column {column!r}" + (f" in {dataset!r}" if dataset is not None else ""))
+        return candidates[-1]
+
+    def upstream(self, column: str, dataset: Optional[str] = None) -> Lineage:
+        """Everything 'column' is computed from, and the ops that compute it (its own included)."""
+        start = self.node(column, dataset)
+        return self._walk(start, self.indptr, self.indices, include_start_op=True)
+
+    def downstream(self, column: str, dataset: Optional[str] = None) -> Lineage:
+        """Everything computed from 'column', and the ops that compute it."""
+        if self._reverse is None:
+            self._reverse = _transpose(self.indptr, self.indices)
+        start = self.node(column, dataset)
+        return self._walk(start, *self._reverse, include_start_op=False)
+
+    def version(self, node: int) -> ColumnVersion:
+        return ColumnVersion(self.names[node], self.versions[node])
+
+    def _walk(self, start: int, indptr: array, indices: array, include_start_op: bool) -> Lineage:
+        seen = bytearray(len(self.names))
+        seen[start] = 1
+        stack, reached = [start], []
+        while stack:
+            node = stack.pop()
+            for nxt in indices[indptr[node]:indptr[node + 1]]:
+                if not seen[nxt]:
+                    seen[nxt] = 1
+                    stack.append(nxt)
+                    reached.append(nxt)
+        reached.sort()
+        producers = self.producers
+        ops = {producers[node] for node in reached}
+        if include_start_op:
+            ops.add(producers[start])
+        ops.discard(-1)
+        return Lineage(
+            columns=[self.version(node) for node in reached],
+            leaves=[self.version(node) for node in reached if indptr[node] == indptr[node + 1]],
+            operations=[self.operations[idx] for idx in sorted(ops)],
+        )
+
+    def to_dict(self) -> dict:
+        """Plain lists and dicts, for exporting next to the IR (see from_dict())."""
+        return {
+            "operations": list(self.operations),
+            "columns": list(self.names),
+            "versions": self.versions.tolist(),
+            "producers": self.producers.tolist(),
+            "upstream": {"indptr": self.indptr.tolist(), "indices": self.indices.tolist()},
+            "sinks": {ds_id: nodes.tolist() for ds_id, nodes in self.sinks.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LineageIndex":
+        return cls(
+            names=list(data["columns"]),
+            versions=array("i", data["versions"]),
+            producers=array("i", data["producers"]),
+            operations=list(data["operations"]),
+            indptr=array("i", data["upstream"]["indptr"]),
+            indices=array("i", data["upstream"]["indices"]),
+            sinks={ds_id: array("i", nodes) for ds_id, nodes in data["sinks"].items()},
+        )
+
+
+def _transpose(indptr: array, indices: array) -> Tuple[array, array]:
+    """CSR arrays of the reversed edges (counting sort: O(nodes + edges))."""
+    n = len(indptr) - 1
+    counts = array("i", bytes(4 * (n + 1)))
+    for target in indices:
+        counts[target + 1] += 1
+    for node in range(n):
+        counts[node + 1] += counts[node]
+    out_indptr = array("i", counts)
+    out_indices = array("i", bytes(4 * len(indices)))
+    fill = counts
+    for node in range(n):
+        for target in indices[indptr[node]:indptr[node + 1]]:
+            out_indices[fill[target]] = node
+            fill[target] += 1
+    return out_indptr, out_indices
@@ -0,0 +1,22 @@
+"""
+IR -> IR optimization passes, run after GraphBuilder.build().
+
+    pipeline = optimize(GraphBuilder().build(nodes))
+
+GraphBuilder emits one op per command; passes here rewrite the graph
+into a cheaper equivalent one (see PassManager for stats per pass).
+"""
+from spec_generator.optimizer.base import OptimizerPass, PassManager, default_passes, optimize
+from spec_generator.optimizer.cse import CommonSubexpressionPass
+from spec_generator.optimizer.dead_code import DeadCodeEliminationPass
+from spec_generator.optimizer.dtypes import DtypePlanningPass
+from spec_generator.optimizer.fusion import ComputeFusionPass
+from spec_generator.optimizer.projection import ProjectionPushdownPass
+from spec_generator.optimizer.pushdown import PredicatePushdownPass
+from spec_generator.optimizer.stages import StagePlanningPass
+
+__all__ = [
+    "OptimizerPass", "PassManager", "default_passes", "optimize",
+    "DeadCodeEliminationPass", "PredicatePushdownPass", "ProjectionPushdownPass", "ComputeFusionPass",
+    "CommonSubexpressionPass", "StagePlanningPass", "DtypePlanningPass",
+]
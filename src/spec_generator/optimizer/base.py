@@ -0,0 +1,61 @@
+from typing import Dict, Iterable, List, Optional
+
+from etl_ir.model import Pipeline
+
+
+class OptimizerPass:
+    """
+    One IR -> IR rewrite. Subclasses set 'name' and implement run(), which
+    returns a new Pipeline and must leave the one it was given untouched
+    (untouched datasets and operations may be shared by reference). Counts
+    of what the pass changed go in self.stats, reset on every run.
+    """
+    name = "pass"
+
+    def __init__(self):
+        self.stats: Dict[str, int] = {}
+
+    def run(self, pipeline: Pipeline) -> Pipeline:
+        raise NotImplementedError
+
+
+class PassManager:
+    """
+    Runs passes in order, each on the previous one's output. After run(),
+    'report' maps each pass name to its stats.
+    """
+
+    def __init__(self, passes: Optional[Iterable[OptimizerPass]] = None):
+        self.passes: List[OptimizerPass] = list(passes) if passes is not None else default_passes()
+        self.report: Dict[str, Dict[str, int]] = {}
+
+    def add(self, optimizer_pass: OptimizerPass) -> "PassManager":
+        self.passes.append(optimizer_pass)
+        return self
+
+    def run(self, pipeline: Pipeline) -> Pipeline:
+        self.report = {}
+        for optimizer_pass in self.passes:
+            optimizer_pass.stats = {}
+            pipeline = optimizer_pass.run(pipeline)
+            self.report[optimizer_pass.name] = dict(optimizer_pass.stats)
+        return pipeline
+
+
+def default_passes() -> List[OptimizerPass]:
+    from spec_generator.optimizer.cse import CommonSubexpressionPass
+    from spec_generator.optimizer.dead_code import DeadCodeEliminationPass
+    from spec_generator.optimizer.dtypes import DtypePlanningPass
+    from spec_generator.optimizer.fusion import ComputeFusionPass
+    from spec_generator.optimizer.projection import ProjectionPushdownPass
+    from spec_generator.optimizer.pushdown import PredicatePushdownPass
+    from spec_generator.optimizer.stages import StagePlanningPass
+    return [
+        DeadCodeEliminationPass(), PredicatePushdownPass(), ProjectionPushdownPass(), ComputeFusionPass(),
+        CommonSubexpressionPass(), StagePlanningPass(), DtypePlanningPass(),
+    ]
+
+
+def optimize(pipeline: Pipeline, passes: Optional[Iterable[OptimizerPass]] = None) -> Pipeline:
+    """Runs 'passes' (default: default_passes()) over a pipeline."""
+    return PassManager(passes).run(pipeline)
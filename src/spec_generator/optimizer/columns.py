@@ -0,0 +1,161 @@
+from typing import FrozenSet, Iterable, Optional
+
+from etl_ir.model import Operation
+from etl_ir.types import OpType
+
+from spec_generator.importers.spss.ast import BinaryOp, ColumnRef, FunctionCall, UnaryOp
+from spec_generator.importers.spss.parsers.expressions import referenced_columns
+from spec_generator.ir_ops import compute_entries, is_expression_compute, parsed_expression
+
+# Column sets in this module hold upper-cased names (SPSS names are
+# case-insensitive). AllColumns(excluded) stands for "every column but
+# these"; ALL is every column, e.g. the reads of a SAVE, a
+# GENERIC_TRANSFORM or an expression that didn't parse. Combine sets with
+# the helpers below: frozenset's own operators ignore the distinction.
+ColumnSet = FrozenSet[str]
+
+
+class AllColumns(frozenset):
+    """Every column except the names in the set."""
+
+    def __repr__(self) -> str:
+        return f"AllColumns({set(self) or ''})"
+
+
+ALL: ColumnSet = AllColumns()
+
+# Ops whose output carries their input's columns on to the readers
+_PASS_THROUGH_READS = (OpType.COMPUTE_COLUMNS, OpType.FILTER_ROWS, OpType.SORT_ROWS, OpType.MATERIALIZE, OpType.JOIN)
+
+
+def expression_columns(text: Optional[str]) -> ColumnSet:
+    """Columns an IR expression string reads (ALL if it can't be parsed)."""
+    if not text:
+        return frozenset()
+    expr = parsed_expression(text)
+    if expr is None:
+        return ALL
+    return frozenset(name.upper() for name in referenced_columns(expr))
+
+
+# Reads of these depend on other cases or on case order, so the result
+# changes if rows are dropped or reordered first
+_CROSS_CASE_FUNCTIONS = frozenset(("LAG",))
+_CASE_ORDER_VARIABLES = frozenset(("$CASENUM",))
+
+
+def is_row_local(text: Optional[str]) -> bool:
+    """True if an expression only looks at the current case (False if it can't be parsed)."""
+    if not text:
+        return True
+    stack = [parsed_expression(text)]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            return False
+        if isinstance(node, ColumnRef) and node.name.upper() in _CASE_ORDER_VARIABLES:
+            return False
+        if isinstance(node, FunctionCall):
+            if node.name in _CROSS_CASE_FUNCTIONS:
+                return False
+            stack.extend(node.args)
+        elif isinstance(node, BinaryOp):
+            stack.append(node.left)
+            stack.append(node.right)
+        elif isinstance(node, UnaryOp):
+            stack.append(node.operand)
+    return True
+
+
+def union(*sets: ColumnSet) -> ColumnSet:
+    included, excluded = set(), None
+    for columns in sets:
+        if isinstance(columns, AllColumns):
+            excluded = set(columns) if excluded is None else excluded & columns
+        else:
+            included |= columns
+    if excluded is None:
+        return frozenset(included)
+    return AllColumns(excluded - included)
+
+
+def without(columns: ColumnSet, names: Iterable[str]) -> ColumnSet:
+    if isinstance(columns, AllColumns):
+        return AllColumns(columns.union(names))
+    return columns.difference(names)
+
+
+def contains(columns: ColumnSet, name: str) -> bool:
+    return (name not in columns) if isinstance(columns, AllColumns) else (name in columns)
+
+
+def intersects(columns: ColumnSet, names: Iterable[str]) -> bool:
+    return any(contains(columns, name) for name in names)
+
+
+def entry_reads(entry: dict) -> ColumnSet:
+    """Reads of one {'target', 'expression'[, 'condition']} compute."""
+    reads = union(expression_columns(entry.get("expression")), expression_columns(entry.get("condition")))
+    if entry.get("condition"):
+        # IF only assigns matching rows; the others keep the old value
+        reads = union(reads, {entry["target"].upper()})
+    return reads
+
+
+def op_targets(op: Operation) -> Optional[FrozenSet[str]]:
+    """Columns a COMPUTE_COLUMNS op (re)defines; None if it doesn't say."""
+    if is_expression_compute(op):
+        return frozenset(entry["target"].upper() for entry in compute_entries(op))
+    if "targets" in op.parameters: # RECODE
+        return frozenset(name.upper() for name in op.parameters["targets"])
+    return None
+
+
+def op_reads(op: Operation) -> ColumnSet:
+    """
+    Columns an op reads from its input(s) beyond what it passes through.
+    SAVE_BINARY and GENERIC_TRANSFORM read everything (ALL).
+    """
+    params = op.parameters
+    if op.type == OpType.COMPUTE_COLUMNS:
+        if is_expression_compute(op):
+            reads, defined = frozenset(), set()
+            for entry in compute_entries(op):
+                # Earlier targets in the batch come from the batch
+                reads = union(reads, without(entry_reads(entry), defined))
+                defined.add(entry["target"].upper())
+            return reads
+        if "sources" in params: # RECODE: unmatched values keep (or copy) the old ones
+            return frozenset(name.upper() for name in params["sources"] + params.get("targets", []))
+        return ALL
+    if op.type == OpType.FILTER_ROWS:
+        return expression_columns(params.get("condition"))
+    if op.type == OpType.SORT_ROWS:
+        return frozenset(key.strip().upper() for key in params.get("keys", "").split(",") if key.strip())
+    if op.type == OpType.AGGREGATE:
+        reads = frozenset(name.upper() for name in params.get("break", []))
+        for agg in params.get("aggregations", []):
+            reads = union(reads, expression_columns(agg.split("=", 1)[1]) if "=" in agg else ALL)
+        return reads
+    if op.type == OpType.JOIN:
+        return frozenset(name.upper() for name in params.get("by", []))
+    if op.type in (OpType.LOAD_CSV, OpType.MATERIALIZE):
+        return frozenset()
+    return ALL
+
+
+def input_need(op: Operation, out_need: ColumnSet) -> ColumnSet:
+    """
+    Columns an op needs from its input(s) so that its readers get
+    'out_need' from its output(s).
+    """
+    if op.type == OpType.COMPUTE_COLUMNS and is_expression_compute(op):
+        needed = out_need
+        for entry in reversed(compute_entries(op)):
+            if not entry.get("condition"):
+                needed = without(needed, (entry["target"].upper(),))
+            needed = union(needed, entry_reads(entry))
+        return needed
+    if op.type in _PASS_THROUGH_READS:
+        return union(out_need, op_reads(op))
+    return op_reads(op) # SAVE, GENERIC_TRANSFORM (all), AGGREGATE, LOAD (none)
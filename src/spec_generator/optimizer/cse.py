@@ -0,0 +1,291 @@
+import math
+from typing import Dict, List, Optional, Tuple
+
+from etl_ir.model import Operation, Pipeline
+
+from spec_generator.importers.spss.ast import BinaryOp, ColumnRef, Expr, FunctionCall, Literal, UnaryOp
+from spec_generator.importers.spss.parsers.expressions import expression_text, parse_expression
+from spec_generator.ir_ops import compute_entries, is_expression_compute
+from spec_generator.optimizer.base import OptimizerPass
+
+# Hidden columns this pass adds; runtimes drop them before saving
+CSE_PREFIX = "__cse_"
+MASK_PREFIX = "__mask_"
+HIDDEN_PREFIXES = (CSE_PREFIX, MASK_PREFIX)
+
+# Functions that return something new on every call: never shared
+_VOLATILE_FUNCTIONS = frozenset(("UNIFORM", "NORMAL"))
+_SLOTS = ("condition", "expression") # An IF tests its condition, then evaluates
+_FOLDABLE = ("+", "-", "*", "/", "**")
+_MAX_EXACT = 2 ** 53 # Beyond this, int64 and Python ints disagree
+
+
+def fold_constants(expr: Expr) -> Expr:
+    """'expr' with arithmetic on numeric literals (12 * 4, -(3)) worked out. Unchanged subtrees are reused."""
+    if isinstance(expr, UnaryOp):
+        operand = fold_constants(expr.operand)
+        if expr.op in ("-", "+") and _is_number(operand):
+            return Literal(value=-operand.value if expr.op == "-" else operand.value)
+        return expr if operand is expr.operand else UnaryOp(op=expr.op, operand=operand)
+    if isinstance(expr, BinaryOp):
+        left, right = fold_constants(expr.left), fold_constants(expr.right)
+        if expr.op in _FOLDABLE and _is_number(left) and _is_number(right):
+            value = _arithmetic(expr.op, left.value, right.value)
+            if value is not None:
+                return Literal(value=value)
+        if left is expr.left and right is expr.right:
+            return expr
+        return BinaryOp(op=expr.op, left=left, right=right)
+    if isinstance(expr, FunctionCall):
+        args = tuple(fold_constants(arg) for arg in expr.args)
+        if all(new is old for new, old in zip(args, expr.args)):
+            return expr
+        return FunctionCall(name=expr.name, args=args)
+    return expr
+
+
+def _is_number(expr: Expr) -> bool:
+    return isinstance(expr, Literal) and isinstance(expr.value, (int, float)) and not isinstance(expr.value, bool)
+
+
+def _arithmetic(op: str, left, right):
+    """left op right, or None where the runtime might disagree (x / 0, overflow, ...)."""
+    try:
+        if op == "+":
+            value = left + right
+        elif op == "-":
+            value = left - right
+        elif op == "*":
+            value = left * right
+        elif op == "/":
+            value = left / right
+        else:
+            if isinstance(left, int) and isinstance(right, int) and right < 0:
+                return None # numpy refuses integer ** negative integer
+            value = left ** right
+    except (ArithmeticError, ValueError):
+        return None
+    if isinstance(value, complex):
+        return None
+    if isinstance(value, float) and (not math.isfinite(value) or "e" in repr(value)):
+        return None # The lexer reads no exponent notation
+    if isinstance(value, int) and abs(value) > _MAX_EXACT:
+        return None
+    return value
+
+
+class _Node:
+    """Per-subtree facts for one round of grouping."""
+    __slots__ = ("key", "size", "columns", "volatile")
+
+    def __init__(self, key, size: int, columns: Tuple[str, ...], volatile: bool):
+        self.key, self.size, self.columns, self.volatile = key, size, columns, volatile
+
+
+class CommonSubexpressionPass(OptimizerPass):
+    """
+    Folds constants and computes repeated sub-expressions once per
+    COMPUTE / IF batch.
+
+    Inside one compute op (run ComputeFusionPass first so a chain of
+    COMPUTEs is one batch), a sub-expression that occurs twice or more
+    while none of the columns it reads is reassigned is hoisted into a
+    hidden '__cse_<n>' entry, computed just before its first use, and the
+    uses read that column instead. IFs that test the same condition share
+    one '__mask_<n>' column the same way. Largest sub-expressions are
+    hoisted first; names are compared case-insensitively. A whole
+    expression that repeats is left alone (its target already holds it).
+
+    Hidden columns are not added to dataset schemas; runtimes drop them
+    (any HIDDEN_PREFIXES name) when saving.
+    """
+    name = "cse"
+
+    def run(self, pipeline: Pipeline) -> Pipeline:
+        self.stats = {"constants_folded": 0, "subexpressions_hoisted": 0, "masks": 0, "uses_replaced": 0}
+        self._next_temp = 1 + max(
+            (int(entry["target"].rsplit("_", 1)[1]) for op in pipeline.operations if is_expression_compute(op)
+             for entry in compute_entries(op)
+             if entry["target"].startswith(HIDDEN_PREFIXES) and entry["target"].rsplit("_", 1)[1].isdigit()),
+            default=0,
+        )
+        new_ops, changed = [], False
+        for op in pipeline.operations:
+            if is_expression_compute(op):
+                new_op = self._rewrite(op)
+                changed = changed or new_op is not op
+                op = new_op
+            new_ops.append(op)
+        return pipeline.model_copy(update={"operations": new_ops}) if changed else pipeline
+
+    def _rewrite(self, op: Operation) -> Operation:
+        items = []
+        for entry in compute_entries(op):
+            item = {"target": entry["target"], "text": {}, "trees": {}, "changed": set()}
+            for slot in _SLOTS:
+                text = entry.get(slot)
+                if text is None:
+                    continue
+                item["text"][slot] = text
+                tree = parse_expression(" ".join(text.splitlines()))
+                if tree is not None:
+                    folded = fold_constants(tree)
+                    if folded is not tree and expression_text(folded) != expression_text(tree):
+                        item["changed"].add(slot)
+                        self.stats["constants_folded"] += 1
+                    item["trees"][slot] = folded
+            items.append(item)
+
+        while self._hoist_once(items):
+            pass
+        if not any(item["changed"] for item in items):
+            return op
+
+        entries = []
+        for item in items:
+            entry = {"target": item["target"]}
+            for slot in ("expression", "condition"):
+                if slot in item["changed"]:
+                    entry[slot] = expression_text(item["trees"][slot])
+                elif slot in item["text"]:
+                    entry[slot] = item["text"][slot]
+            entries.append(entry)
+        params = {key: value for key, value in op.parameters.items()
+                  if key not in ("target", "expression", "condition", "computes")}
+        if len(entries) > 1 or "computes" in op.parameters:
+            params["computes"] = entries
+        else:
+            params.update(entries[0])
+        return op.model_copy(update={"parameters": params})
+
+    def _hoist_once(self, items: List[dict]) -> bool:
+        """Hoists the largest shared sub-expression of the batch; False if there is none."""
+        memo: Dict[int, _Node] = {}
+        versions: Dict[str, int] = {}
+        groups: Dict[tuple, List[Tuple[int, str, bool]]] = {} # (key, epoch) -> (item, slot, whole tree?)
+        sizes: Dict[tuple, int] = {}
+        for idx, item in enumerate(items):
+            for slot in _SLOTS:
+                tree = item["trees"].get(slot)
+                if tree is None:
+                    continue
+                self._analyze(tree, memo)
+                for node in _subtrees(tree):
+                    info = memo[id(node)]
+                    if info.volatile or not _is_operation(node):
+                        continue
+                    # Columns are versioned by reassignments: a use after one is a different value
+                    group = (info.key, tuple(versions.get(name, 0) for name in info.columns))
+                    groups.setdefault(group, []).append((idx, slot, node is tree))
+                    sizes[group] = info.size
+            target = item["target"].upper()
+            versions[target] = versions.get(target, 0) + 1
+
+        best: Optional[tuple] = None
+        for group, uses in groups.items():
+            if len(uses) < 2 or all(whole and slot == "expression" for _, slot, whole in uses):
+                continue
+            rank = (sizes[group], -uses[0][0])
+            if best is None or rank > best[0]:
+                best = (rank, group, uses)
+        if best is None:
+            return False
+
+        _, (key, _), uses = best
+        is_mask = all(whole and slot == "condition" for _, slot, whole in uses)
+        name = f"{MASK_PREFIX if is_mask else CSE_PREFIX}{self._next_temp}"
+        self._next_temp += 1
+        hoisted = None
+        for idx, slot in sorted({(idx, slot) for idx, slot, _ in uses}):
+            item = items[idx]
+            tree, found = _replace(item["trees"][slot], key, ColumnRef(name=name), memo)
+            hoisted = hoisted or found
+            item["trees"][slot] = tree
+            item["changed"].add(slot)
+        first = uses[0][0]
+        items.insert(first, {"target": name, "text": {}, "trees": {"expression": hoisted}, "changed": {"expression"}})
+        self.stats["masks" if is_mask else "subexpressions_hoisted"] += 1
+        self.stats["uses_replaced"] += len(uses)
+        return True
+
+    @staticmethod
+    def _analyze(tree: Expr, memo: Dict[int, _Node]) -> _Node:
+        """Fills 'memo' (id(node) -> _Node) for every subtree, bottom-up."""
+        stack = [(tree, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if id(node) in memo:
+                continue
+            children = _children(node)
+            if not children_done and children:
+                stack.append((node, True))
+                stack.extend((child, False) for child in children)
+                continue
+            infos = [memo[id(child)] for child in children]
+            if isinstance(node, ColumnRef):
+                memo[id(node)] = _Node(("col", node.name.upper()), 1, (node.name.upper(),), False)
+                continue
+            if isinstance(node, Literal):
+                memo[id(node)] = _Node(("lit", type(node.value).__name__, node.value), 1, (), False)
+                continue
+            if isinstance(node, FunctionCall):
+                head = ("fn", node.name)
+                volatile = node.name in _VOLATILE_FUNCTIONS or node.name.startswith("RV.")
+            else:
+                head = (type(node).__name__, node.op)
+                volatile = False
+            columns = tuple(sorted({name for info in infos for name in info.columns}))
+            memo[id(node)] = _Node(
+                head + tuple(info.key for info in infos),
+                1 + sum(info.size for info in infos),
+                columns,
+                volatile or any(info.volatile for info in infos),
+            )
+        return memo[id(tree)]
+
+
+def _children(node: Expr) -> List[Expr]:
+    if isinstance(node, BinaryOp):
+        return [node.left, node.right]
+    if isinstance(node, UnaryOp):
+        return [node.operand]
+    if isinstance(node, FunctionCall):
+        return list(node.args)
+    return []
+
+
+def _subtrees(tree: Expr):
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(_children(node))
+
+
+def _is_operation(node: Expr) -> bool:
+    """Worth a column: an operator or call, but not a signed literal (-1)."""
+    if isinstance(node, UnaryOp):
+        return not isinstance(node.operand, Literal)
+    return isinstance(node, (BinaryOp, FunctionCall))
+
+
+def _replace(tree: Expr, key, column: ColumnRef, memo: Dict[int, _Node]) -> Tuple[Expr, Optional[Expr]]:
+    """(tree with every subtree matching 'key' replaced by 'column', one replaced subtree or None)."""
+    info = memo.get(id(tree))
+    if info is not None and info.key == key:
+        return column, tree
+    if isinstance(tree, BinaryOp):
+        left, found_left = _replace(tree.left, key, column, memo)
+        right, found_right = _replace(tree.right, key, column, memo)
+        return BinaryOp(op=tree.op, left=left, right=right), found_left or found_right
+    if isinstance(tree, UnaryOp):
+        operand, found = _replace(tree.operand, key, column, memo)
+        return UnaryOp(op=tree.op, operand=operand), found
+    if isinstance(tree, FunctionCall):
+        args, found = [], None
+        for arg in tree.args:
+            arg, hit = _replace(arg, key, column, memo)
+            args.append(arg)
+            found = found or hit
+        return FunctionCall(name=tree.name, args=tuple(args)), found
+    return tree, None
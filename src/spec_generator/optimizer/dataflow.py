@@ -0,0 +1,21 @@
+from typing import Dict, List
+
+from etl_ir.model import Pipeline
+
+
+def producers(pipeline: Pipeline) -> Dict[str, List[int]]:
+    """Dataset id -> indices (into pipeline.operations) of the ops that write it."""
+    index: Dict[str, List[int]] = {}
+    for pos, op in enumerate(pipeline.operations):
+        for ds_id in op.outputs:
+            index.setdefault(ds_id, []).append(pos)
+    return index
+
+
+def consumers(pipeline: Pipeline) -> Dict[str, List[int]]:
+    """Dataset id -> indices (into pipeline.operations) of the ops that read it."""
+    index: Dict[str, List[int]] = {}
+    for pos, op in enumerate(pipeline.operations):
+        for ds_id in op.inputs:
+            index.setdefault(ds_id, []).append(pos)
+    return index
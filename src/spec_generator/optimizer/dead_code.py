@@ -0,0 +1,218 @@
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from etl_ir.model import Column, Operation, Pipeline
+from etl_ir.types import OpType
+
+from spec_generator.ir_ops import compute_entries, is_expression_compute, is_sink
+from spec_generator.optimizer.base import OptimizerPass
+from spec_generator.optimizer.columns import (
+    AllColumns, ColumnSet, contains, entry_reads, input_need, intersects, op_reads, op_targets, union, without,
+)
+
+# Ops with no effect beyond their output datasets; anything else (GENERIC_TRANSFORM
+# for XSAVE, WRITE OUTFILE, EXPORT, ..., or an op type this pass doesn't know) is kept
+_PURE_OPS = (OpType.LOAD_CSV, OpType.COMPUTE_COLUMNS, OpType.FILTER_ROWS, OpType.SORT_ROWS,
+             OpType.AGGREGATE, OpType.JOIN, OpType.MATERIALIZE)
+# Ops after which the runtime holds a new DataFrame
+_FRAME_OPS = (OpType.COMPUTE_COLUMNS, OpType.FILTER_ROWS, OpType.SORT_ROWS, OpType.AGGREGATE, OpType.JOIN)
+# Ops whose output keeps the input's columns (plus, for computes, their targets)
+_PASS_THROUGH = (OpType.FILTER_ROWS, OpType.SORT_ROWS, OpType.MATERIALIZE, OpType.GENERIC_TRANSFORM,
+                 OpType.SAVE_BINARY, OpType.JOIN, OpType.COMPUTE_COLUMNS)
+
+
+class DeadCodeEliminationPass(OptimizerPass):
+    """
+    Drops work that never reaches a sink (SAVE, AGGREGATE OUTFILE, or
+    any op that may act outside the graph: GENERIC_TRANSFORM, unknown ops).
+
+    Walks the ops backwards from the sinks and tracks, per dataset, which
+    columns a live reader needs (SAVE needs all of them). A COMPUTE / IF /
+    RECODE whose targets are never needed is removed and its readers are
+    rewired to its input; in a batched compute only the dead entries go.
+    Any other pure op (filter, sort, join, ...) whose output nobody live
+    reads is removed too. Columns that only dead computes added are
+    stripped from the surviving datasets' schemas.
+
+    'removed_ops' lists the ids of the removed ops; stats carry the counts
+    and the estimated runtime savings (DataFrames no longer built, column
+    evaluations per row no longer run).
+    """
+    name = "dead_code"
+
+    def __init__(self):
+        super().__init__()
+        self.removed_ops: List[str] = []
+
+    def run(self, pipeline: Pipeline) -> Pipeline:
+        ops = pipeline.operations
+        need: Dict[str, ColumnSet] = {}            # dataset id -> columns live readers need
+        kept: Dict[int, Operation] = {}            # position -> surviving (maybe pruned) op
+        alias: Dict[str, Optional[str]] = {}       # removed compute's output -> its input
+        dropped_targets: Dict[int, FrozenSet[str]] = {}
+        entries_removed = 0
+        schemas: Dict[str, List[Column]] = {}
+        for ds in pipeline.datasets:
+            schemas.setdefault(ds.id, ds.columns)
+
+        for pos in range(len(ops) - 1, -1, -1):
+            op = ops[pos]
+            demanded = [need[ds_id] for ds_id in op.outputs if ds_id in need]
+            if not demanded and not self._is_root(op):
+                entries_removed += self._entry_count(op)
+                dropped_targets[pos] = op_targets(op) or frozenset()
+                continue
+            out_need = union(*demanded) if demanded else frozenset()
+
+            if op.type == OpType.COMPUTE_COLUMNS:
+                existing = set()
+                if isinstance(out_need, AllColumns) and op.inputs: # Only the column-order rule needs it
+                    existing = {col.name.upper() for col in schemas.get(op.inputs[0], ())}
+                op, in_need, dropped = self._prune_compute(op, out_need, existing)
+                entries_removed += self._entry_count(ops[pos]) - (self._entry_count(op) if op is not None else 0)
+                if dropped:
+                    dropped_targets[pos] = dropped
+                if op is None: # Dead: readers of its output read its input instead
+                    alias[ops[pos].outputs[0]] = ops[pos].inputs[0] if ops[pos].inputs else None
+                    if ops[pos].inputs:
+                        self._demand(need, ops[pos].inputs[0], out_need)
+                    continue
+            else:
+                in_need = input_need(op, out_need)
+
+            kept[pos] = op
+            for ds_id in op.inputs:
+                self._demand(need, ds_id, in_need)
+
+        removed = [op for pos, op in enumerate(ops) if pos not in kept]
+        self.removed_ops = [op.id for op in removed]
+        if not removed and not entries_removed:
+            self.stats = self._stats(removed, 0, 0, 0)
+            return pipeline
+
+        new_ops = [self._rewire(op, alias) for pos, op in sorted(kept.items())]
+        datasets, datasets_removed, dead_columns = self._surviving_datasets(pipeline, new_ops, kept, dropped_targets)
+        self.stats = self._stats(removed, entries_removed, datasets_removed, dead_columns)
+        return pipeline.model_copy(update={"datasets": datasets, "operations": new_ops})
+
+    @staticmethod
+    def _is_root(op: Operation) -> bool:
+        """Ops kept whether or not anything reads their output."""
+        return is_sink(op) or op.type not in _PURE_OPS
+
+    @staticmethod
+    def _demand(need: Dict[str, ColumnSet], ds_id: str, columns: ColumnSet):
+        need[ds_id] = union(need[ds_id], columns) if ds_id in need else columns
+
+    @staticmethod
+    def _entry_count(op: Operation) -> int:
+        return len(compute_entries(op)) if is_expression_compute(op) else int(op.type == OpType.COMPUTE_COLUMNS)
+
+    @staticmethod
+    def _prune_compute(op: Operation, out_need: ColumnSet,
+                       existing: Set[str]) -> Tuple[Optional[Operation], ColumnSet, FrozenSet[str]]:
+        """
+        (op without dead entries or None, what it needs from its input,
+        dropped targets). 'existing' are the input's column names. A def
+        that adds a column is kept when an all-columns reader (SAVE) sees
+        it, even if a later def overwrites it: it fixes the column order.
+        """
+        sees_all = isinstance(out_need, AllColumns)
+        if not is_expression_compute(op):
+            targets = op_targets(op)
+            if targets is None or intersects(out_need, targets) or (sees_all and not targets <= existing):
+                return op, union(out_need, op_reads(op)), frozenset()
+            return None, out_need, targets
+
+        # Backwards through the batch: an entry lives if a later reader needs its target
+        entries = compute_entries(op)
+        defined_before, defined = [], set(existing)
+        for entry in entries:
+            defined_before.append(frozenset(defined))
+            defined.add(entry["target"].upper())
+
+        live, needed, dropped = [], out_need, set()
+        for entry, before in zip(reversed(entries), reversed(defined_before)):
+            target = entry["target"].upper()
+            if not contains(needed, target) and not (sees_all and target not in before):
+                dropped.add(target)
+                continue
+            live.append(entry)
+            if not entry.get("condition"):
+                needed = without(needed, (target,))
+            needed = union(needed, entry_reads(entry))
+        live.reverse()
+
+        dropped = frozenset(dropped - {entry["target"].upper() for entry in live})
+        if not live:
+            return None, out_need, dropped
+        if len(live) == len(entries):
+            return op, needed, dropped
+        params = {"computes": live} if "computes" in op.parameters or len(live) > 1 else live[0]
+        return op.model_copy(update={"parameters": params}), needed, dropped
+
+    @staticmethod
+    def _rewire(op: Operation, alias: Dict[str, Optional[str]]) -> Operation:
+        inputs = []
+        for ds_id in op.inputs:
+            while ds_id in alias:
+                ds_id = alias[ds_id]
+            if ds_id is not None:
+                inputs.append(ds_id)
+        return op if inputs == op.inputs else op.model_copy(update={"inputs": inputs})
+
+    @staticmethod
+    def _surviving_datasets(pipeline: Pipeline, new_ops: List[Operation], kept: Dict[int, Operation],
+                            dropped_targets: Dict[int, FrozenSet[str]]):
+        """Datasets still referenced, minus the columns only dead computes added."""
+        ops = pipeline.operations
+        used_before = {ds_id for op in ops for ds_id in op.inputs + op.outputs}
+        used_after = {ds_id for op in new_ops for ds_id in op.inputs + op.outputs}
+        first: Dict[str, object] = {}
+        for ds in pipeline.datasets:
+            first.setdefault(ds.id, ds)
+
+        # Forward over the original graph: names (upper-cased) that no longer exist per dataset
+        gone: Dict[str, FrozenSet[str]] = {}
+        for pos, op in enumerate(ops):
+            if pos not in kept and op.type != OpType.COMPUTE_COLUMNS:
+                continue
+            if op.type not in _PASS_THROUGH:
+                continue
+            gone_in: Set[str] = set()
+            for ds_id in op.inputs:
+                gone_in |= gone.get(ds_id, frozenset())
+            dropped = dropped_targets.get(pos, frozenset())
+            if op.type == OpType.COMPUTE_COLUMNS:
+                kept_op = kept.get(pos)
+                gone_in -= (op_targets(kept_op) or frozenset()) if kept_op is not None else frozenset()
+                if dropped and op.inputs:
+                    ds = first.get(op.inputs[0])
+                    present = {col.name.upper() for col in ds.columns} - gone_in if ds is not None else set()
+                    gone_in |= {name for name in dropped if name not in present}
+            if gone_in:
+                for ds_id in op.outputs:
+                    gone[ds_id] = frozenset(gone_in)
+
+        datasets, dead_columns = [], 0
+        for ds in pipeline.datasets:
+            if ds.id in used_before and ds.id not in used_after:
+                continue
+            dead = gone.get(ds.id)
+            if dead:
+                columns = [col for col in ds.columns if col.name.upper() not in dead]
+                dead_columns += len(ds.columns) - len(columns)
+                ds = ds.model_copy(update={"columns": columns})
+            datasets.append(ds)
+        return datasets, len(pipeline.datasets) - len(datasets), dead_columns
+
+    @staticmethod
+    def _stats(removed: List[Operation], entries_removed: int, datasets_removed: int, dead_columns: int) -> Dict[str, int]:
+        return {
+            "ops_removed": len(removed),
+            "computes_removed": entries_removed,
+            "datasets_removed": datasets_removed,
+            "dead_columns": dead_columns,
+            # Estimated savings at runtime
+            "frames_saved": sum(op.type in _FRAME_OPS for op in removed),
+            "column_evaluations_saved": entries_removed,
+        }
@@ -0,0 +1,334 @@
+import re
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from etl_ir.model import Operation, Pipeline
+from etl_ir.types import DataType, OpType
+
+from spec_generator.importers.spss.ast import BinaryOp, ColumnRef, Expr, FunctionCall, Literal, UnaryOp
+from spec_generator.importers.spss.parsers.expressions import referenced_columns
+from spec_generator.ir_ops import compute_entries, is_expression_compute, parsed_expression, row_filters
+from spec_generator.optimizer.base import OptimizerPass
+from spec_generator.optimizer.columns import AllColumns, op_reads
+
+# A type is a tuple: ("int", lo, hi) with bounds on the values, or ("float",),
+# ("bool",), ("string",), ("date",). UNKNOWN means no plan; None (while
+# solving) means nothing is known yet.
+UNKNOWN = ("unknown",)
+_INT64 = 2 ** 63             # Bounds are clamped here: past it, int64 wraps today already
+_INT32_MIN, _INT32_MAX = -2 ** 31, 2 ** 31 - 1
+_UNBOUNDED = ("int", -_INT64, _INT64)
+_WIDEN_AFTER = 2             # Solving rounds after which int bounds that still grow go to int64
+
+_FORMAT = re.compile(r"^([A-Z]+)(\d+)(?:\.(\d+))?$")
+_NUMERIC_FORMATS = frozenset(("F", "N", "COMMA", "DOT", "DOLLAR", "PCT"))
+_IDENTIFIER = re.compile(r"[A-Za-z_$#@][\w.$#@]*")
+_COMPARISONS = frozenset(("=", "<>", "<", ">", "<=", ">="))
+_FLOAT_FUNCTIONS = frozenset(("SQRT", "EXP", "LN", "LG10", "SIN", "COS", "ARSIN", "ARTAN"))
+# AGGREGATE function -> result type, from the type of its argument
+_AGGREGATES: Dict[str, Callable] = {
+    "SUM": lambda arg: ("float",) if arg == ("float",) else (_UNBOUNDED if arg and arg[0] == "int" else UNKNOWN),
+    "MIN": lambda arg: arg or UNKNOWN, "MAX": lambda arg: arg or UNKNOWN,
+    "FIRST": lambda arg: arg or UNKNOWN, "LAST": lambda arg: arg or UNKNOWN,
+    "N": lambda arg: ("int", 0, _INT64), "NU": lambda arg: ("int", 0, _INT64),
+    "NMISS": lambda arg: ("int", 0, _INT64), "NUMISS": lambda arg: ("int", 0, _INT64),
+    **{name: lambda arg: ("float",) for name in ("MEAN", "SD", "VARIANCE", "MEDIAN", "PGT", "PLT", "PIN", "POUT",
+                                                  "FGT", "FLT", "FIN", "FOUT")},
+}
+
+
+def format_type(format_spec: str) -> tuple:
+    """Type of a declared SPSS format: F4.0 -> int in (-9999, 9999), F8.2 -> float, A10 -> string."""
+    spec = format_spec.upper()
+    if "DATE" in spec:
+        return ("date",)
+    if spec.startswith("A"):
+        return ("string",)
+    match = _FORMAT.match(spec)
+    if match is None:
+        return UNKNOWN
+    kind, width, decimals = match.group(1), int(match.group(2)), int(match.group(3) or 0)
+    if kind == "E" or (kind in _NUMERIC_FORMATS and decimals):
+        return ("float",)
+    if kind in _NUMERIC_FORMATS:
+        top = min(10 ** width - 1, _INT64)
+        return ("int", 0 if kind == "N" else -top, top)
+    return UNKNOWN
+
+
+def dtype_name(value_type: Optional[tuple]) -> Optional[str]:
+    """The planned dtype of a type, or None for no plan."""
+    if value_type is None or value_type == UNKNOWN:
+        return None
+    if value_type[0] == "int":
+        return "int32" if _INT32_MIN <= value_type[1] and value_type[2] <= _INT32_MAX else "int64"
+    return {"float": "float64", "bool": "bool", "string": "string", "date": "date"}[value_type[0]]
+
+
+def join(left: Optional[tuple], right: Optional[tuple]) -> Optional[tuple]:
+    """The narrowest type holding the values of both."""
+    if left is None or left == right:
+        return right
+    if right is None:
+        return left
+    if left[0] == right[0] == "int":
+        return ("int", min(left[1], right[1]), max(left[2], right[2]))
+    if {left[0], right[0]} == {"int", "float"}:
+        return ("float",)
+    return UNKNOWN
+
+
+def expression_type(expr: Optional[Expr], types: Dict[str, Optional[tuple]]) -> Optional[tuple]:
+    """Type of an expression tree, given upper-cased column name -> type."""
+    if expr is None:
+        return UNKNOWN
+    if isinstance(expr, Literal):
+        if isinstance(expr.value, str):
+            return ("string",)
+        if isinstance(expr.value, int) and not isinstance(expr.value, bool):
+            return _clamp(expr.value, expr.value)
+        return ("float",)
+    if isinstance(expr, ColumnRef):
+        key = expr.name.upper()
+        if key == "$CASENUM":
+            return ("int", 1, _INT64)
+        return types.get(key, UNKNOWN)
+    if isinstance(expr, UnaryOp):
+        if expr.op == "NOT":
+            return ("bool",)
+        operand = expression_type(expr.operand, types)
+        if operand is None or operand == UNKNOWN or operand[0] not in ("int", "float"):
+            return operand if operand is None else UNKNOWN
+        return _clamp(-operand[2], -operand[1]) if operand[0] == "int" and expr.op == "-" else operand
+    if isinstance(expr, BinaryOp):
+        if expr.op in _COMPARISONS or expr.op in ("AND", "OR"):
+            return ("bool",)
+        return _arithmetic(expr, expression_type(expr.left, types), expression_type(expr.right, types))
+    if isinstance(expr, FunctionCall) and len(expr.args) == 1:
+        arg = expression_type(expr.args[0], types)
+        if arg is None:
+            return None
+        if expr.name == "ABS" and arg[0] in ("int", "float"):
+            if arg[0] == "float":
+                return arg
+            low = 0 if arg[1] <= 0 <= arg[2] else min(abs(arg[1]), abs(arg[2]))
+            return _clamp(low, max(abs(arg[1]), abs(arg[2])))
+        if expr.name in _FLOAT_FUNCTIONS and arg[0] in ("int", "float"):
+            return ("float",)
+    return UNKNOWN
+
+
+def _arithmetic(expr: BinaryOp, left: Optional[tuple], right: Optional[tuple]) -> Optional[tuple]:
+    if left is None or right is None:
+        return None
+    if left[0] not in ("int", "float") or right[0] not in ("int", "float"):
+        return UNKNOWN
+    if expr.op == "/":
+        return ("float",)
+    if left[0] == "float" or right[0] == "float":
+        return ("float",)
+    (_, a, b), (_, c, d) = left, right
+    if expr.op == "+":
+        return _clamp(a + c, b + d)
+    if expr.op == "-":
+        return _clamp(a - d, b - c)
+    if expr.op == "*":
+        products = (a * c, a * d, b * c, b * d)
+        return _clamp(min(products), max(products))
+    if expr.op == "**" and isinstance(expr.right, Literal) and c == d and 0 <= c <= 64:
+        powers = [a ** c, b ** c] + ([0] if a < 0 < b else [])
+        return _clamp(min(powers), max(powers))
+    return UNKNOWN # int ** column: pandas keeps ints, or raises for negative powers
+
+
+def _clamp(low: int, high: int) -> tuple:
+    return ("int", max(low, -_INT64), min(high, _INT64))
+
+
+class DtypePlanningPass(OptimizerPass):
+    """
+    Plans a dtype for every column a load reads or an op computes: int32,
+    int64, float64, bool, category, string or date. Ops get a 'dtypes'
+    parameter (column -> dtype) for the columns they create; a column
+    without a plan is left to the runtime.
+
+    Loaded columns are typed by their declared format (F4.0 -> int in
+    -9999..9999, F8.2 -> float64, A10 -> string); computed ones from their
+    expression, with bounds carried through integer arithmetic, so int32 is
+    only planned for results that fit it. Types are per column name,
+    joined over every assignment in the pipeline (x = x * 1000 widens x at
+    the load too): a runtime never has to change a column's dtype midway.
+    A loaded string column is 'category' when all the pipeline does with
+    it is compare it to string literals with = or <>.
+
+    The plan is for the values that are there. A runtime keeps a column
+    that has missing values in a float or object dtype instead, and must
+    compute int arithmetic wider than int32 before storing the result.
+    """
+    name = "dtype_planning"
+
+    def run(self, pipeline: Pipeline) -> Pipeline:
+        schemas = {}
+        for ds in pipeline.datasets:
+            schemas.setdefault(ds.id, ds.columns)
+
+        # (upper-cased name, types -> its type) for every assignment, in pipeline order
+        created = [self._assignments(op, schemas) for op in pipeline.operations]
+        assignments = [(name.upper(), typer) for op_created in created for name, typer in op_created]
+        unknown: Set[str] = set()
+        computed: Set[str] = set()
+        assigned: Set[str] = set()
+        written: Set[str] = set()
+        opaque = False # Has a file with undeclared columns come in yet?
+        for op, op_created in zip(pipeline.operations, created):
+            if op.type == OpType.LOAD_CSV and not op_created or any(ds_id not in written for ds_id in op.inputs):
+                opaque = True
+            reads = op_reads(op)
+            if opaque and not isinstance(reads, AllColumns): # Read before any assignment: maybe from that file
+                unknown.update(name for name in reads if name not in assigned)
+            if op.type == OpType.GENERIC_TRANSFORM: # Whatever it names, it may retype
+                unknown.update(name.upper() for name in _IDENTIFIER.findall(str(op.parameters.get("command", ""))))
+            written.update(op.outputs)
+            names = {name.upper() for name, _ in op_created}
+            assigned |= names
+            if op.type != OpType.LOAD_CSV:
+                computed |= names
+
+        types = self._solve(assignments, unknown)
+        categories = self._categories(pipeline, types, assigned - computed)
+
+        def dtype_of(name: str) -> Optional[str]:
+            key = name.upper()
+            return "category" if key in categories else dtype_name(types.get(key))
+
+        new_ops, planned = [], {}
+        for op, op_created in zip(pipeline.operations, created):
+            params = {key: value for key, value in op.parameters.items() if key != "dtypes"}
+            dtypes = {}
+            for name, _ in op_created:
+                dtype = dtype_of(name)
+                if dtype is not None:
+                    dtypes[name] = dtype
+                    planned[name.upper()] = dtype
+            if dtypes:
+                params["dtypes"] = dtypes
+            new_ops.append(op if params == op.parameters else op.model_copy(update={"parameters": params}))
+
+        self.stats = {
+            "columns_planned": len(planned),
+            "int32": sum(dtype == "int32" for dtype in planned.values()),
+            "category": sum(dtype == "category" for dtype in planned.values()),
+            "unplanned": len({name for name, _ in assignments} - set(planned)),
+        }
+        return pipeline.model_copy(update={"operations": new_ops})
+
+    @staticmethod
+    def _assignments(op: Operation, schemas) -> List[Tuple[str, Callable]]:
+        """(column, types -> its type) for each column 'op' creates."""
+        params = op.parameters
+        if op.type == OpType.LOAD_CSV:
+            declared = schemas.get(op.outputs[0]) if op.outputs else None
+            formats = {name.upper(): spec for name, spec in params.get("formats", {}).items()}
+            columns = [(col.name, col.type) for col in declared] if declared else \
+                [(name, DataType.UNKNOWN) for name in params.get("columns", [])]
+            out = []
+            for name, data_type in columns:
+                if name.upper() in formats:
+                    value_type = format_type(formats[name.upper()])
+                else: # An INTEGER without its format may be F8.2
+                    value_type = {DataType.STRING: ("string",), DataType.DATE: ("date",)}.get(data_type, UNKNOWN)
+                out.append((name, lambda types, value_type=value_type: value_type))
+            return out
+        if op.type == OpType.COMPUTE_COLUMNS:
+            if is_expression_compute(op):
+                return [(entry["target"], lambda types, tree=parsed_expression(entry["expression"]): expression_type(tree, types))
+                        for entry in compute_entries(op)]
+            return [(name, lambda types: UNKNOWN) for name in params.get("targets", [])] # RECODE
+        if op.type == OpType.AGGREGATE:
+            out = [(name, lambda types, key=name.upper(): types.get(key, UNKNOWN)) for name in params.get("break", [])]
+            for agg in params.get("aggregations", []):
+                if "=" in agg:
+                    target, text = agg.split("=", 1)
+                    out.append((target.strip(), lambda types, tree=parsed_expression(text.strip()): _aggregate_type(tree, types)))
+            return out
+        return []
+
+    @staticmethod
+    def _solve(assignments: List[Tuple[str, Callable]], unknown: Set[str]) -> Dict[str, Optional[tuple]]:
+        """Each name's type, joined over its assignments until nothing changes."""
+        types: Dict[str, Optional[tuple]] = {name: UNKNOWN for name in unknown}
+        changed, rounds = True, 0
+        while changed:
+            changed, rounds = False, rounds + 1
+            for name, typer in assignments:
+                old = types.get(name)
+                new = join(old, typer(types))
+                if new == old:
+                    continue
+                if new[0] == "int" and rounds > _WIDEN_AFTER: # x = x + 1 grows forever: int64
+                    new = join(new, _UNBOUNDED)
+                types[name] = new
+                changed = True
+        return types
+
+    @staticmethod
+    def _categories(pipeline: Pipeline, types, loaded: Set[str]) -> Set[str]:
+        """Of the (only) loaded columns, strings that are only ever compared to literals with = / <>."""
+        candidates = {name for name in loaded if types.get(name) == ("string",)}
+        if not candidates:
+            return set()
+
+        excluded: Set[str] = set()
+        for op in pipeline.operations:
+            params = op.parameters
+            conditions, other_reads = [], []
+            if op.type == OpType.FILTER_ROWS:
+                conditions.append(params.get("condition"))
+            elif op.type == OpType.LOAD_CSV:
+                conditions.extend(row_filters(op))
+            elif is_expression_compute(op):
+                for entry in compute_entries(op):
+                    conditions.append(entry.get("condition"))
+                    tree = parsed_expression(entry["expression"])
+                    if tree is None:
+                        return set()
+                    other_reads.extend(referenced_columns(tree))
+            elif op.type not in (OpType.SAVE_BINARY, OpType.MATERIALIZE):
+                other_reads.extend(_IDENTIFIER.findall(str(params))) # SORT keys, BREAK, JOIN BY, ...
+            for text in conditions:
+                if not text:
+                    continue
+                tree = parsed_expression(text)
+                if tree is None:
+                    return set()
+                excluded.update(_non_equality_reads(tree))
+            excluded.update(name.upper() for name in other_reads)
+        return candidates - excluded
+
+
+def _aggregate_type(expr: Optional[Expr], types) -> Optional[tuple]:
+    if not isinstance(expr, FunctionCall) or expr.name not in _AGGREGATES:
+        return UNKNOWN
+    arg = expression_type(expr.args[0], types) if expr.args else None
+    if arg is None and expr.args:
+        return None
+    return _AGGREGATES[expr.name](arg)
+
+
+def _non_equality_reads(tree: Expr) -> Set[str]:
+    """Upper-cased columns a condition reads other than as 'column = literal string' (or '<>')."""
+    names, stack = set(), [tree]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, BinaryOp):
+            sides = (node.left, node.right)
+            if node.op in ("=", "<>") and any(isinstance(side, Literal) and isinstance(side.value, str) for side in sides) \
+                    and any(isinstance(side, ColumnRef) for side in sides):
+                continue
+            stack.extend(sides)
+        elif isinstance(node, UnaryOp):
+            stack.append(node.operand)
+        elif isinstance(node, FunctionCall):
+            stack.extend(node.args)
+        elif isinstance(node, ColumnRef):
+            names.add(node.name.upper())
+    return names
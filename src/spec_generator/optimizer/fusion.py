@@ -0,0 +1,84 @@
+from typing import Dict, List, Set
+
+from etl_ir.model import Operation, Pipeline
+from etl_ir.types import OpType
+
+from spec_generator.ir_ops import compute_entries, is_expression_compute
+from spec_generator.optimizer.base import OptimizerPass
+from spec_generator.optimizer.dataflow import consumers, producers
+
+
+def is_fusable_compute(op: Operation) -> bool:
+    """COMPUTE / IF ops (single or already batched) with one input and output."""
+    return is_expression_compute(op) and len(op.inputs) <= 1 and len(op.outputs) == 1
+
+
+class ComputeFusionPass(OptimizerPass):
+    """
+    Merges chains of compute ops into one batched COMPUTE_COLUMNS op.
+
+    A link A -> B is fused when A's output is written only by A and read
+    only by B. The batch keeps the source order, which is already a valid
+    dependency order (each COMPUTE sees every column computed before it),
+    and the intermediate datasets disappear. The fused op takes the
+    first op's id and position and carries a 'computes' list instead of
+    'target'/'expression', so the runtime copies the frame once per chain.
+    """
+    name = "compute_fusion"
+
+    def run(self, pipeline: Pipeline) -> Pipeline:
+        ops = pipeline.operations
+        written_by = producers(pipeline)
+        read_by = consumers(pipeline)
+
+        # op index -> the compute it feeds, when that link can be fused
+        next_in_chain: Dict[int, int] = {}
+        for pos, op in enumerate(ops):
+            if not is_fusable_compute(op):
+                continue
+            out_id = op.outputs[0]
+            readers = read_by.get(out_id, [])
+            if written_by.get(out_id) != [pos] or len(readers) != 1:
+                continue
+            nxt = readers[0]
+            if nxt > pos and is_fusable_compute(ops[nxt]) and ops[nxt].inputs == [out_id]:
+                next_in_chain[pos] = nxt
+
+        if not next_in_chain:
+            self.stats = {"chains": 0, "ops_removed": 0, "datasets_removed": 0}
+            return pipeline
+
+        fused_away: Set[int] = set(next_in_chain.values())
+        dropped_datasets: Set[str] = set()
+        new_ops: List[Operation] = []
+        chains = 0
+        for pos, op in enumerate(ops):
+            if pos in fused_away:
+                continue
+            if pos not in next_in_chain:
+                new_ops.append(op)
+                continue
+
+            chains += 1
+            entries = compute_entries(op)
+            last = op
+            while pos in next_in_chain:
+                dropped_datasets.add(last.outputs[0])
+                pos = next_in_chain[pos]
+                last = ops[pos]
+                entries.extend(compute_entries(last))
+            new_ops.append(Operation(
+                id=op.id,
+                type=OpType.COMPUTE_COLUMNS,
+                inputs=list(op.inputs),
+                outputs=list(last.outputs),
+                parameters={"computes": entries},
+            ))
+
+        datasets = [ds for ds in pipeline.datasets if ds.id not in dropped_datasets]
+        self.stats = {
+            "chains": chains,
+            "ops_removed": len(fused_away),
+            "datasets_removed": len(pipeline.datasets) - len(datasets),
+        }
+        return pipeline.model_copy(update={"datasets": datasets, "operations": new_ops})
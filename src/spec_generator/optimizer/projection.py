@@ -0,0 +1,122 @@
+import re
+from typing import Dict, List, Set
+
+from etl_ir.model import Column, Pipeline
+from etl_ir.types import DataType, OpType
+
+from spec_generator.ir_ops import row_filters
+from spec_generator.optimizer.base import OptimizerPass
+from spec_generator.optimizer.columns import AllColumns, ColumnSet, expression_columns, input_need, op_targets, union
+
+_IDENTIFIER = re.compile(r"[A-Za-z_$#@][\w.$#@]*")
+# Ops whose output keeps the columns of their input(s)
+_CARRIES_COLUMNS = (OpType.FILTER_ROWS, OpType.SORT_ROWS, OpType.MATERIALIZE, OpType.GENERIC_TRANSFORM,
+                    OpType.SAVE_BINARY, OpType.JOIN, OpType.COMPUTE_COLUMNS)
+
+
+class ProjectionPushdownPass(OptimizerPass):
+    """
+    Loads only the columns a pipeline reads.
+
+    Works out, backwards from the sinks, which columns each dataset must
+    provide, and gives every LOAD_CSV that needs fewer than all of them
+    a 'columns' parameter (file order for declared schemas). The loaded
+    dataset's schema is cut down to match, and so are the datasets
+    downstream of it. A load whose rows reach a SAVE or a
+    GENERIC_TRANSFORM is left alone: those see every column.
+
+    Ops that reach no sink still count as readers, so the runtime never
+    evaluates an expression against a column it didn't load; run
+    DeadCodeEliminationPass first to drop them.
+    """
+    name = "projection_pushdown"
+
+    def run(self, pipeline: Pipeline) -> Pipeline:
+        ops = pipeline.operations
+        need: Dict[str, ColumnSet] = {}
+        for op in reversed(ops):
+            demanded = [need[ds_id] for ds_id in op.outputs if ds_id in need]
+            in_need = input_need(op, union(*demanded))
+            for ds_id in op.inputs:
+                need[ds_id] = union(need[ds_id], in_need) if ds_id in need else in_need
+
+        schemas = {}
+        for ds in pipeline.datasets:
+            schemas.setdefault(ds.id, ds.columns)
+        spellings = self._spellings(pipeline)
+
+        new_ops, projected, missing = [], {}, {}
+        loaded = pruned = 0
+        for op in ops:
+            if op.type == OpType.LOAD_CSV and len(op.outputs) == 1:
+                ds_id = op.outputs[0]
+                wanted = union(need.get(ds_id, frozenset()), *map(expression_columns, row_filters(op)))
+                columns = self._projection(schemas.get(ds_id) or [], wanted, spellings)
+                if columns is not None:
+                    declared = schemas.get(ds_id) or []
+                    projected[ds_id] = columns
+                    missing[ds_id] = {col.name.upper() for col in declared} - {col.name.upper() for col in columns}
+                    op = op.model_copy(update={"parameters": {**op.parameters, "columns": [col.name for col in columns]}})
+                    loaded += len(columns)
+                    pruned += len(declared) - len(columns) if declared else 0
+            new_ops.append(op)
+
+        self.stats = {"loads_projected": len(projected), "columns_loaded": loaded, "columns_pruned": pruned}
+        if not projected:
+            return pipeline
+
+        missing = self._propagate(ops, missing)
+        datasets = []
+        for ds in pipeline.datasets:
+            if ds.id in projected:
+                ds = ds.model_copy(update={"columns": projected[ds.id]})
+            elif missing.get(ds.id):
+                ds = ds.model_copy(update={"columns": [col for col in ds.columns if col.name.upper() not in missing[ds.id]]})
+            datasets.append(ds)
+        return pipeline.model_copy(update={"datasets": datasets, "operations": new_ops})
+
+    @staticmethod
+    def _projection(declared: List[Column], wanted: ColumnSet, spellings: Dict[str, str]):
+        """The columns to load, or None to load them all."""
+        if isinstance(wanted, AllColumns) or not wanted: # Unread loads are dead code's business
+            return None
+        if declared:
+            columns = [col for col in declared if col.name.upper() in wanted]
+            return columns if len(columns) < len(declared) else None
+        # No declared schema: the names as the script spells them, types unknown
+        return [Column(name=spellings.get(name, name), type=DataType.UNKNOWN) for name in sorted(wanted)]
+
+    @staticmethod
+    def _spellings(pipeline: Pipeline) -> Dict[str, str]:
+        """Upper-cased name -> first spelling seen in a schema or op parameter."""
+        spellings: Dict[str, str] = {}
+        for ds in pipeline.datasets:
+            for col in ds.columns:
+                spellings.setdefault(col.name.upper(), col.name)
+        stack = [op.parameters for op in pipeline.operations]
+        while stack:
+            value = stack.pop()
+            if isinstance(value, str):
+                for name in _IDENTIFIER.findall(value):
+                    spellings.setdefault(name.upper(), name)
+            elif isinstance(value, dict):
+                stack.extend(value.values())
+            elif isinstance(value, list):
+                stack.extend(value)
+        return spellings
+
+    @staticmethod
+    def _propagate(ops, missing: Dict[str, Set[str]]) -> Dict[str, Set[str]]:
+        """Carries the names a load no longer provides down to the datasets built from it."""
+        for op in ops:
+            if op.type not in _CARRIES_COLUMNS:
+                continue
+            names: Set[str] = set()
+            for ds_id in op.inputs:
+                names |= missing.get(ds_id, set())
+            if op.type == OpType.COMPUTE_COLUMNS: # Recomputed here, so present again
+                names -= op_targets(op) or frozenset()
+            if names:
+                for ds_id in op.outputs:
+                    missing[ds_id] = names
+        return missing
@@ -0,0 +1,236 @@
+from fractions import Fraction
+from typing import Dict, List, Optional, Set
+
+from etl_ir.model import Operation, Pipeline
+from etl_ir.types import OpType
+
+from spec_generator.ir_ops import compute_entries, is_expression_compute, row_filters
+from spec_generator.optimizer.base import OptimizerPass
+from spec_generator.optimizer.columns import AllColumns, expression_columns, is_row_local, op_targets
+
+# Ops a row-local filter commutes with, whatever columns it reads
+_ROW_PRESERVING = (OpType.SORT_ROWS, OpType.MATERIALIZE)
+
+
+def conjunction(left: str, right: str) -> str:
+    """'left & right', each side parenthesized unless it already is as a whole."""
+    return f"{_parenthesized(left)} & {_parenthesized(right)}"
+
+
+def _parenthesized(condition: str) -> str:
+    text = " ".join(condition.split())
+    if text.startswith("(") and text.endswith(")"):
+        depth, quote = 0, None
+        for pos, char in enumerate(text):
+            if quote:
+                quote = None if char == quote else quote
+            elif char in "'\"":
+                quote = char
+            elif char == "(":
+                depth += 1
+            elif char == ")":
+                depth -= 1
+                if depth == 0 and pos != len(text) - 1:
+                    break # '(a) & (b)': the first paren closes early
+        else:
+            return text
+    return f"({text})"
+
+
+class PredicatePushdownPass(OptimizerPass):
+    """
+    Moves SELECT IF (FILTER_ROWS) ops as far upstream as is safe.
+
+    A filter whose condition only looks at the current case swaps with
+    the op that produces its input when nothing else reads that input and
+    the op is:
+      - SORT_ROWS or MATERIALIZE (dropping rows keeps the order),
+      - a row-local COMPUTE / IF / RECODE that defines none of the
+        filter's columns,
+      - a LEFT JOIN (MATCH FILES /FILE=* /TABLE=...), onto its
+        active-file side, when no filter column comes from the other
+        side (by-keys aside). A full match (/FILE=* /FILE=...) also
+        keeps the other file's unmatched cases, so filters stay below it.
+      - another row-local filter.
+    Filters that end up next to each other are then merged with ' & '.
+    One that reaches a LOAD_CSV is appended to its 'row_filter' list
+    parameter (set fold_into_load=False to keep it as an op), so the
+    runtime drops rows while reading. Folded conditions stay separate:
+    the runtime applies, or fails to apply, each one on its own, as it
+    would the SELECT IFs.
+    """
+    name = "predicate_pushdown"
+
+    def __init__(self, fold_into_load: bool = True):
+        super().__init__()
+        self.fold_into_load = fold_into_load
+
+    def run(self, pipeline: Pipeline) -> Pipeline:
+        self._ops: List[Optional[Operation]] = list(pipeline.operations)
+        # Exact position in the final order; a moved filter goes between its new neighbours
+        self._rank: List[Fraction] = [Fraction(pos) for pos in range(len(self._ops))]
+        self._writers: Dict[str, Set[int]] = {}
+        self._readers: Dict[str, Set[int]] = {}
+        for slot, op in enumerate(self._ops):
+            for ds_id in op.outputs:
+                self._writers.setdefault(ds_id, set()).add(slot)
+            for ds_id in op.inputs:
+                self._readers.setdefault(ds_id, set()).add(slot)
+        self._schemas = {}
+        for ds in pipeline.datasets:
+            self._schemas.setdefault(ds.id, ds.columns)
+        self._dropped: Set[str] = set()
+        self._reschemed: Dict[str, str] = {} # dataset id -> id whose columns it now has
+        self.stats = {"filters_moved": 0, "steps": 0, "filters_merged": 0, "filters_folded": 0}
+
+        for slot, op in enumerate(pipeline.operations):
+            if op.type == OpType.FILTER_ROWS and self._ops[slot] is not None:
+                self._push(slot)
+        self._merge_adjacent()
+
+        if not (self.stats["steps"] or self.stats["filters_merged"] or self.stats["filters_folded"]):
+            return pipeline
+        order = sorted((slot for slot, op in enumerate(self._ops) if op is not None), key=self._rank.__getitem__)
+        datasets = []
+        for ds in pipeline.datasets:
+            if ds.id in self._dropped:
+                continue
+            if ds.id in self._reschemed:
+                ds = ds.model_copy(update={"columns": self._schemas[self._reschemed[ds.id]]})
+            datasets.append(ds)
+        return pipeline.model_copy(update={"datasets": datasets, "operations": [self._ops[slot] for slot in order]})
+
+    def _push(self, slot: int):
+        moved = False
+        while True:
+            filt = self._ops[slot]
+            condition = filt.parameters.get("condition", "")
+            columns = expression_columns(condition)
+            if len(filt.inputs) != 1 or isinstance(columns, AllColumns) or not is_row_local(condition):
+                break
+            up = self._sole_writer(slot)
+            if up is None:
+                break
+            producer = self._ops[up]
+            if producer.type == OpType.LOAD_CSV:
+                if self.fold_into_load:
+                    self._fold(up, slot)
+                break
+
+            side = self._swappable_input(producer, columns)
+            if side is None:
+                break
+            self._swap(up, slot, side)
+            self.stats["steps"] += 1
+            moved = True
+        self.stats["filters_moved"] += moved
+
+    def _sole_writer(self, slot: int) -> Optional[int]:
+        """The op writing this op's only input, if this op is its only reader."""
+        source = self._ops[slot].inputs[0]
+        writers = self._writers.get(source, set())
+        if len(writers) != 1 or self._readers.get(source) != {slot}:
+            return None
+        (up,) = writers
+        return up if len(self._ops[up].outputs) == 1 else None
+
+    def _swappable_input(self, producer: Operation, columns) -> Optional[int]:
+        """Index of the producer input the filter can move onto, or None."""
+        if not producer.inputs:
+            return None
+        if producer.type in _ROW_PRESERVING:
+            return 0
+        if producer.type == OpType.FILTER_ROWS: # Filters commute; adjacent ones are merged at the end
+            return 0 if is_row_local(producer.parameters.get("condition", "")) else None
+        if producer.type == OpType.COMPUTE_COLUMNS:
+            targets = op_targets(producer)
+            if targets is None or targets & columns:
+                return None
+            if is_expression_compute(producer) and not all(
+                is_row_local(entry["expression"]) and is_row_local(entry.get("condition"))
+                for entry in compute_entries(producer)
+            ):
+                return None
+            return 0
+        if producer.type == OpType.JOIN:
+            if producer.parameters.get("type") != "LEFT": # Only a left join keeps every active case, and only those
+                return None
+            # Two-way MATCH FILES: the active file is the input that isn't the named one
+            right = str(producer.parameters.get("right_table", "")).strip("'").strip('"')
+            active = [idx for idx, ds_id in enumerate(producer.inputs) if ds_id not in (f"file_{right}", f"source_{right}")]
+            if len(producer.inputs) != 2 or len(active) != 1:
+                return None
+            keys = {key.upper() for key in producer.parameters.get("by", [])}
+            for idx, ds_id in enumerate(producer.inputs):
+                if idx == active[0]:
+                    continue
+                other = self._schemas.get(ds_id)
+                if not other: # Unknown columns: any of them could be the filter's
+                    return None
+                if ({col.name.upper() for col in other} - keys) & columns:
+                    return None
+            return active[0]
+        return None
+
+    def _swap(self, up: int, slot: int, side: int):
+        """A -P-> D -F-> E  becomes  A -F-> E -P-> D; E takes A's columns, E's readers read D."""
+        producer, filt = self._ops[up], self._ops[slot]
+        upstream, filtered = producer.inputs[side], filt.outputs[0]
+        self._readers[producer.outputs[0]].discard(slot)
+        self._redirect_readers(filtered, producer.outputs[0])
+
+        inputs = list(producer.inputs)
+        inputs[side] = filtered
+        self._ops[up] = producer.model_copy(update={"inputs": inputs})
+        self._ops[slot] = filt.model_copy(update={"inputs": [upstream]})
+        self._readers[upstream].discard(up)
+        self._readers[upstream].add(slot)
+        self._readers[filtered] = {up}
+        self._reschemed[filtered] = self._reschemed.get(upstream, upstream)
+
+        before = [self._rank[writer] for writer in self._writers.get(upstream, ()) if self._rank[writer] < self._rank[up]]
+        low = max(before) if before else self._rank[up] - 1
+        self._rank[slot] = (low + self._rank[up]) / 2
+
+    def _merge_adjacent(self):
+        """F1 -> D -> F2 -> E  becomes  (F1 & F2) -> D; E's readers read D."""
+        for slot in sorted(range(len(self._ops)), key=self._rank.__getitem__):
+            second = self._ops[slot]
+            if second is None or second.type != OpType.FILTER_ROWS or len(second.inputs) != 1:
+                continue
+            up = self._sole_writer(slot)
+            if up is None or self._ops[up].type != OpType.FILTER_ROWS:
+                continue
+            first = self._ops[up]
+            conditions = [first.parameters.get("condition", ""), second.parameters.get("condition", "")]
+            if slot < up: # Slots are source positions: keep the script's order
+                conditions.reverse()
+            condition = conjunction(*conditions)
+            self._ops[up] = first.model_copy(update={"parameters": {**first.parameters, "condition": condition}})
+            self._remove_filter(slot)
+            self.stats["filters_merged"] += 1
+
+    def _fold(self, up: int, slot: int):
+        """LOAD -> D -> F -> E  becomes  LOAD(row_filter) -> D; E's readers read D."""
+        load, filt = self._ops[up], self._ops[slot]
+        filters = row_filters(load) + [filt.parameters.get("condition", "")]
+        self._ops[up] = load.model_copy(update={"parameters": {**load.parameters, "row_filter": filters}})
+        self._remove_filter(slot)
+        self.stats["filters_folded"] += 1
+
+    def _remove_filter(self, slot: int):
+        """Drops a filter; readers of its output read its input instead."""
+        filt = self._ops[slot]
+        source, filtered = filt.inputs[0], filt.outputs[0]
+        self._readers[source].discard(slot)
+        self._redirect_readers(filtered, source)
+        self._writers.pop(filtered, None)
+        self._ops[slot] = None
+        self._dropped.add(filtered)
+
+    def _redirect_readers(self, old: str, new: str):
+        readers = self._readers.pop(old, set())
+        for reader in readers:
+            op = self._ops[reader]
+            self._ops[reader] = op.model_copy(update={"inputs": [new if ds_id == old else ds_id for ds_id in op.inputs]})
+        self._readers.setdefault(new, set()).update(readers)
@@ -0,0 +1,119 @@
+from typing import Dict, List, Optional, Set
+
+from etl_ir.model import Operation, Pipeline
+from etl_ir.types import OpType
+
+from spec_generator.ir_ops import compute_entries, is_expression_compute
+from spec_generator.optimizer.base import OptimizerPass
+from spec_generator.optimizer.columns import is_row_local
+from spec_generator.optimizer.dataflow import consumers, producers
+
+
+def is_stageable(op: Operation) -> bool:
+    """Row-local COMPUTE / IF / RECODE / SELECT IF with one input and output."""
+    if len(op.inputs) != 1 or len(op.outputs) != 1:
+        return False
+    if op.type == OpType.FILTER_ROWS:
+        return is_row_local(op.parameters.get("condition", ""))
+    if op.type != OpType.COMPUTE_COLUMNS:
+        return False
+    if not is_expression_compute(op):
+        return "logic" in op.parameters # RECODE: value map, case by case
+    return all(is_row_local(entry["expression"]) and is_row_local(entry.get("condition"))
+               for entry in compute_entries(op))
+
+
+class StagePlanningPass(OptimizerPass):
+    """
+    Groups chains of row-local ops into stages the runtime runs on one
+    frame, without keeping the datasets in between.
+
+    First, MATERIALIZE (EXECUTE) ops are dropped unless their result is
+    shared (several readers) or saved; readers of a dropped one read its
+    input. Then a link A -> D -> B joins A and B into one stage when both
+    are row-local (see is_stageable()) and D is written only by A and read
+    only by B. Every op of a stage of two or more gets a 'stage'
+    parameter ('stage_001', ...). A stage reads its first op's input and
+    writes its last op's output; the ops keep their ids, order and
+    datasets, so a runtime that ignores stages gets the same result.
+    """
+    name = "stage_planning"
+
+    def run(self, pipeline: Pipeline) -> Pipeline:
+        pipeline, materializes_removed = self._drop_materializes(pipeline)
+        ops = pipeline.operations
+        written_by = producers(pipeline)
+        read_by = consumers(pipeline)
+
+        stageable = [is_stageable(op) for op in ops]
+        stage_of: List[Optional[int]] = [None] * len(ops) # op index -> index of its stage's first op
+        for pos, op in enumerate(ops):
+            if not stageable[pos]:
+                continue
+            stage_of[pos] = pos
+            source = op.inputs[0]
+            writers = written_by.get(source, [])
+            if len(writers) != 1 or read_by.get(source) != [pos] or source.startswith(("file_", "source_")):
+                continue
+            (up,) = writers
+            if up < pos and stageable[up]:
+                stage_of[pos] = stage_of[up]
+
+        sizes: Dict[int, int] = {}
+        for first in stage_of:
+            if first is not None:
+                sizes[first] = sizes.get(first, 0) + 1
+        names = {first: f"stage_{num:03d}" for num, first in enumerate(sorted(f for f, n in sizes.items() if n > 1), 1)}
+
+        new_ops = []
+        for pos, op in enumerate(ops):
+            params = {key: value for key, value in op.parameters.items() if key != "stage"}
+            if stage_of[pos] in names:
+                params["stage"] = names[stage_of[pos]]
+            if params != op.parameters:
+                op = op.model_copy(update={"parameters": params})
+            new_ops.append(op)
+
+        staged = sum(sizes[first] for first in names)
+        self.stats = {
+            "stages": len(names),
+            "ops_staged": staged,
+            "materializes_removed": materializes_removed,
+            "frames_saved": staged - len(names) + materializes_removed,
+        }
+        return pipeline.model_copy(update={"operations": new_ops})
+
+    @staticmethod
+    def _drop_materializes(pipeline: Pipeline):
+        """(pipeline without unshared, unsaved MATERIALIZE ops, how many went)."""
+        ops = pipeline.operations
+        written_by = producers(pipeline)
+        read_by = consumers(pipeline)
+        alias: Dict[str, str] = {}
+        dropped: Set[int] = set()
+        for pos, op in enumerate(ops):
+            if op.type != OpType.MATERIALIZE or len(op.inputs) != 1 or len(op.outputs) != 1:
+                continue
+            out_id = op.outputs[0]
+            readers = read_by.get(out_id, [])
+            if written_by.get(out_id) != [pos] or len(readers) != 1 or ops[readers[0]].type == OpType.SAVE_BINARY:
+                continue
+            dropped.add(pos)
+            alias[out_id] = op.inputs[0]
+
+        if not dropped:
+            return pipeline, 0
+
+        def resolve(ds_id: str) -> str:
+            while ds_id in alias:
+                ds_id = alias[ds_id]
+            return ds_id
+
+        new_ops = []
+        for pos, op in enumerate(ops):
+            if pos in dropped:
+                continue
+            inputs = [resolve(ds_id) for ds_id in op.inputs]
+            new_ops.append(op if inputs == op.inputs else op.model_copy(update={"inputs": inputs}))
+        datasets = [ds for ds in pipeline.datasets if ds.id not in alias]
+        return pipeline.model_copy(update={"datasets": datasets, "operations": new_ops}), len(dropped)
@@ -0,0 +1,98 @@
+import os
+import pytest
+from spec_generator.importers.spss.cache import AstCache
+from spec_generator.importers.spss.parser import SpssParser
+from spec_generator.importers.spss.ast import ComputeNode, GenericNode
+
+
+class WeightParser(SpssParser):
+    """Gets a runtime command; the cache must not mix its trees with SpssParser's."""
+
+
+class TestAstCache:
+
+    def setup_method(self):
+        self.parser = SpssParser()
+        self.calls = 0
+
+    def counting_parse(self, code):
+        self.calls += 1
+        return self.parser.parse(code)
+
+    def test_unchanged_source_skips_parsing(self, tmp_path):
+        code = "COMPUTE x = 1.\nEXECUTE.\n"
+        cache = AstCache(tmp_path)
+
+        first = cache.load_or_parse(code, self.counting_parse)
+        second = cache.load_or_parse(code, self.counting_parse)
+
+        assert self.calls == 1
+        assert second == first and isinstance(second[0], ComputeNode)
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_entries_survive_a_new_cache_instance(self, tmp_path):
+        code = "COMPUTE y = 2."
+        AstCache(tmp_path).load_or_parse(code, self.counting_parse)
+
+        cache = AstCache(tmp_path)
+        cache.load_or_parse(code, self.counting_parse)
+        cache.load_or_parse(code + "\nEXECUTE.", self.counting_parse)
+
+        assert self.calls == 2
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_corrupt_entry_is_a_miss(self, tmp_path):
+        code = "COMPUTE z = 3."
+        cache = AstCache(tmp_path)
+        cache.put(code, self.parser.parse(code))
+        (tmp_path / (cache.key(code) + ".ast")).write_bytes(b"not zlib")
+
+        assert cache.get(code) is None
+        assert cache.misses == 1
+
+    def test_hit_survives_a_concurrent_eviction(self, tmp_path, monkeypatch):
+        code = "COMPUTE w = 4."
+        cache = AstCache(tmp_path)
+        cache.put(code, self.parser.parse(code))
+
+        def evicted(path, *args):
+            raise FileNotFoundError(path) # Another process removed it after our read
+        monkeypatch.setattr(os, "utime", evicted)
+
+        assert isinstance(cache.get(code)[0], ComputeNode)
+        assert cache.hits == 1
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        scripts = [f"COMPUTE v{i} = {i}." for i in range(3)]
+        cache = AstCache(tmp_path)
+        for age, code in enumerate(scripts):
+            cache.put(code, self.parser.parse(code))
+            path = tmp_path / (cache.key(code) + ".ast")
+            os.utime(path, (1000 + age, 1000 + age))
+
+        # Room for three entries: the least recently used goes when a fourth arrives
+        cache.max_bytes = 3 * path.stat().st_size
+        cache.get(scripts[0]) # Refresh the oldest
+        cache.put("COMPUTE v9 = 9.", self.parser.parse("COMPUTE v9 = 9."))
+
+        assert cache.get(scripts[0]) is not None
+        assert cache.get(scripts[1]) is None
+
+    def test_registered_commands_are_part_of_the_key(self, tmp_path):
+        code = "WEIGHT BY w."
+        before = AstCache(tmp_path, WeightParser).key(code)
+        WeightParser.register_command(("weight", "by"), lambda parser: GenericNode(command="WEIGHT"))
+
+        assert AstCache(tmp_path, WeightParser).key(code) != before
+        assert AstCache(tmp_path, WeightParser).key(code) != AstCache(tmp_path).key(code)
+
+    @pytest.mark.skipif(not hasattr(os, "getuid"), reason="POSIX permissions")
+    def test_refuses_a_directory_others_can_write(self, tmp_path):
+        cache = AstCache(tmp_path / "cache")
+        assert (tmp_path / "cache").stat().st_mode & 0o777 == 0o700
+
+        os.chmod(tmp_path / "cache", 0o777)
+        with pytest.raises(PermissionError):
+            cache.get("COMPUTE x = 1.")
+        with pytest.raises(PermissionError):
+            AstCache(tmp_path / "cache")
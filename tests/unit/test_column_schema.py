@@ -0,0 +1,80 @@
+import yaml
+from spec_generator.exporters.yaml import IrYamlExporter
+from spec_generator.importers.spss.ast import ComputeNode, FilterNode, LoadNode, SortNode
+from spec_generator.importers.spss.column_schema import MAX_CHAIN, ColumnSchema, SchemaTable
+from spec_generator.importers.spss.graph_builder import GraphBuilder
+from etl_ir.model import Column
+from etl_ir.types import DataType
+
+
+def expand(doc: dict) -> dict:
+    """Dataset id -> column names, resolving a shared-schema export."""
+    schemas = {}
+    for entry in doc["schemas"]:
+        if "parent" in entry:
+            columns = list(schemas[entry["parent"]])
+            if entry["position"] == len(columns):
+                columns.append(entry["column"]["name"])
+            else:
+                columns[entry["position"]] = entry["column"]["name"]
+        else:
+            columns = [c["name"] for c in entry["columns"]]
+        schemas[entry["id"]] = columns
+    return {ds["id"]: schemas[ds["schema"]] for ds in doc["datasets"]}
+
+
+class TestColumnSchema:
+
+    def setup_method(self):
+        self.table = SchemaTable()
+        self.base = self.table.base([Column(name=n, type=DataType.INTEGER) for n in ("a", "b", "c")])
+
+    def test_derived_schema_reads_like_a_list(self):
+        b_text = self.table.column("b", DataType.STRING)
+        schema = self.table.with_column(self.table.with_column(self.base, b_text), self.table.column("d", DataType.DATE))
+
+        assert [c.name for c in schema] == ["a", "b", "c", "d"]
+        assert len(schema) == 4
+        assert schema[1] is b_text and schema[-1].type == DataType.DATE
+        assert schema.index_of("d") == 3 and schema.get("zz") is None
+        assert schema == schema.copy()
+        assert [c.name for c in self.base] == ["a", "b", "c"] # Parent untouched
+
+    def test_hash_consing_shares_equal_schemas(self):
+        a_again = self.table.column("a", DataType.INTEGER)
+        x = self.table.column("x", DataType.INTEGER)
+
+        assert self.table.with_column(self.base, a_again) is self.base # No-op change
+        assert self.table.with_column(self.base, x) is self.table.with_column(self.base, x)
+        assert self.table.base(list(self.base)) is self.base
+
+    def test_long_chains_are_compacted(self):
+        schema = self.base
+        for i in range(MAX_CHAIN * 3):
+            schema = self.table.with_column(schema, self.table.column(f"v{i}", DataType.INTEGER))
+
+        assert schema.depth < MAX_CHAIN
+        assert schema.parent is not None # Lineage kept for delta exports
+        assert len(schema) == 3 + MAX_CHAIN * 3
+        assert schema[40].name == "v37"
+
+    def test_builder_shares_schemas_and_exporter_writes_them_once(self, tmp_path):
+        nodes = [LoadNode(filename="a.csv", columns=[("id", DataType.INTEGER), ("x", DataType.INTEGER)])]
+        nodes += [ComputeNode(target=f"c{i}", expression="x + 1") for i in range(3)]
+        nodes += [FilterNode(condition="x > 1"), SortNode(keys=["id"]), ComputeNode(target="x", expression="2")]
+
+        pipeline = GraphBuilder().build(nodes)
+
+        filtered, sorted_ds, recomputed = pipeline.datasets[-3:]
+        assert isinstance(filtered.columns, ColumnSchema)
+        assert filtered.columns is sorted_ds.columns is recomputed.columns
+        assert [c.name for c in recomputed.columns] == ["id", "x", "c0", "c1", "c2"]
+
+        inline, shared = tmp_path / "inline.yaml", tmp_path / "shared.yaml"
+        IrYamlExporter().export(pipeline, str(inline))
+        IrYamlExporter(share_schemas=True).export(pipeline, str(shared))
+
+        inline_doc, shared_doc = yaml.safe_load(inline.read_text()), yaml.safe_load(shared.read_text())
+        assert len(shared_doc["schemas"]) == 4
+        assert shared_doc["operations"] == inline_doc["operations"]
+        assert expand(shared_doc) == {ds["id"]: [c["name"] for c in ds["columns"]] for ds in inline_doc["datasets"]}
@@ -0,0 +1,54 @@
+from spec_generator.importers.spss.ast import ComputeNode, FilterNode, LoadNode, SaveNode, SortNode
+from spec_generator.importers.spss.content_ids import content_addressed
+from spec_generator.importers.spss.graph_builder import GraphBuilder
+from etl_ir.types import DataType
+
+
+def build(nodes):
+    return GraphBuilder(content_ids=True).build(nodes)
+
+
+def load():
+    return LoadNode(filename="a.csv", columns=[("x", DataType.INTEGER)])
+
+
+class TestContentIds:
+
+    def test_ids_are_deterministic_and_keep_the_op_kind(self):
+        nodes = [load(), ComputeNode(target="y", expression="x + 1"), SaveNode(filename="out.sav")]
+
+        first, second = build(nodes), build(nodes)
+
+        assert [op.id for op in first.operations] == [op.id for op in second.operations]
+        assert [op.id.split("_", 2)[2] for op in first.operations] == ["load", "compute", "save"]
+        assert first.operations[1].inputs == first.operations[0].outputs
+        assert first.operations[1].outputs[0].startswith("ds_")
+        first.validate_integrity()
+
+    def test_an_inserted_command_only_renames_what_it_feeds(self):
+        before = build([load(), ComputeNode(target="y", expression="x + 1"), SaveNode(filename="out.sav"),
+                        SortNode(keys=["x"]), SaveNode(filename="sorted.sav")])
+        after = build([load(), ComputeNode(target="y", expression="x + 1"), SaveNode(filename="out.sav"),
+                       FilterNode(condition="x > 0"), SortNode(keys=["x"]), SaveNode(filename="sorted.sav")])
+
+        assert [op.id for op in after.operations[:3]] == [op.id for op in before.operations[:3]]
+        # Downstream of the new filter: same commands, new inputs, new ids
+        assert after.operations[4].id != before.operations[3].id
+
+    def test_identical_work_gets_distinct_ids(self):
+        pipeline = build([load(), SaveNode(filename="out.sav"), SaveNode(filename="out.sav")])
+
+        assert len({op.id for op in pipeline.operations}) == 3
+
+    def test_declared_columns_are_part_of_a_load(self):
+        wide = build([LoadNode(filename="a.csv", columns=[("x", DataType.INTEGER), ("y", DataType.STRING)])])
+
+        assert wide.operations[0].id != build([load()]).operations[0].id
+
+    def test_rehashing_an_already_hashed_pipeline(self):
+        sequential = GraphBuilder().build([load(), ComputeNode(target="y", expression="x + 1")])
+
+        hashed = content_addressed(sequential)
+
+        assert [op.id for op in hashed.operations] == [op.id for op in content_addressed(hashed).operations]
+        assert sequential.operations[0].id == "op_001_load"  # The input is left alone
@@ -1,6 +1,9 @@
+import math
 import pytest
 from spec_generator.importers.spss.parser import SpssParser
-from spec_generator.importers.spss.ast import GenericNode, ComputeNode
+from spec_generator.importers.spss.ast import GenericNode, ComputeNode, DataListNode, InlineDataNode
+from spec_generator.importers.spss.graph_builder import GraphBuilder
+from spec_generator.importers.spss.inline_data import InlineDataError, load_inline_data
 
 class TestDataBlockParsing:
     
@@ -62,4 +65,73 @@ class TestDataBlockParsing:
         
         # Verify valid command after
         assert isinstance(nodes[-1], ComputeNode)
-        assert nodes[-1].target == "y"
\ No newline at end of file
+        assert nodes[-1].target == "y"
+
+    def test_data_block_is_paired_with_data_list(self):
+        """The raw block keeps its source span and hangs off the DATA LIST."""
+        code = (
+            "DATA LIST FREE / id (F8) name (A10).\n"
+            "BEGIN DATA\n"
+            "1 'Ann Lee'\n"
+            "2 Bob\n"
+            "END DATA.\n"
+        )
+        nodes = self.parser.parse(code)
+
+        data_list = next(n for n in nodes if isinstance(n, DataListNode))
+        block = next(n for n in nodes if isinstance(n, InlineDataNode))
+        assert data_list.data is block
+        assert block.content == "1 'Ann Lee'\n2 Bob\n"
+        assert code[block.start:block.end] == block.content
+
+    def test_data_block_is_never_tokenized(self):
+        """Characters the lexer rejects are fine inside inline data."""
+        code = "BEGIN DATA\n1 `odd` ~ ?\nEND DATA.\nCOMPUTE z = 3."
+        nodes = self.parser.parse(code)
+
+        assert isinstance(nodes[0], InlineDataNode)
+        assert nodes[0].content == "1 `odd` ~ ?\n"
+        assert nodes[-1].target == "z"
+
+    def test_load_inline_data_into_columns(self):
+        code = (
+            "DATA LIST FREE / id (F8) score (F8) name (A10).\n"
+            "BEGIN DATA\n"
+            "1, 2.5, 'Ann Lee'\n"
+            "2 x Bob\n"
+            "END DATA.\n"
+        )
+        data_list = self.parser.parse(code)[0]
+        data = load_inline_data(data_list)
+
+        assert list(data["id"]) == [1.0, 2.0]
+        assert data["score"][0] == 2.5 and math.isnan(data["score"][1])
+        assert data["name"] == ["Ann Lee", "Bob"]
+
+    def test_load_inline_data_quotes_and_record_width(self):
+        code = (
+            "DATA LIST FREE / id (F8) name (A10).\n"
+            "BEGIN DATA\n"
+            "1 'it''s'\n"
+            "2 \"say \"\"hi\"\"\"\n"
+            "END DATA.\n"
+        )
+        data = load_inline_data(self.parser.parse(code)[0])
+        assert data["name"] == ["it's", 'say "hi"']
+
+        short = self.parser.parse(code.replace("2 \"", "\""))[0]
+        with pytest.raises(InlineDataError, match="line 2"):
+            load_inline_data(short)
+
+    def test_inline_data_travels_with_the_load(self):
+        code = (
+            "DATA LIST FREE / id (F8) name (A10).\n"
+            "BEGIN DATA\n"
+            "1 Ann\n"
+            "END DATA.\n"
+            "COMPUTE x = id + 1.\n"
+        )
+        for nodes in (self.parser.parse(code), self.parser.parse_iter(code)):
+            load = GraphBuilder().build_stream(nodes).operations[0]
+            assert load.parameters["data"] == "1 Ann\n"
+            assert load.parameters["variables"] == ["id", "name"]
@@ -26,4 +26,34 @@ class TestDataListParsing:
         assert cols == [Column(name="id", type=DataType.INTEGER), Column(name="region", type=DataType.STRING), Column(name="age", type=DataType.INTEGER)]
         assert cols[0] == Column(name="id", type=DataType.INTEGER)
         assert cols[1] == Column(name="region", type=DataType.STRING)
-        assert cols[2] == Column(name="age", type=DataType.INTEGER)
\ No newline at end of file
+        assert cols[2] == Column(name="age", type=DataType.INTEGER)
+
+    def test_wide_variable_blocks_are_not_relexed(self):
+        """
+        Scenario: survey-sized schemas (thousands of variables).
+        The variable block is read from the existing token stream, so the
+        lexer runs exactly once per parse.
+        """
+        n = 5000
+        formats = ("F8.2", "A20", "DATE11")
+        expected = [DataType.INTEGER, DataType.STRING, DataType.DATE]
+        data_list = "DATA LIST FREE / " + " ".join(f"q{i} ({formats[i % 3]})" for i in range(n)) + "."
+        get_data = (
+            "GET DATA /TYPE=TXT /FILE='s.csv' /VARIABLES = "
+            + " ".join(f"q{i} {formats[i % 3]}" for i in range(n)) + " tail."
+        )
+
+        calls = []
+        tokenize = self.parser.lexer.tokenize
+        self.parser.lexer.tokenize = lambda code: calls.append(code) or tokenize(code)
+
+        cols = self.parser.parse(data_list)[0].columns
+        assert len(calls) == 1
+        assert len(cols) == n
+        assert cols[4999] == Column(name="q4999", type=expected[4999 % 3])
+
+        load = self.parser.parse(get_data)[0]
+        assert len(calls) == 2
+        assert load.filename == "s.csv"
+        assert [c.type for c in load.columns[:3]] == expected
+        assert load.columns[-1] == Column(name="tail", type=DataType.UNKNOWN)
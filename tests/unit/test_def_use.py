@@ -0,0 +1,112 @@
+from spec_generator.importers.spss.ast import (
+    AggregateNode, ComputeNode, FilterNode, GenericNode, IfNode, LoadNode, SaveNode,
+)
+from spec_generator.importers.spss.column_schema import MAX_CHAIN
+from spec_generator.importers.spss.def_use import ColumnVersion
+from spec_generator.importers.spss.graph_builder import GraphBuilder
+from spec_generator.importers.spss.parsers.expressions import parse_expression
+from etl_ir.types import DataType
+
+
+def compute(target, expression):
+    return ComputeNode(target=target, expression=expression, expression_tree=parse_expression(expression))
+
+
+def x(version):
+    return ColumnVersion("x", version)
+
+
+class TestDefUse:
+
+    def test_every_assignment_is_a_new_version(self):
+        builder = GraphBuilder()
+        pipeline = builder.build([
+            LoadNode(filename="a.csv", columns=[("x", DataType.INTEGER), ("y", DataType.INTEGER)]),
+            compute("x", "x + y"),
+            compute("X", "x * 2"),
+            FilterNode(condition="x > 1", condition_tree=parse_expression("x > 1")),
+            SaveNode(filename="out.sav"),
+        ])
+        load, first, second, select, save = [op.id for op in pipeline.operations]
+        def_use = builder.def_use
+
+        assert def_use.versions("X") == [x(1), x(2), x(3)]
+        assert str(x(2)) == "x#2"
+        assert [def_use.producer[v] for v in def_use.versions("x")] == [load, first, second]
+        assert def_use.consumers(x(1)) == [first]
+        assert def_use.consumers(x(2)) == [second]
+        assert def_use.consumers(x(3)) == [select, save]
+        assert def_use.uses(first) == [x(1), ColumnVersion("y", 1)]
+        assert def_use.consumers(ColumnVersion("y", 1)) == [first, save]
+
+    def test_conditional_assignments_read_the_old_value(self):
+        builder = GraphBuilder()
+        pipeline = builder.build([
+            LoadNode(filename="a.csv", columns=[("x", DataType.INTEGER)]),
+            IfNode(condition="(x > 1)", target="x", expression="0",
+                   condition_tree=parse_expression("x > 1"), expression_tree=parse_expression("0")),
+            compute("unused", "1"),
+            SaveNode(filename="out.sav"),
+        ])
+        _, cond, dead, _ = [op.id for op in pipeline.operations]
+
+        assert builder.def_use.uses(cond) == [x(1)]
+        assert builder.def_use.defs[cond] == [x(2)]
+        assert not builder.def_use.is_dead(ColumnVersion("unused", 1)) # The SAVE reads every column
+        assert builder.def_use.defs[dead] == [ColumnVersion("unused", 1)]
+
+    def test_new_frames_and_unknown_columns(self):
+        builder = GraphBuilder()
+        pipeline = builder.build([
+            LoadNode(filename="a.csv"),  # No declared columns
+            compute("total", "x + 1"),
+            AggregateNode(outfile="", break_vars=["x"], aggregations=["s = SUM(total)"]),
+            GenericNode(command="FLIP"),
+            compute("t", "s * 2"),
+        ])
+        load, comp, agg, generic, last = [op.id for op in pipeline.operations]
+        def_use = builder.def_use
+
+        assert def_use.producer[x(1)] == load  # Read before any assignment: the file brought it
+        assert def_use.uses(agg) == [x(1), ColumnVersion("total", 1)]
+        assert def_use.producer[x(2)] == agg
+        assert def_use.producer[ColumnVersion("s", 2)] == generic  # GENERIC may change anything
+        assert def_use.uses(last) == [ColumnVersion("s", 2)]
+
+    def test_generic_commands_are_one_boundary(self):
+        builder = GraphBuilder()
+        pipeline = builder.build([
+            LoadNode(filename="a.csv", columns=[("x", DataType.INTEGER), ("y", DataType.INTEGER)]),
+            GenericNode(command="FORMATS"),
+            GenericNode(command="VARIABLE LABELS"),
+            compute("z", "x + 1"),
+            SaveNode(filename="out.sav"),
+        ])
+        _, first, second, comp, save = [op.id for op in pipeline.operations]
+        def_use = builder.def_use
+
+        assert def_use.versions("x") == [x(1), x(2)]  # Passed both commands unread: one new version
+        assert def_use.producer[x(2)] == second
+        assert def_use.consumers(x(1)) == [first]
+        assert def_use.consumers(x(2)) == [comp, save]
+        assert def_use.versions("y") == [ColumnVersion("y", 1)]  # Nobody read it yet
+        assert def_use.uses(save) == [x(2), ColumnVersion("y", 2), ColumnVersion("z", 1)]
+        assert def_use.producer[ColumnVersion("y", 2)] == second
+
+    def test_long_chains_stay_resolvable(self):
+        builder = GraphBuilder()
+        nodes = [LoadNode(filename="a.csv", columns=[("x", DataType.INTEGER)])]
+        nodes += [compute(f"c{i}", "x + 1") for i in range(3 * MAX_CHAIN)]
+        nodes.append(compute("y", "c0 + x + q"))  # 'q' was never declared
+        pipeline = builder.build(nodes)
+
+        last = pipeline.operations[-1].id
+        assert builder.def_use.uses(last) == [ColumnVersion("c0", 1), ColumnVersion("q", 1), x(1)]
+        assert builder.def_use.producer[ColumnVersion("q", 1)] == pipeline.operations[0].id
+
+    def test_content_ids_are_used(self):
+        builder = GraphBuilder(content_ids=True)
+        pipeline = builder.build([LoadNode(filename="a.csv", columns=[("x", DataType.INTEGER)]), compute("x", "x + 1")])
+
+        assert builder.def_use.producer[x(2)] == pipeline.operations[1].id
+        assert builder.def_use.consumers(x(1)) == [pipeline.operations[1].id]
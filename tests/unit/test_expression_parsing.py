@@ -0,0 +1,121 @@
+import pytest
+from spec_generator.importers.spss.parser import SpssParser
+from spec_generator.importers.spss.ast import BinaryOp, ColumnRef, FunctionCall, Literal, UnaryOp
+from spec_generator.importers.spss.parsers.expressions import expression_text, pandas_text, parse_expression, referenced_columns
+
+
+class TestExpressionParsing:
+
+    def setup_method(self):
+        self.parser = SpssParser()
+
+    def test_precedence_and_associativity(self):
+        assert parse_expression("a + b * c") == BinaryOp(
+            op="+", left=ColumnRef(name="a"),
+            right=BinaryOp(op="*", left=ColumnRef(name="b"), right=ColumnRef(name="c")),
+        )
+        assert parse_expression("c ** 2 ** 3") == BinaryOp(
+            op="**", left=ColumnRef(name="c"),
+            right=BinaryOp(op="**", left=Literal(value=2), right=Literal(value=3)),
+        )
+        assert parse_expression("a - b - c") == BinaryOp(
+            op="-", left=BinaryOp(op="-", left=ColumnRef(name="a"), right=ColumnRef(name="b")),
+            right=ColumnRef(name="c"),
+        )
+        assert parse_expression("-x ** 2") == UnaryOp(
+            op="-", operand=BinaryOp(op="**", left=ColumnRef(name="x"), right=Literal(value=2))
+        )
+
+    @pytest.mark.parametrize("text, op", [
+        ("a EQ 1", "="), ("a = 1", "="), ("a NE 1", "<>"), ("a ~= 1", "<>"), ("a <> 1", "<>"),
+        ("a GT 1", ">"), ("a ge 1", ">="), ("a LT 1", "<"), ("a LE 1", "<="),
+    ])
+    def test_comparison_spellings(self, text, op):
+        assert parse_expression(text) == BinaryOp(op=op, left=ColumnRef(name="a"), right=Literal(value=1))
+
+    def test_logical_operators(self):
+        tree = parse_expression("NOT a = 1 & b > 2 | ~c")
+
+        assert tree == BinaryOp(
+            op="OR",
+            left=BinaryOp(
+                op="AND",
+                left=UnaryOp(op="NOT", operand=BinaryOp(op="=", left=ColumnRef(name="a"), right=Literal(value=1))),
+                right=BinaryOp(op=">", left=ColumnRef(name="b"), right=Literal(value=2)),
+            ),
+            right=UnaryOp(op="NOT", operand=ColumnRef(name="c")),
+        )
+
+    def test_function_calls_and_literals(self):
+        tree = parse_expression("DATE.DMY(1, 1, 2024) + trunc(x / 2.5) + LENGTH('it''s')")
+
+        assert tree.left.left == FunctionCall(name="DATE.DMY", args=(Literal(1), Literal(1), Literal(2024)))
+        assert tree.left.right == FunctionCall(
+            name="TRUNC", args=(BinaryOp(op="/", left=ColumnRef(name="x"), right=Literal(value=2.5)),)
+        )
+        assert tree.right.args == (Literal(value="it's"),)
+        assert referenced_columns(tree) == {"x"}
+
+    def test_call_trees_are_hashable(self):
+        tree = parse_expression("MAX(x, LAG(y)) + 1")
+
+        assert hash(tree) == hash(parse_expression("MAX(x, LAG(y)) + 1"))
+        assert {tree: "seen"}[parse_expression("MAX(x, LAG(y)) + 1")] == "seen"
+
+    def test_unparseable_expression_is_none(self):
+        assert parse_expression("a + ") is None
+        assert parse_expression("SUM(a TO b)") is None
+        assert parse_expression("(a") is None
+
+    def test_trees_are_stored_on_nodes(self):
+        code = (
+            "COMPUTE y = (income - 100) / 12.\n"
+            "IF (sex = 1 AND age GE 18) adult = 1.\n"
+            "SELECT IF region ~= 'NORTH'.\n"
+        )
+        compute, if_node, select = self.parser.parse(code)
+
+        assert referenced_columns(compute.expression_tree) == {"income"}
+        assert if_node.target == "adult"
+        assert if_node.condition == "(sex = 1 AND age GE 18)"
+        assert referenced_columns(if_node.condition_tree) == {"sex", "age"}
+        assert if_node.expression_tree == Literal(value=1)
+        assert select.condition_tree == BinaryOp(op="<>", left=ColumnRef(name="region"), right=Literal(value="NORTH"))
+
+    @pytest.mark.parametrize("text, expected", [
+        ("a - (b - c)", "a - (b - c)"),
+        ("(a ** b) ** c", "(a ** b) ** c"),
+        ("(-a) ** 2", "(-a) ** 2"),
+        ("x > 1 AND y EQ 'it''s' OR NOT z", "(x > 1) & (y = 'it''s') | (~z)"),
+        ("NOT (a = b)", "~(a = b)"),
+        ("MAX(a + 1, 2.5)", "MAX(a + 1, 2.5)"),
+    ])
+    def test_expression_text_reads_back_the_same(self, text, expected):
+        tree = parse_expression(text)
+
+        assert expression_text(tree) == expected
+        assert parse_expression(expected) == tree
+
+    @pytest.mark.parametrize("value", [0.00001, 1e-7, 2.5e-10, 0.1, 1e16, 1e22, 1.5e300, 123.456])
+    def test_float_literals_read_back(self, value):
+        tree = BinaryOp(op="*", left=Literal(value=value), right=ColumnRef(name="x"))
+
+        assert parse_expression(expression_text(tree)) == tree # The lexer reads no exponents
+
+    @pytest.mark.parametrize("text, expected", [
+        ("x ~= 1", "x != 1"),
+        ("x NE 1 AND y EQ 2", "(x != 1) & (y == 2)"),
+        ("age GE 18 OR age LT 5", "(age >= 18) | (age < 5)"),
+        ("NOT region = 'it''s'", '~(region == "it\'s")'),
+        ("a.b <> #tmp", "`a.b` != `#tmp`"),
+    ])
+    def test_pandas_text(self, text, expected):
+        assert pandas_text(parse_expression(text)) == expected
+
+    def test_pandas_text_runs_in_query(self):
+        pd = pytest.importorskip("pandas")
+        df = pd.DataFrame({"x": [1, 2, 3], "region": ["E", "W", "E"]})
+
+        kept = df.query(pandas_text(parse_expression("x GE 2 AND NOT region ~= 'E'")))
+
+        assert kept["x"].tolist() == [3]
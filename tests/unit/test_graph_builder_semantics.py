@@ -1,7 +1,7 @@
 import pytest
 from spec_generator.importers.spss.graph_builder import GraphBuilder
-from spec_generator.importers.spss.ast import FilterNode, MaterializeNode, JoinNode, LoadNode
-from etl_ir.types import OpType
+from spec_generator.importers.spss.ast import AstNode, ComputeNode, FilterNode, MaterializeNode, JoinNode, LoadNode, SaveNode
+from etl_ir.types import DataType, OpType
 
 class TestGraphBuilderSemantics:
     
@@ -72,4 +72,90 @@ class TestGraphBuilderSemantics:
         
         # Verify the implicit dataset was registered
         ds_ids = [ds.id for ds in pipeline.datasets]
-        assert "source_rates.sav" in ds_ids
\ No newline at end of file
+        assert "source_rates.sav" in ds_ids
+
+    def test_register_handler_for_custom_node(self):
+        """
+        Node types dispatch through a table; subclasses of a registered node
+        reuse its handler and unknown nodes are skipped.
+        """
+        class TaggedFilterNode(FilterNode):
+            pass
+
+        class AuditNode(AstNode):
+            pass
+
+        class AuditingBuilder(GraphBuilder):
+            pass
+
+        seen = []
+        AuditingBuilder.register_handler(AuditNode, lambda builder, node: seen.append(node))
+        nodes = [LoadNode(filename="data.csv"), TaggedFilterNode(condition="x > 1"), AuditNode()]
+
+        pipeline = AuditingBuilder().build(nodes)
+        assert [op.type for op in pipeline.operations] == [OpType.LOAD_CSV, OpType.FILTER_ROWS]
+        assert seen == [nodes[2]]
+
+        assert len(self.builder.build(nodes).operations) == 2
+        assert len(seen) == 1
+
+    def test_register_handler_on_parent_reaches_cached_subclass(self):
+        """A subclass that already built (and cached its dispatch) sees later parent registrations."""
+        class NoteNode(AstNode):
+            pass
+
+        class TagNode(AstNode):
+            pass
+
+        class NoteBuilder(GraphBuilder):
+            pass
+
+        class TaggingBuilder(NoteBuilder):
+            pass
+
+        notes = []
+        TaggingBuilder.register_handler(TagNode, lambda builder, node: None)
+        TaggingBuilder().build([NoteNode()]) # Caches NoteNode -> skipped
+        NoteBuilder.register_handler(NoteNode, lambda builder, node: notes.append(node))
+
+        node = NoteNode()
+        TaggingBuilder().build([node])
+        GraphBuilder().build([NoteNode()])
+        assert notes == [node]
+
+    def test_build_stream_consumes_an_iterator(self):
+        """build_stream() takes any one-shot iterable, e.g. SpssParser.parse_iter()."""
+        nodes = [LoadNode(filename="data.csv"), FilterNode(condition="age > 18"), MaterializeNode()]
+
+        pipeline = self.builder.build_stream(iter(nodes))
+
+        assert pipeline == GraphBuilder().build(nodes)
+        assert [op.type for op in pipeline.operations] == [OpType.LOAD_CSV, OpType.FILTER_ROWS, OpType.MATERIALIZE]
+
+    def test_dataset_registry_lookups(self):
+        """
+        Datasets are found through indexes, not scans: MATCH FILES prefers a
+        file SAVEd earlier over an external source of the same name, reuses
+        an implicit source, and repeated ids resolve to the first dataset.
+        """
+        nodes = [
+            LoadNode(filename="a.csv", columns=[("id", DataType.INTEGER)]),
+            JoinNode(sources=["*", "'rates.sav'"], by=["id"]),
+            SaveNode(filename="rates.sav"),
+            ComputeNode(target="x", expression="1"),
+            JoinNode(sources=["*", "rates.sav"], by=["id"]),
+            JoinNode(sources=["*", "other.sav"], by=["id"]),
+            JoinNode(sources=["*", "other.sav"], by=["id"]),
+            LoadNode(filename="a.csv"),
+            ComputeNode(target="y", expression="2"),
+        ]
+
+        pipeline = self.builder.build(nodes)
+
+        joins = [op for op in pipeline.operations if op.type == OpType.JOIN]
+        assert joins[0].inputs[1] == "source_rates.sav"
+        assert joins[1].inputs[1] == "file_rates.sav"
+        assert joins[2].inputs[1] == joins[3].inputs[1] == "source_other.sav"
+        assert [d.id for d in pipeline.datasets].count("source_other.sav") == 1
+        # The second load of a.csv shares its id; the first registration wins
+        assert [c.name for c in pipeline.datasets[-1].columns] == ["id", "y"]
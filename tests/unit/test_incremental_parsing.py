@@ -0,0 +1,63 @@
+import pytest
+from spec_generator.importers.spss.parser import SpssParser
+from spec_generator.importers.spss.ast import ComputeNode, DataListNode, InlineDataNode
+
+
+class TestIncrementalParsing:
+
+    def setup_method(self):
+        self.parser = SpssParser()
+        self.code = (
+            "GET DATA /TYPE=TXT /FILE='in.csv'.\n"
+            "COMPUTE a = 1.\n"
+            "COMPUTE b = a * 2.\n"
+            "* A comment.\n"
+            "SAVE OUTFILE='out.sav'.\n"
+        )
+
+    def test_parse_tree_matches_parse(self):
+        tree = self.parser.parse_tree(self.code)
+
+        assert tree.nodes == self.parser.parse(self.code)
+        assert tree.changed == list(range(len(tree.nodes)))
+        assert len(tree.commands) == 4 # The comment rides along with SAVE
+
+    def test_only_edited_command_is_rebuilt(self):
+        tree = self.parser.parse_tree(self.code)
+        start = self.code.index("a * 2")
+
+        new_tree = self.parser.reparse(tree, [(start, start + 5, "a + 100")])
+
+        assert new_tree.changed == [2]
+        assert new_tree.nodes[2].expression == "a + 100"
+        assert all(new_tree.nodes[i] is tree.nodes[i] for i in (0, 1, 3))
+        assert new_tree.nodes == self.parser.parse(new_tree.source)
+
+    def test_inserted_command_shifts_indices(self):
+        tree = self.parser.parse_tree(self.code)
+        at = self.code.index("* A comment")
+
+        new_tree = self.parser.reparse(tree, [(at, at, "COMPUTE c = 3.\n")])
+
+        assert new_tree.changed == [3]
+        assert isinstance(new_tree.nodes[3], ComputeNode)
+        assert new_tree.nodes[4] is tree.nodes[3]
+
+    def test_moved_inline_data_keeps_offsets_and_pairing(self):
+        code = "DATA LIST FREE / x.\nBEGIN DATA\n1\n2\nEND DATA.\n"
+        tree = self.parser.parse_tree(code)
+
+        new_tree = self.parser.reparse(tree, [(0, 0, "COMPUTE y = 0.\n")])
+        data_list, block = new_tree.nodes[1], new_tree.nodes[2]
+
+        assert isinstance(data_list, DataListNode) and isinstance(block, InlineDataNode)
+        assert data_list.data is block
+        assert new_tree.source[block.start:block.end] == "1\n2\n"
+        assert tree.nodes[0].data is tree.nodes[1] # The old tree is left intact
+
+    def test_syntax_error_matches_full_parse(self):
+        tree = self.parser.parse_tree(self.code)
+        start = self.code.index("COMPUTE a")
+
+        with pytest.raises(SyntaxError, match="Expected Identifier"):
+            self.parser.reparse(tree, [(start + 8, start + 9, "1")])
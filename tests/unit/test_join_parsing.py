@@ -23,6 +23,15 @@ class TestJoinParsing:
         
         # Join keys
         assert nodes[0].by == ["benefit_type"]
+        assert nodes[0].tables == []
+
+    def test_records_table_lookups(self):
+        """/TABLE sources are keyed lookups: the join keeps only the active file's cases."""
+        code = "MATCH FILES /FILE=* /TABLE='rates.sav' /BY benefit_type."
+        nodes = self.parser.parse(code)
+
+        assert nodes[0].sources == ["*", "rates.sav"]
+        assert nodes[0].tables == ["rates.sav"]
 
     def test_parses_multiple_join_keys(self):
         """
@@ -0,0 +1,131 @@
+import pytest
+
+from spec_generator.importers.spss.ast import (
+    AggregateNode, ComputeNode, FilterNode, GenericNode, IfNode, LoadNode, RecodeNode, SaveNode,
+)
+from spec_generator.importers.spss.def_use import ColumnVersion
+from spec_generator.importers.spss.graph_builder import GraphBuilder
+from spec_generator.importers.spss.parsers.expressions import parse_expression
+from spec_generator.lineage import LineageIndex
+from spec_generator.optimizer import PassManager
+from etl_ir.types import DataType
+
+
+def compute(target, expression):
+    return ComputeNode(target=target, expression=expression, expression_tree=parse_expression(expression))
+
+
+def names(versions):
+    return [str(version) for version in versions]
+
+
+def build(nodes):
+    return GraphBuilder().build([
+        LoadNode(filename="a.csv", columns=[(name, DataType.INTEGER) for name in ("id", "income", "age", "region")]),
+        *nodes,
+    ])
+
+
+class TestLineage:
+
+    def test_upstream_finds_source_columns_and_ops(self):
+        pipeline = build([
+            compute("base", "income * 2"),
+            compute("bonus", "age + 1"),
+            IfNode(condition="(region = 1)", target="base", expression="base + 5",
+                   condition_tree=parse_expression("region = 1"), expression_tree=parse_expression("base + 5")),
+            FilterNode(condition="id > 0", condition_tree=parse_expression("id > 0")),
+            compute("final_score", "base + bonus"),
+            SaveNode(filename="x.sav"),
+        ])
+        load, base, bonus, if_op, select, final, _ = [op.id for op in pipeline.operations]
+
+        lineage = LineageIndex.from_pipeline(pipeline).upstream("final_score", "x.sav")
+
+        assert names(lineage.leaves) == ["income#1", "age#1", "region#1"] # Not id: SELECT IF only drops rows
+        assert names(lineage.columns) == ["income#1", "age#1", "region#1", "base#1", "bonus#1", "base#2"]
+        assert lineage.operations == [load, base, bonus, if_op, final]
+
+    def test_dataset_picks_the_saved_version(self):
+        pipeline = build([
+            compute("score", "income"),
+            SaveNode(filename="x.sav"),
+            compute("score", "age"),
+            SaveNode(filename="y.sav"),
+        ])
+        index = LineageIndex.from_pipeline(pipeline)
+
+        assert names(index.upstream("score", "x.sav").leaves) == ["income#1"]
+        assert names(index.upstream("score", "file_y.sav").leaves) == ["age#1"]
+        assert names(index.upstream("score").leaves) == ["age#1"] # Latest version
+        assert names(index.upstream("SCORE#1").leaves) == ["income#1"]
+        with pytest.raises(KeyError):
+            index.upstream("score", "z.sav")
+        with pytest.raises(KeyError):
+            index.upstream("nope")
+
+    def test_downstream(self):
+        pipeline = build([
+            compute("a", "income + 1"),
+            compute("b", "a * age"),
+            compute("c", "id"),
+            SaveNode(filename="x.sav"),
+        ])
+        index = LineageIndex.from_pipeline(pipeline)
+
+        lineage = index.downstream("income")
+        assert names(lineage.columns) == ["a#1", "b#1"]
+        assert names(lineage.leaves) == ["b#1"]
+        assert lineage.operations == [op.id for op in pipeline.operations[1:3]]
+        assert index.downstream("c").columns == []
+
+    def test_aggregate_and_recode(self):
+        pipeline = build([
+            RecodeNode(source_vars=["age"], target_vars=["band"], map_logic="(LO THRU 30=1)"),
+            AggregateNode(outfile="*", break_vars=["band"], aggregations=["total = SUM(income)"]),
+            SaveNode(filename="agg.sav"),
+        ])
+        index = LineageIndex.from_pipeline(pipeline)
+
+        assert names(index.upstream("band", "agg.sav").columns) == ["age#1", "band#1"]
+        assert names(index.upstream("total", "agg.sav").leaves) == ["income#1"]
+
+    def test_generic_commands_keep_lineage(self):
+        pipeline = build([
+            compute("a", "income + 1"),
+            GenericNode(command="FORMATS"),
+            GenericNode(command="VARIABLE LABELS"),
+            compute("b", "a * 2"),
+            SaveNode(filename="x.sav"),
+        ])
+        _, first, _, labels, last, _ = [op.id for op in pipeline.operations]
+        index = LineageIndex.from_pipeline(pipeline)
+
+        lineage = index.upstream("b", "x.sav")
+        assert names(lineage.columns) == ["income#1", "a#1", "a#2"]  # One version for both commands
+        assert lineage.operations[1:] == [first, labels, last]
+        assert names(index.upstream("age", "x.sav").columns) == ["age#1"]
+
+    def test_follows_the_optimized_ir(self):
+        pipeline = build([
+            compute("a", "income + 1"),
+            compute("b", "a + age"),
+            SaveNode(filename="x.sav"),
+        ])
+        optimized = PassManager().run(pipeline)
+
+        lineage = LineageIndex.from_pipeline(optimized).upstream("b", "x.sav")
+
+        assert names(lineage.leaves) == ["income#1", "age#1"]
+        assert set(lineage.operations) <= {op.id for op in optimized.operations}
+
+    def test_csr_round_trip(self):
+        pipeline = build([compute("a", "income + age"), SaveNode(filename="x.sav")])
+        index = LineageIndex.from_pipeline(pipeline)
+        data = index.to_dict()
+
+        assert len(data["upstream"]["indptr"]) == len(index) + 1
+        assert len(data["upstream"]["indices"]) == data["upstream"]["indptr"][-1] == 2
+        restored = LineageIndex.from_dict(data)
+        assert restored.upstream("a", "x.sav") == index.upstream("a", "x.sav")
+        assert restored.version(restored.node("a")) == ColumnVersion("a", 1)
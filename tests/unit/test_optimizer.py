@@ -0,0 +1,441 @@
+from spec_generator.importers.spss.ast import (
+    AggregateNode, ComputeNode, FilterNode, GenericNode, IfNode, JoinNode, LoadNode, MaterializeNode,
+    RecodeNode, SaveNode, SortNode,
+)
+from spec_generator.importers.spss.graph_builder import GraphBuilder
+from spec_generator.optimizer import (
+    CommonSubexpressionPass, ComputeFusionPass, DeadCodeEliminationPass, DtypePlanningPass, PassManager, PredicatePushdownPass,
+    ProjectionPushdownPass, StagePlanningPass, optimize,
+)
+from etl_ir.types import DataType, OpType
+
+
+def build(nodes):
+    return GraphBuilder().build(nodes)
+
+
+class TestComputeFusion:
+
+    def test_fuses_a_compute_chain_in_order(self):
+        pipeline = build([
+            LoadNode(filename="a.csv", columns=[("x", DataType.INTEGER)]),
+            ComputeNode(target="a", expression="x + 1"),
+            ComputeNode(target="b", expression="a * 2"),
+            IfNode(condition="(b > 3)", target="c", expression="1"),
+            SaveNode(filename="out.sav"),
+        ])
+
+        optimized = optimize(pipeline, [ComputeFusionPass()])
+
+        assert [op.type for op in optimized.operations] == [OpType.LOAD_CSV, OpType.COMPUTE_COLUMNS, OpType.SAVE_BINARY]
+        fused = optimized.operations[1]
+        assert fused.id == pipeline.operations[1].id
+        assert fused.inputs == pipeline.operations[1].inputs
+        assert fused.outputs == pipeline.operations[3].outputs
+        assert fused.parameters["computes"] == [
+            {"target": "a", "expression": "x + 1"},
+            {"target": "b", "expression": "a * 2"},
+            {"target": "c", "expression": "1", "condition": "(b > 3)"},
+        ]
+        # Intermediates are gone and every reference still resolves
+        ids = {ds.id for ds in optimized.datasets}
+        assert pipeline.operations[1].outputs[0] not in ids
+        assert pipeline.operations[2].outputs[0] not in ids
+        optimized.validate_integrity()
+        # The input pipeline is left alone
+        assert len(pipeline.operations) == 5
+
+    def test_chain_breaks_at_other_consumers_and_non_computes(self):
+        pipeline = build([
+            LoadNode(filename="a.csv"),
+            ComputeNode(target="a", expression="1"),
+            SaveNode(filename="mid.sav"),  # Reads the first compute's output too
+            ComputeNode(target="b", expression="a + 1"),
+            FilterNode(condition="b > 0"),
+            ComputeNode(target="c", expression="b"),
+            RecodeNode(source_vars=["c"], target_vars=["c"], map_logic="(1=2)"),
+        ])
+
+        manager = PassManager([ComputeFusionPass()])
+        optimized = manager.run(pipeline)
+
+        assert [op.type for op in optimized.operations] == [op.type for op in pipeline.operations]
+        assert manager.report["compute_fusion"]["chains"] == 0
+
+    def test_fusion_is_idempotent_and_reported(self):
+        nodes = [LoadNode(filename="a.csv")] + [ComputeNode(target=f"v{i}", expression=f"{i}") for i in range(10)]
+        manager = PassManager([ComputeFusionPass()])
+
+        once = manager.run(build(nodes))
+        assert manager.report["compute_fusion"] == {"chains": 1, "ops_removed": 9, "datasets_removed": 9}
+        twice = manager.run(once)
+
+        assert manager.report["compute_fusion"]["chains"] == 0
+        assert [c["target"] for c in twice.operations[1].parameters["computes"]] == [f"v{i}" for i in range(10)]
+
+
+class TestDeadCodeElimination:
+
+    def test_drops_work_that_reaches_no_sink(self):
+        pipeline = build([
+            LoadNode(filename="a.csv", columns=[("x", DataType.INTEGER)]),
+            ComputeNode(target="a", expression="x + 1"),
+            SaveNode(filename="out.sav"),
+            ComputeNode(target="b", expression="a * 2"),
+            FilterNode(condition="b > 0"),
+        ])
+        dce = DeadCodeEliminationPass()
+
+        optimized = PassManager([dce]).run(pipeline)
+
+        assert [op.type for op in optimized.operations] == [OpType.LOAD_CSV, OpType.COMPUTE_COLUMNS, OpType.SAVE_BINARY]
+        assert dce.removed_ops == [pipeline.operations[3].id, pipeline.operations[4].id]
+        assert dce.stats["computes_removed"] == 1
+        assert dce.stats["datasets_removed"] == 2
+        optimized.validate_integrity()
+
+    def test_generic_commands_are_kept(self):
+        """XSAVE, WRITE OUTFILE, ... write outside the graph: they and what they read survive."""
+        pipeline = build([
+            LoadNode(filename="a.csv", columns=[("x", DataType.INTEGER)]),
+            ComputeNode(target="a", expression="x + 1"),
+            GenericNode(command="XSAVE"),
+            ComputeNode(target="b", expression="a * 2"),
+        ])
+        dce = DeadCodeEliminationPass()
+
+        optimized = PassManager([dce]).run(pipeline)
+
+        assert [op.type for op in optimized.operations] == [OpType.LOAD_CSV, OpType.COMPUTE_COLUMNS, OpType.GENERIC_TRANSFORM]
+        assert optimized.operations[2].parameters["command"] == "XSAVE"
+        assert dce.removed_ops == [pipeline.operations[3].id]
+        optimized.validate_integrity()
+
+    def test_overwritten_and_unread_columns_are_dead(self):
+        pipeline = build([
+            LoadNode(filename="a.csv", columns=[("x", DataType.INTEGER), ("y", DataType.INTEGER)]),
+            ComputeNode(target="scratch", expression="x * 2"),  # Never read, lost by the aggregate
+            ComputeNode(target="x", expression="0"),            # Overwritten before anything reads it
+            ComputeNode(target="x", expression="y + 1"),
+            FilterNode(condition="x > 0"),
+            AggregateNode(outfile="agg.sav", break_vars=["y"], aggregations=["total = SUM(x)"]),
+        ])
+        dce = DeadCodeEliminationPass()
+
+        optimized = PassManager([dce]).run(pipeline)
+
+        computes = [op for op in optimized.operations if op.type == OpType.COMPUTE_COLUMNS]
+        assert [op.parameters["expression"] for op in computes] == ["y + 1"]
+        assert computes[0].inputs == pipeline.operations[0].outputs  # Rewired past the dead defs
+        assert dce.stats["computes_removed"] == 2
+        # 'scratch' no longer exists downstream
+        assert all("scratch" not in [col.name for col in ds.columns] for ds in optimized.datasets)
+        assert dce.stats["dead_columns"] == 2
+        optimized.validate_integrity()
+
+    def test_keeps_what_a_save_sees_and_prunes_batches(self):
+        pipeline = build([
+            LoadNode(filename="a.csv", columns=[("x", DataType.INTEGER)]),
+            ComputeNode(target="a", expression="1"),
+            ComputeNode(target="b", expression="2"),
+            ComputeNode(target="a", expression="3"),  # Defines the saved 'a'; the first def still fixes column order
+            ComputeNode(target="x", expression="4"),
+            ComputeNode(target="x", expression="5"),
+            SaveNode(filename="out.sav"),
+        ])
+
+        optimized = optimize(pipeline, [ComputeFusionPass(), DeadCodeEliminationPass()])
+
+        computes = optimized.operations[1].parameters["computes"]
+        assert [(c["target"], c["expression"]) for c in computes] == [("a", "1"), ("b", "2"), ("a", "3"), ("x", "5")]
+
+
+class TestPredicatePushdown:
+
+    def test_moves_filters_upstream_and_into_the_load(self):
+        nodes = [
+            LoadNode(filename="a.csv", columns=[("x", DataType.INTEGER), ("y", DataType.INTEGER)]),
+            ComputeNode(target="a", expression="x + y"),
+            SortNode(keys=["y"]),
+            FilterNode(condition="x > 1"),
+            MaterializeNode(),
+            FilterNode(condition="y < 10"),
+            SaveNode(filename="out.sav"),
+        ]
+        pipeline = build(nodes)
+
+        kept = optimize(pipeline, [PredicatePushdownPass(fold_into_load=False)])
+        assert [op.type for op in kept.operations] == [
+            OpType.LOAD_CSV, OpType.FILTER_ROWS, OpType.COMPUTE_COLUMNS, OpType.SORT_ROWS,
+            OpType.MATERIALIZE, OpType.SAVE_BINARY,
+        ]
+        assert kept.operations[1].parameters["condition"] == "(x > 1) & (y < 10)"
+        # The filter now sees the loaded columns only
+        filtered = next(ds for ds in kept.datasets if ds.id == kept.operations[1].outputs[0])
+        assert [col.name for col in filtered.columns] == ["x", "y"]
+        kept.validate_integrity()
+
+        folded = optimize(pipeline, [PredicatePushdownPass()])
+        assert folded.operations[0].parameters["row_filter"] == ["x > 1", "y < 10"] # One per SELECT IF
+        assert OpType.FILTER_ROWS not in [op.type for op in folded.operations]
+        folded.validate_integrity()
+
+    def test_stops_where_moving_would_change_the_result(self):
+        pipeline = build([
+            LoadNode(filename="a.csv", columns=[("x", DataType.INTEGER)]),
+            SaveNode(filename="all.sav"),         # Reads the unfiltered rows
+            FilterNode(condition="x > 1"),
+            ComputeNode(target="a", expression="x * 2"),
+            FilterNode(condition="a > 3"),        # Reads what the compute defines
+            SortNode(keys=["x"]),
+            FilterNode(condition="$CASENUM < 5"),  # Depends on the sort order
+            SaveNode(filename="out.sav"),
+        ])
+
+        optimized = optimize(pipeline, [PredicatePushdownPass()])
+
+        assert [op.type for op in optimized.operations] == [op.type for op in pipeline.operations]
+
+    def test_crosses_joins_on_the_active_side_only(self):
+        def pipeline_for(condition, tables=("lookup.sav",)):
+            return build([
+                LoadNode(filename="lookup.csv", columns=[("id", DataType.INTEGER), ("label", DataType.STRING)]),
+                SaveNode(filename="lookup.sav"),
+                LoadNode(filename="a.csv", columns=[("id", DataType.INTEGER), ("x", DataType.INTEGER)]),
+                JoinNode(sources=["*", "lookup.sav"], by=["id"], tables=list(tables)),
+                FilterNode(condition=condition),
+                SaveNode(filename="out.sav"),
+            ])
+
+        pushed = optimize(pipeline_for("x > 0 & id > 2"), [PredicatePushdownPass(fold_into_load=False)])
+        assert [op.type for op in pushed.operations][2:5] == [OpType.LOAD_CSV, OpType.FILTER_ROWS, OpType.JOIN]
+        assert pushed.operations[4].inputs[0] == pushed.operations[3].outputs[0]
+        pushed.validate_integrity()
+
+        blocked = optimize(pipeline_for("label = 'A'"), [PredicatePushdownPass()])
+        assert [op.type for op in blocked.operations][3:5] == [OpType.JOIN, OpType.FILTER_ROWS]
+
+        # /FILE=* /FILE=lookup.sav also keeps lookup's unmatched cases: filtering first changes them
+        full_match = optimize(pipeline_for("x > 0", tables=()), [PredicatePushdownPass()])
+        assert full_match.operations[3].parameters["type"] == "FULL"
+        assert [op.type for op in full_match.operations][3:5] == [OpType.JOIN, OpType.FILTER_ROWS]
+
+
+class TestProjectionPushdown:
+
+    def test_loads_only_the_columns_sinks_need(self):
+        pipeline = build([
+            LoadNode(filename="a.csv", columns=[
+                ("id", DataType.INTEGER), ("x", DataType.INTEGER), ("name", DataType.STRING), ("y", DataType.INTEGER),
+            ]),
+            ComputeNode(target="z", expression="x * 2"),
+            FilterNode(condition="y > 0"),
+            AggregateNode(outfile="agg.sav", break_vars=["id"], aggregations=["total = SUM(z)"]),
+        ])
+        projection = ProjectionPushdownPass()
+
+        optimized = PassManager([projection]).run(pipeline)
+
+        load = optimized.operations[0]
+        assert load.parameters["columns"] == ["id", "x", "y"]  # File order, 'name' is never read
+        by_id = {ds.id: ds for ds in optimized.datasets}
+        assert [col.name for col in by_id[load.outputs[0]].columns] == ["id", "x", "y"]
+        assert [col.name for col in by_id[optimized.operations[2].outputs[0]].columns] == ["id", "x", "y", "z"]
+        assert projection.stats == {"loads_projected": 1, "columns_loaded": 3, "columns_pruned": 1}
+        optimized.validate_integrity()
+
+    def test_leaves_loads_a_save_sees_whole(self):
+        pipeline = build([
+            LoadNode(filename="a.csv", columns=[("x", DataType.INTEGER), ("y", DataType.INTEGER)]),
+            ComputeNode(target="z", expression="x * 2"),
+            SaveNode(filename="out.sav"),
+        ])
+
+        optimized = optimize(pipeline, [ProjectionPushdownPass()])
+
+        assert "columns" not in optimized.operations[0].parameters
+        assert optimized is pipeline
+
+    def test_row_filters_and_unknown_schemas(self):
+        pipeline = build([
+            LoadNode(filename="a.csv"),  # No declared variables
+            FilterNode(condition="Flag = 1"),
+            AggregateNode(outfile="agg.sav", break_vars=["Region"], aggregations=["n = SUM(Amount)"]),
+        ])
+
+        optimized = optimize(pipeline, [PredicatePushdownPass(), ProjectionPushdownPass()])
+
+        load = optimized.operations[0]
+        assert load.parameters["row_filter"] == ["Flag = 1"]
+        assert sorted(load.parameters["columns"]) == ["Amount", "Flag", "Region"]
+        loaded = next(ds for ds in optimized.datasets if ds.id == load.outputs[0])
+        assert {col.type for col in loaded.columns} == {DataType.UNKNOWN}
+
+
+class TestStagePlanning:
+
+    def test_groups_row_local_chains_across_unshared_executes(self):
+        pipeline = build([
+            LoadNode(filename="a.csv", columns=[("x", DataType.INTEGER)]),
+            ComputeNode(target="a", expression="x + 1"),
+            MaterializeNode(),
+            FilterNode(condition="a > 1"),
+            RecodeNode(source_vars=["a"], target_vars=["b"], map_logic="(1=2)"),
+            SortNode(keys=["a"]),
+            ComputeNode(target="c", expression="LAG(a)"),  # Needs the previous case
+            IfNode(condition="(c > 1)", target="d", expression="1"),
+            SaveNode(filename="out.sav"),
+        ])
+        planner = StagePlanningPass()
+
+        optimized = PassManager([planner]).run(pipeline)
+
+        assert OpType.MATERIALIZE not in [op.type for op in optimized.operations]
+        stages = [op.parameters.get("stage") for op in optimized.operations]
+        assert stages == [None, "stage_001", "stage_001", "stage_001", None, None, None, None]
+        assert optimized.operations[2].inputs == optimized.operations[1].outputs
+        assert planner.stats == {"stages": 1, "ops_staged": 3, "materializes_removed": 1, "frames_saved": 3}
+        optimized.validate_integrity()
+
+    def test_shared_or_saved_results_are_boundaries(self):
+        pipeline = build([
+            LoadNode(filename="a.csv", columns=[("x", DataType.INTEGER)]),
+            ComputeNode(target="a", expression="x + 1"),
+            MaterializeNode(),
+            SaveNode(filename="mid.sav"),                # Saved: the EXECUTE stays
+            ComputeNode(target="b", expression="a * 2"),  # Reads the shared result
+            FilterNode(condition="b > 1"),
+            SaveNode(filename="out.sav"),
+        ])
+
+        optimized = optimize(pipeline, [StagePlanningPass()])
+
+        assert [op.type for op in optimized.operations] == [op.type for op in pipeline.operations]
+        stages = [op.parameters.get("stage") for op in optimized.operations]
+        assert stages == [None, None, None, None, "stage_001", "stage_001", None]
+        # Planning again gives the same plan
+        assert optimize(optimized, [StagePlanningPass()]).operations == optimized.operations
+
+
+class TestCommonSubexpressions:
+
+    def test_folds_constants_and_hoists_shared_work(self):
+        pipeline = build([
+            LoadNode(filename="a.csv", columns=[("income", DataType.INTEGER), ("tax", DataType.INTEGER)]),
+            ComputeNode(target="monthly", expression="(income - tax) / (12 * 4)"),
+            ComputeNode(target="weekly", expression="(INCOME - TAX) / 52"),
+            ComputeNode(target="tax", expression="tax + 1"),
+            ComputeNode(target="later", expression="(income - tax) * 2"),  # 'tax' changed: not shared
+            SaveNode(filename="out.sav"),
+        ])
+        cse = CommonSubexpressionPass()
+
+        optimized = PassManager([ComputeFusionPass(), cse]).run(pipeline)
+
+        computes = optimized.operations[1].parameters["computes"]
+        assert [(c["target"], c["expression"]) for c in computes] == [
+            ("__cse_1", "income - tax"),
+            ("monthly", "__cse_1 / 48"),
+            ("weekly", "__cse_1 / 52"),
+            ("tax", "tax + 1"),
+            ("later", "(income - tax) * 2"),
+        ]
+        assert cse.stats == {"constants_folded": 1, "subexpressions_hoisted": 1, "masks": 0, "uses_replaced": 2}
+        # Hidden columns stay out of the schemas
+        assert all(not col.name.startswith("__") for ds in optimized.datasets for col in ds.columns)
+
+    def test_ifs_on_one_condition_share_a_mask(self):
+        pipeline = build([
+            LoadNode(filename="a.csv", columns=[("age", DataType.INTEGER)]),
+            IfNode(condition="(age >= 18)", target="adult", expression="1"),
+            IfNode(condition="(AGE >= 18)", target="group", expression="2"),
+            ComputeNode(target="age", expression="age + 1"),
+            IfNode(condition="(age >= 18)", target="next", expression="1"),  # Tests the new age
+            SaveNode(filename="out.sav"),
+        ])
+
+        optimized = optimize(pipeline, [ComputeFusionPass(), CommonSubexpressionPass()])
+
+        computes = optimized.operations[1].parameters["computes"]
+        assert computes[0] == {"target": "__mask_1", "expression": "age >= 18"}
+        assert [c.get("condition") for c in computes[1:]] == ["__mask_1", "__mask_1", None, "(age >= 18)"]
+        # Running it again changes nothing
+        assert optimize(optimized, [CommonSubexpressionPass()]) is optimized
+
+
+class TestDtypePlanning:
+
+    @staticmethod
+    def load(**formats):
+        return LoadNode(filename="a.csv", columns=[(name, DataType.INTEGER) for name in formats], formats=formats)
+
+    def test_loads_are_typed_by_declared_format(self):
+        pipeline = build([
+            LoadNode(filename="a.csv", formats={"id": "F8.0", "income": "F8.2", "big": "F12.0", "region": "A10",
+                                                "name": "A20", "dob": "DATE11"},
+                     columns=[("id", DataType.INTEGER), ("income", DataType.INTEGER), ("big", DataType.INTEGER),
+                              ("region", DataType.STRING), ("name", DataType.STRING), ("dob", DataType.DATE)]),
+            FilterNode(condition="region = 'N'"),
+            ComputeNode(target="label", expression="name"),
+            SaveNode(filename="out.sav"),
+        ])
+        dtypes = DtypePlanningPass()
+
+        optimized = PassManager([dtypes]).run(pipeline)
+
+        assert optimized.operations[0].parameters["dtypes"] == {
+            "id": "int32", "income": "float64", "big": "int64", "region": "category", "name": "string", "dob": "date",
+        }
+        assert optimized.operations[2].parameters["dtypes"] == {"label": "string"}
+        assert dtypes.stats == {"columns_planned": 7, "int32": 1, "category": 1, "unplanned": 0}
+        assert "dtypes" not in pipeline.operations[0].parameters # Input untouched
+
+    def test_integer_bounds_decide_the_width(self):
+        pipeline = build([
+            self.load(age="F3.0", x="F8.0"),
+            ComputeNode(target="cube", expression="age * age * age"),   # < 10**9
+            ComputeNode(target="area", expression="x * x"),             # up to 10**16
+            ComputeNode(target="half", expression="age / 2"),
+            ComputeNode(target="adult", expression="age >= 18"),
+            IfNode(condition="(age < 10)", target="band", expression="1"),
+            IfNode(condition="(age >= 10)", target="band", expression="2"),
+            ComputeNode(target="n", expression="0"),
+            ComputeNode(target="n", expression="n + 1"),                # Grows with every pass: widened
+            SaveNode(filename="out.sav"),
+        ])
+
+        optimized = optimize(pipeline, [DtypePlanningPass()])
+
+        planned = {name: dtype for op in optimized.operations for name, dtype in op.parameters.get("dtypes", {}).items()}
+        assert planned == {
+            "age": "int32", "x": "int32", "cube": "int32", "area": "int64", "half": "float64", "adult": "bool",
+            "band": "int32", "n": "int64",
+        }
+
+    def test_unknown_columns_get_no_plan(self):
+        pipeline = build([
+            LoadNode(filename="a.csv"),                                  # No declared columns
+            ComputeNode(target="y", expression="x + 1"),
+            ComputeNode(target="x", expression="1"),
+            GenericNode(command="ALTER TYPE z (A8)"),
+            SaveNode(filename="out.sav"),
+        ])
+
+        optimized = optimize(pipeline, [DtypePlanningPass()])
+
+        # 'x' may come from the file, so 'y' can't be typed either
+        assert all("dtypes" not in op.parameters for op in optimized.operations)
+
+    def test_strings_used_beyond_equality_stay_strings(self):
+        pipeline = build([
+            self.load(a="A5", b="A5", c="A5", d="A5"),
+            FilterNode(condition="a = 'x' & b <> 'y'"),
+            FilterNode(condition="c > 'm'"),
+            SortNode(keys=["d"]),
+            SaveNode(filename="out.sav"),
+        ])
+
+        optimized = optimize(pipeline, [DtypePlanningPass()])
+
+        assert optimized.operations[0].parameters["dtypes"] == {"a": "category", "b": "category", "c": "string", "d": "string"}
+
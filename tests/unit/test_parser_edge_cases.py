@@ -49,6 +49,8 @@ class TestParserEdgeCases:
         assert cols[0] == Column(name="id", type=DataType.INTEGER)
         assert cols[1] == Column(name="name", type=DataType.STRING)
         assert cols[2] == Column(name="date_col", type=DataType.DATE)
+        # The formats as written, for dtype planning (F8.0 vs F8.2 are both INTEGER above)
+        assert nodes[0].formats == {"id": "F8.0", "name": "A20", "date_col": "DATE10"}
 
     # --------------------------------------------------------------------------
     # 3. Compute Syntax Errors (Lines 88, 94)
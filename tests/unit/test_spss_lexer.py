@@ -1,6 +1,7 @@
+import io
 import pytest
 from spec_generator.importers.spss.lexer import SpssLexer
-from spec_generator.importers.spss.tokens import TokenType
+from spec_generator.importers.spss.tokens import TokenStream, TokenType
 
 class TestSpssLexer:
     
@@ -75,4 +76,86 @@ class TestSpssLexer:
         # [COMPUTE] [new_date] [=] [DATE.DMY] [(] ...
         func_token = tokens[3]
         assert func_token.type == TokenType.IDENTIFIER
-        assert func_token.value == "DATE.DMY"
\ No newline at end of file
+        assert func_token.value == "DATE.DMY"
+
+    def test_comment_only_at_line_start(self):
+        """
+        '*' opens a comment only at the start of a line; mid-line it is multiplication.
+        """
+        code = "* header comment.\n  * indented comment.\nCOMPUTE x = 2 * 3."
+        tokens = self.lexer.tokenize(code)
+
+        assert [t.value for t in tokens] == ["COMPUTE", "x", "=", "2", "*", "3", "."]
+        assert tokens[4].type == TokenType.OPERATOR
+
+    def test_tracks_line_and_column(self):
+        """
+        Positions are reported per token (columns reset to 1 after a newline).
+        """
+        tokens = self.lexer.tokenize("SORT CASES BY id.\nEXECUTE.")
+
+        assert (tokens[0].line, tokens[0].column) == (1, 1)
+        assert (tokens[2].line, tokens[2].column) == (1, 12)
+        assert tokens[5].value == "EXECUTE"
+        assert (tokens[5].line, tokens[5].column) == (2, 1)
+
+    def test_iter_tokens_matches_tokenize_across_chunks(self):
+        """
+        Streaming over a file handle must give the same tokens as tokenize(),
+        even when strings, numbers and multi-word commands straddle chunk edges.
+        """
+        code = (
+            "GET DATA /FILE='my ''quoted'' file.csv'.\n"
+            "* comment with 'quote.\n"
+            "COMPUTE y = DATE.DMY(1,1,2024) * 10.5.\n"
+            "BEGIN\n\n  DATA\n1.5 2.5\nEND DATA.\n"
+        )
+        expected = [(t.type, t.value, t.line, t.column) for t in self.lexer.tokenize(code)]
+
+        for chunk_size in (1, 5, 64):
+            streamed = self.lexer.iter_tokens(io.StringIO(code), chunk_size=chunk_size)
+            assert [(t.type, t.value, t.line, t.column) for t in streamed] == expected
+
+    def test_iter_tokens_reads_binary_sources(self):
+        """
+        Binary handles (and mmaps) are decoded incrementally; CRLF is normalised.
+        """
+        raw = "COMPUTE x = 1.\r\nEXECUTE.\r\n".encode("utf-8")
+        tokens = list(self.lexer.iter_tokens(io.BytesIO(raw), chunk_size=3))
+
+        assert [t.value for t in tokens] == ["COMPUTE", "x", "=", "1", ".", "EXECUTE", "."]
+        assert tokens[5].line == 2
+
+    def test_tokenize_returns_columnar_stream(self):
+        """
+        tokenize() stores kinds and offsets in arrays; values are sliced on demand
+        and reads past the end act as a terminator sentinel.
+        """
+        code = "SELECT IF age >= 18."
+        stream = self.lexer.tokenize(code)
+
+        assert isinstance(stream, TokenStream)
+        assert stream.kinds.typecode == "B" and stream.starts.typecode == "I"
+        assert stream.type_at(0) == TokenType.COMMAND
+        assert stream.value_at(2) == ">="
+        assert code[stream.starts[3]:stream.ends[3]] == "18"
+
+        assert stream.type_at(len(stream)) == TokenType.TERMINATOR
+        assert stream.value_at(len(stream) + 5) == "."
+
+    def test_inline_data_is_one_raw_token(self):
+        """
+        Everything between BEGIN DATA and the END DATA line is a single
+        DATA_BLOCK token, even text the grammar would reject.
+        """
+        code = "BEGIN DATA\n1.5 `x`\n'open\nEND DATA.\nEXECUTE."
+        tokens = self.lexer.tokenize(code)
+
+        assert [t.type for t in tokens][:3] == [TokenType.COMMAND, TokenType.DATA_BLOCK, TokenType.COMMAND]
+        assert tokens[1].value == "1.5 `x`\n'open\n"
+        assert (tokens[1].line, tokens[1].column) == (2, 1)
+        assert (tokens[2].line, tokens[2].column) == (4, 1)
+
+        for chunk_size in (1, 7):
+            streamed = self.lexer.iter_tokens(io.StringIO(code), chunk_size=chunk_size)
+            assert [(t.type, t.value) for t in streamed] == [(t.type, t.value) for t in tokens]
@@ -1,6 +1,24 @@
+import io
+import pickle
 import pytest
 from spec_generator.importers.spss.parser import SpssParser
-from spec_generator.importers.spss.ast import LoadNode, ComputeNode, SaveNode
+from spec_generator.importers.spss.tokens import SourceSpan
+from spec_generator.importers.spss.ast import LoadNode, ComputeNode, SaveNode, DataListNode, GenericNode
+
+
+class RuntimeParser(SpssParser):
+    """Module level, so parse_parallel() can ship it to worker processes."""
+
+
+class LocalHandlerParser(SpssParser):
+    """Gets a handler the pool can't pickle."""
+
+
+def parse_weight(parser):
+    parser.advance(); parser.advance() # WEIGHT BY
+    var = parser.current_value()
+    parser.advance(); parser.advance()
+    return GenericNode(command="WEIGHT", params={"by": var})
 
 class TestSpssParser:
     def setup_method(self):
@@ -30,4 +48,159 @@ class TestSpssParser:
         
         # Check Save
         assert isinstance(nodes[2], SaveNode)
-        assert nodes[2].filename == "final.sav"
\ No newline at end of file
+        assert nodes[2].filename == "final.sav"
+
+    def test_command_boundaries_skip_strings_comments_and_data(self):
+        """
+        Split points sit after a terminator at end of line, never inside a
+        string, a comment or an inline data block.
+        """
+        code = (
+            "COMPUTE a = 1.\n"
+            "COMPUTE b = 'x.\ny'.\n"
+            "* note.\n"
+            "BEGIN DATA\n1.\n2.\nEND DATA.\n"
+        )
+        boundaries = self.parser.lexer.command_boundaries(code)
+
+        assert [code[b - 2:b] for b in boundaries] == [".\n", ".\n", ".\n"]
+        assert boundaries == [15, code.index("* note"), len(code)]
+
+    def test_parse_parallel_matches_parse(self):
+        """
+        Sharded parsing joins the per-shard ASTs in order, re-pairs inline
+        data with its DATA LIST across shards and keeps source offsets.
+        """
+        code = "GET DATA /TYPE=TXT /FILE='in.csv'.\n"
+        code += "".join(f"COMPUTE v{i} = v{i - 1} + 1.\n" for i in range(40))
+        code += "DATA LIST FREE / a.\n" + "".join(f"COMPUTE w{i} = 2.\n" for i in range(40))
+        code += "BEGIN DATA\n1\n2\nEND DATA.\nSAVE OUTFILE='out.sav'.\n"
+
+        nodes = self.parser.parse_parallel(code, workers=2)
+
+        assert nodes == self.parser.parse(code)
+        data_list = next(n for n in nodes if isinstance(n, DataListNode))
+        assert code[data_list.data.start:data_list.data.end] == "1\n2\n"
+
+    def test_parse_parallel_uses_registered_commands(self):
+        """Workers parse with the caller's command table, runtime registrations included."""
+        RuntimeParser.register_command(("weight", "by"), parse_weight)
+        code = "".join(f"WEIGHT BY w{i}.\nCOMPUTE x{i} = 1.\n" for i in range(40))
+        parser = RuntimeParser()
+        pickle.dumps((type(parser), parser._commands, parser._pair_heads)) # What the pool ships
+
+        nodes = parser.parse_parallel(code, workers=2)
+
+        assert [n.params for n in nodes[::2]] == [{"by": f"w{i}"} for i in range(40)]
+        assert nodes == parser.parse(code)
+
+    def test_parse_parallel_reports_script_errors_like_parse(self):
+        code = "".join(f"COMPUTE x{i} = 1.\n" for i in range(40)) + "COMPUTE = 2.\n"
+
+        with pytest.raises(SyntaxError) as sequential:
+            self.parser.parse(code)
+        with pytest.raises(SyntaxError) as parallel:
+            self.parser.parse_parallel(code, workers=2)
+        assert str(parallel.value) == str(sequential.value)
+
+    def test_parse_parallel_doesnt_hide_pool_failures(self):
+        LocalHandlerParser.register_command(("weight", "by"), lambda parser: parse_weight(parser))
+        code = "".join(f"WEIGHT BY w{i}.\n" for i in range(40))
+
+        with pytest.raises((pickle.PicklingError, AttributeError, TypeError)):
+            LocalHandlerParser().parse_parallel(code, workers=2)
+
+    @pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 16])
+    def test_parse_iter_matches_parse(self, chunk_size):
+        """
+        Streaming from a file object, cut at command boundaries, yields the
+        same nodes as parse(): offsets are script-relative and inline data is
+        paired with its DATA LIST even when they arrive in different chunks.
+        """
+        code = "GET DATA /TYPE=TXT /FILE='in.csv'.\r\n"
+        code += "".join(f"COMPUTE v{i} = 'a.\nb' + {i}.\n* note {i}.\n" for i in range(20))
+        code += "DATA LIST FREE / a.\nEXECUTE.\nBEGIN DATA\n1.\n2\nEND DATA.\nSAVE OUTFILE='out.sav'.\n"
+
+        stream = self.parser.parse_iter(io.BytesIO(code.encode("utf-8")), chunk_size=chunk_size)
+        nodes = list(stream)
+
+        assert nodes == self.parser.parse(code)
+        data_list = next(n for n in nodes if isinstance(n, DataListNode))
+        assert code.replace("\r\n", "\n")[data_list.data.start:data_list.data.end] == "1.\n2\n"
+
+    def test_parse_iter_is_lazy_and_reports_file_positions(self):
+        """Nodes before a bad command are yielded first; errors use file line numbers."""
+        code = "COMPUTE a = 1.\n" * 30 + "COMPUTE b = ?.\n"
+        stream = self.parser.parse_iter(io.StringIO(code), chunk_size=16)
+
+        assert isinstance(next(stream), ComputeNode)
+        with pytest.raises(SyntaxError, match="line 31, col 13"):
+            list(stream)
+
+    def test_dispatch_is_case_insensitive(self):
+        """Keywords are normalised before the table lookup."""
+        nodes = self.parser.parse("get data /FILE='a.csv'.\ncompute x = 1.\nSELECT\n  IF x > 0.\n")
+
+        assert [type(n).__name__ for n in nodes] == ["LoadNode", "ComputeNode", "FilterNode"]
+
+    def test_register_command_on_subclass(self):
+        """
+        Third-party commands plug into the table; the base parser is untouched.
+        """
+        class WeightParser(SpssParser):
+            pass
+
+        def parse_weight(parser):
+            parser.advance(); parser.advance() # WEIGHT BY
+            var = parser.current_value()
+            parser.advance(); parser.advance()
+            return GenericNode(command="WEIGHT", params={"by": var})
+
+        WeightParser.register_command(("weight", "by"), parse_weight)
+        code = "WEIGHT BY w.\nCOMPUTE x = 1."
+
+        nodes = WeightParser().parse(code)
+        assert nodes[0].params == {"by": "w"}
+        assert isinstance(nodes[1], ComputeNode)
+        assert self.parser.parse(code)[0].params == {"content": "BY w"}
+
+    def test_expressions_are_source_slices(self):
+        """
+        Expressions and conditions are cut from the source in one slice,
+        so the original spacing survives.
+        """
+        code = "COMPUTE y = TRUNC(date_num / 10000).\nIF (age>=18)  adult = 1.\nSELECT IF  x  > 0."
+        compute, if_node, select = self.parser.parse(code)
+
+        assert compute.expression == "TRUNC(date_num / 10000)"
+        assert (if_node.condition, if_node.target, if_node.expression) == ("(age>=18)", "adult", "1")
+        assert select.condition == "x  > 0"
+
+    def test_lazy_spans_read_like_strings(self):
+        """With lazy_spans the fields are SourceSpan views until read."""
+        class LazyParser(SpssParser):
+            lazy_spans = True
+
+        compute = LazyParser().parse("COMPUTE y = a +\n  b.")[0]
+
+        assert isinstance(compute.expression, SourceSpan)
+        assert compute.expression == "a +\n  b"
+        assert str(compute.expression) == "a +\n  b"
+        assert pickle.loads(pickle.dumps(compute)).expression == "a +\n  b"
+
+    def test_nodes_are_slotted_and_share_names(self):
+        """
+        AST nodes carry no per-instance __dict__, expression trees are
+        immutable, and every use of a name is the same interned str.
+        """
+        code = "COMPUTE income2 = income * 2.\nSELECT IF income > 0.\nSORT CASES BY income2.\n"
+        compute, select, sort = self.parser.parse(code)
+
+        assert not hasattr(compute, "__dict__")
+        assert not hasattr(compute.expression_tree, "__dict__")
+        with pytest.raises(AttributeError):
+            compute.expression_tree.op = "-"
+
+        assert compute.expression_tree.left.name is select.condition_tree.left.name
+        assert compute.target is sort.keys[0]
+        assert pickle.loads(pickle.dumps(compute)) == compute